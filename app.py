@@ -1,14 +1,14 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import os
-from config import DB_PATH, CV_PATH, logger
-from src.agents import MessageBus
-from src.orchestrator import OrchestratorAgent
-from src.research import ResearchAgent
-from src.verification import VerificationAgent
-from src.outreach import OutreachAgent
-from src.tools import WebSearch, WebScraper, RankingCalculator, CVParser
+import time
+from config import CV_PATH, TRANSCRIPT_PATH, LOG_PATH, logger
+from database.db import db
+from database.db_init import init_db
+from src import dashboard
+from src.events import events, tail_lines
+from src.batch import build_agent_graph
+from src.tools import CVParser
 
 # Page Config
 st.set_page_config(
@@ -79,30 +79,14 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-from src.learning import LearningAgent
-
 # Initialize agents
 @st.cache_resource
 def get_agents():
-    bus = MessageBus()
-    search = WebSearch()
-    scraper = WebScraper()
-    ranker = RankingCalculator()
-    cv_parser = CVParser()
-    
-    research = ResearchAgent(search, scraper, ranker)
-    verification = VerificationAgent()
-    outreach = OutreachAgent()
-    learning = LearningAgent()
-    orchestrator = OrchestratorAgent(bus)
-    
-    bus.register_agent(research)
-    bus.register_agent(verification)
-    bus.register_agent(outreach)
-    bus.register_agent(learning)
-    bus.register_agent(orchestrator)
-    
-    return orchestrator, bus, cv_parser
+    init_db()
+    orchestrator, bus = build_agent_graph()
+    # Runs a previous (crashed or restarted) app process still owned become resumable
+    orchestrator.runs.release_dead_owners()
+    return orchestrator, bus, CVParser()
 
 orchestrator, bus, cv_parser = get_agents()
 
@@ -121,17 +105,25 @@ with st.sidebar:
         with open(CV_PATH, "wb") as f:
             f.write(uploaded_cv.getbuffer())
         st.success("CV Uploaded Successfully!")
+
+    uploaded_transcript = st.file_uploader("Upload Transcript (PDF, optional)", type="pdf")
+    if uploaded_transcript:
+        with open(TRANSCRIPT_PATH, "wb") as f:
+            f.write(uploaded_transcript.getbuffer())
+        st.success("Transcript Uploaded Successfully!")
         
     cv_btn = st.button("🔍 Parse Profile")
     if cv_btn:
         if os.path.exists(CV_PATH):
-            profile_text = cv_parser.parse_cv(CV_PATH)
+            profile_text = cv_parser.parse_profile(CV_PATH, TRANSCRIPT_PATH)
             st.session_state.profile = profile_text
             st.write("Profile extracted and cached.")
         else:
             st.error("Please upload a CV first.")
 
     st.divider()
+    force_refresh = st.checkbox("♻️ Force refresh", value=False,
+                                help="Recompute matches, verifications, professor lists and drafts even when their inputs are unchanged.")
     if st.button("🚀 RUN AUTONOMOUS FLOW", type="primary"):
         if 'profile' not in st.session_state:
             st.warning("Please parse your CV profile first.")
@@ -152,104 +144,166 @@ with st.sidebar:
                 result = orchestrator.process({
                     "action": "run_full_flow", 
                     "country": country, 
-                    "student_profile": st.session_state.get('profile', '')
+                    "student_profile": st.session_state.get('profile', ''),
+                    "force_refresh": force_refresh
                 })
                 
                 # Complete
                 status_text.markdown("### ✅ All Phases Complete!")
                 progress_bar.progress(100)
                 
-            st.success("🎉 Autonomous search completed! Check the results below.")
-            st.balloons()
+            if result.get("status") == "success":
+                st.success("🎉 Autonomous search completed! Check the results below.")
+                st.balloons()
+            else:
+                st.warning(result.get("message", "The flow did not complete."))
             
             # Force refresh to show new data
-            import time
             time.sleep(1)
             st.rerun()
 
+    # Checkpointed runs that were interrupted or had failed tasks can be continued
+    unfinished = orchestrator.runs.latest_incomplete()
+    if unfinished and st.button(f"▶️ Resume unfinished run #{unfinished}"):
+        with st.spinner("Resuming: only incomplete tasks will run..."):
+            result = orchestrator.process({"action": "resume_flow", "run_id": unfinished,
+                                           "force_refresh": force_refresh})
+        if result.get("status") == "success":
+            st.success(result["message"])
+        else:
+            st.warning(result.get("message", "The run did not complete."))
+        time.sleep(1)
+        st.rerun()
+
 # Main Page Layout
 st.title("🎓 PhD Finder Dashboard")
 st.caption("Empowering your academic journey with Autonomous AI Agents")
 
 # Live Activity Monitor
 with st.expander("📊 Live Activity Monitor", expanded=True):
-    log_container = st.container()
-    with log_container:
+    # Agent events are pulled incrementally: only those newer than the last
+    # sequence number this session saw are fetched on each rerun.
+    feed = st.session_state.setdefault("activity_feed", [])
+    feed.extend(events.since(st.session_state.get("activity_seq", 0)))
+    del feed[:-20]
+    st.session_state.activity_seq = events.last_seq
+
+    if feed:
+        st.code("\n".join(
+            f"{time.strftime('%H:%M:%S', time.localtime(e['time']))} [{e.get('agent', e['kind'])}] {e['message']}"
+            for e in feed
+        ), language="log")
+    else:
         try:
-            with open("agent_system.log", "r") as f:
-                logs = f.readlines()
-                recent_logs = logs[-20:]  # Show last 20 lines
-                log_text = "".join(recent_logs)
-                st.code(log_text, language="log")
+            st.code("\n".join(tail_lines(LOG_PATH, 20)), language="log")
         except FileNotFoundError:
             st.info("No activity logs yet. Start the autonomous flow to see live updates!")
 
+# Dashboard data is cached per DB change token, so reruns that follow no write
+# (widget clicks, paging) are served from memory.
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_metrics(version: int):
+    return dashboard.metrics()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_page(table: str, page: int, page_size: int, sort: str, descending: bool, version: int):
+    loader = {"universities": dashboard.universities_page, "professors": dashboard.professors_page,
+              "emails": dashboard.emails_page}[table]
+    return pd.DataFrame(loader(page, page_size, sort, descending))
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def load_email_body(email_id: int, version: int):
+    return dashboard.email_body(email_id)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_decisions(version: int):
+    return pd.DataFrame(dashboard.recent_decisions(20))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_traces(version: int):
+    return dashboard.recent_traces(10)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_trace_summary(trace_id: str, version: int):
+    return pd.DataFrame(dashboard.trace_summary(trace_id))
+
+def paged_controls(key: str, total: int, sorts):
+    c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+    sort = c1.selectbox("Sort by", list(sorts), key=f"{key}_sort")
+    descending = c2.radio("Order", ["Descending", "Ascending"], horizontal=True, key=f"{key}_order") == "Descending"
+    page_size = c3.selectbox("Rows", [25, 50, 100], key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    page = c4.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}_page") - 1
+    return page, page_size, sort, descending
+
+version = db.change_token()
+counts = load_metrics(version)
+
 # Metrics row
 m1, m2, m3, m4 = st.columns(4)
-conn = sqlite3.connect(DB_PATH)
-u_count = cursor = conn.execute("SELECT count(*) FROM universities").fetchone()[0]
-p_count = cursor = conn.execute("SELECT count(*) FROM professors").fetchone()[0]
-e_count = cursor = conn.execute("SELECT count(*) FROM emails").fetchone()[0]
-v_count = cursor = conn.execute("SELECT count(*) FROM universities WHERE verification_status='verified'").fetchone()[0]
-conn.close()
-
-m1.metric("Universities Discovered", u_count)
-m2.metric("Professors Matched", p_count)
-m3.metric("Emails Drafted", e_count)
-m4.metric("Data Verified", f"{v_count}/{u_count}" if u_count > 0 else "0/0")
+m1.metric("Universities Discovered", counts["universities"])
+m2.metric("Professors Matched", counts["professors"])
+m3.metric("Emails Drafted", counts["emails"])
+m4.metric("Data Verified", f"{counts['verified']}/{counts['universities']}" if counts["universities"] > 0 else "0/0")
 
 # Results Tabs
 tab1, tab2, tab3 = st.tabs(["🏛 Universities", "👨‍🔬 Professors", "📧 Email Drafts"])
 
 with tab1:
     st.subheader("Top University Matches")
-    conn = sqlite3.connect(DB_PATH)
-    unis_df = pd.read_sql_query("""
-        SELECT name, ranking_qs as 'Rank', match_score as 'Match %', 
-               verification_status as 'Status', match_reasoning as 'Reasoning'
-        FROM universities 
-        ORDER BY match_score DESC
-    """, conn)
+    page, page_size, sort, descending = paged_controls("unis", counts["universities"], dashboard.UNIVERSITY_SORTS)
+    unis_df = load_page("universities", page, page_size, sort, descending, version)
     st.dataframe(unis_df, use_container_width=True, hide_index=True)
-    conn.close()
 
 with tab2:
     st.subheader("Identified Professors")
-    conn = sqlite3.connect(DB_PATH)
-    profs_df = pd.read_sql_query("""
-        SELECT p.name, u.name as 'University', p.department, p.contact_priority as 'Priority', p.accepting_students as 'Recruiting'
-        FROM professors p
-        JOIN universities u ON p.university_id = u.id
-        ORDER BY p.contact_priority DESC
-    """, conn)
+    page, page_size, sort, descending = paged_controls("profs", counts["professors"], dashboard.PROFESSOR_SORTS)
+    profs_df = load_page("professors", page, page_size, sort, descending, version)
     st.dataframe(profs_df, use_container_width=True, hide_index=True)
-    conn.close()
 
 with tab3:
     st.subheader("Generated Outreach Emails")
-    conn = sqlite3.connect(DB_PATH)
-    emails = pd.read_sql_query("""
-        SELECT p.name as 'Professor', e.subject, e.body, e.quality_score as 'Quality'
-        FROM emails e
-        JOIN professors p ON e.professor_id = p.id
-    """, conn)
-    for idx, row in emails.iterrows():
-        with st.expander(f"✉️ Email for {row['Professor']} - Score: {row['Quality']}/100"):
-            st.text(f"Subject: {row['subject']}")
-            st.divider()
-            st.text_area("Body", value=row['body'], height=200, key=f"email_{idx}")
-            st.button("✅ Approve & Send", key=f"send_{idx}")
-    conn.close()
+    page, page_size, sort, descending = paged_controls("emails", counts["emails"], dashboard.EMAIL_SORTS)
+    emails = load_page("emails", page, page_size, sort, descending, version)
+    if emails.empty:
+        st.info("No email drafts yet.")
+    else:
+        st.dataframe(emails.drop(columns=["id"]), use_container_width=True, hide_index=True)
+        # Only the selected draft's body is loaded and rendered
+        labels = {row["id"]: f"✉️ {row['Professor']} - {row['subject']} ({row['Quality']}/100)"
+                  for _, row in emails.iterrows()}
+        email_id = st.selectbox("Open draft", list(labels), format_func=labels.get, key="email_open")
+        st.text_area("Body", value=load_email_body(int(email_id), version) or "", height=200, key=f"email_{email_id}")
+        c1, c2 = st.columns(2)
+        c1.button("✅ Approve & Send", key=f"send_{email_id}")
+        if c2.button("✍️ Redraft", key=f"redraft_{email_id}"):
+            if 'profile' not in st.session_state:
+                st.warning("Please parse your CV profile first.")
+            else:
+                # Stream the new draft into place as the fields arrive
+                subject_slot, body_slot = st.empty(), st.empty()
+
+                def show_draft(draft):
+                    subject_slot.markdown(f"**Subject:** {draft.get('subject', '…')}")
+                    body_slot.markdown(draft.get("body", ""))
+
+                # Replaces the selected draft with a fresh (uncached) generation
+                bus.agents["Outreach"].generate_email(dashboard.email_professor(int(email_id)),
+                                                      st.session_state.profile, on_update=show_draft,
+                                                      email_id=int(email_id))
+                st.rerun()
 
 # Agent Logs at the bottom
 st.divider()
 with st.expander("🛠 Agent Activity Logs (Reasoning Trace)"):
-    conn = sqlite3.connect(DB_PATH)
-    logs_df = pd.read_sql_query("""
-        SELECT agent_name as 'Agent', task, decision, reasoning 
-        FROM agent_decisions 
-        ORDER BY created_at DESC 
-        LIMIT 20
-    """, conn)
-    st.table(logs_df)
-    conn.close()
+    st.table(load_decisions(version))
+
+with st.expander("⏱ Performance Traces"):
+    traces = load_traces(version)
+    if not traces:
+        st.info("No traced runs yet. Run the autonomous flow to record one.")
+    else:
+        labels = {t["trace_id"]: f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t['start_time']))} · "
+                                 f"{t['duration_ms'] / 1000:.1f}s · {t['status']}" for t in traces}
+        trace_id = st.selectbox("Run", list(labels), format_func=labels.get, key="trace_open")
+        st.dataframe(load_trace_summary(trace_id, version), use_container_width=True, hide_index=True)
@@ -0,0 +1,61 @@
+import sys
+import json
+import argparse
+from benchmarks.harness import BenchmarkRun, save, compare
+
+SECTIONS = ["db", "agents", "scrape", "flow"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Offline performance benchmarks for the PhD finder pipeline.")
+    parser.add_argument("sections", nargs="*", default=[],
+                        help="sections to run (default: all)")
+    parser.add_argument("--universities", type=int, default=10000)
+    parser.add_argument("--professors", type=int, default=200000)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--search-latency", type=float, default=0.02, help="seconds per fake search query")
+    parser.add_argument("--repeat", type=int, default=20, help="iterations per query/agent benchmark")
+    parser.add_argument("--flow-runs", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=200, help="pages fetched from the local site")
+    parser.add_argument("--queued-bus", action="store_true", help="run the flow on QueuedMessageBus")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (lower overhead timings)")
+    parser.add_argument("--quick", action="store_true", help="small dataset for a fast smoke run")
+    parser.add_argument("--output", default="benchmarks/results", help="directory for the JSON report")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.universities, args.professors, args.emails = 500, 5000, 100
+        args.repeat, args.pages = 5, 20
+
+    run = BenchmarkRun(universities=args.universities, professors=args.professors, emails=args.emails,
+                       llm_latency=args.llm_latency, token_latency=args.token_latency,
+                       search_latency=args.search_latency, repeat=args.repeat, flow_runs=args.flow_runs,
+                       pages=args.pages, queued_bus=args.queued_bus, track_memory=not args.no_memory)
+    report = run.run(args.sections or SECTIONS)
+    path = save(report, args.output)
+
+    print(f"{'benchmark':<55} {'wall_s':>8} {'mean_ms':>9} {'p95_ms':>9} {'peak_mb':>8}")
+    for name, metrics in report["results"].items():
+        cells = [f"{metrics[k]:.2f}" if k in metrics else "-" for k in ("wall_s", "mean_ms", "p95_ms", "peak_mb")]
+        print(f"{name:<55} {cells[0]:>8} {cells[1]:>9} {cells[2]:>9} {cells[3]:>8}")
+    rss = report["meta"]["max_rss_mb"]
+    print(f"\nPeak RSS: {f'{rss:.1f} MB' if rss is not None else 'n/a'}. Report saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            changes = compare(report, json.load(f), args.threshold)
+        regressions = [c for c in changes if c["regression"]]
+        for c in regressions:
+            print(f"REGRESSION {c['name']}.{c['metric']}: {c['baseline']:.2f} -> {c['current']:.2f} ({c['change']:+.0%})")
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%} across {len(changes)} compared metrics")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
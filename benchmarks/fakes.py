@@ -0,0 +1,156 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+from urllib.parse import quote_plus
+
+_RESULT_LINE = re.compile(r"^- (.+?)(?: \([^)]*\))?: ", re.MULTILINE)
+_TARGET_LINE = re.compile(r"^\s*\[(\d+)\]", re.MULTILINE)
+
+
+class FakeGroqClient:
+    """
+    Stand-in for groq.Groq that answers every prompt the agents send with plausible JSON.
+
+    Each call sleeps `latency` seconds (plus `token_latency` per completion
+    token when streaming) so pipeline timings reflect the shape of real LLM
+    waits without the network or the rate limit.
+    """
+
+    def __init__(self, latency: float = 0.05, token_latency: float = 0.0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _answer(self, system: str, user: str) -> str:
+        if "university names" in system:
+            names = _RESULT_LINE.findall(user)
+            return json.dumps([{"name": n, "country": None, "ranking_qs": i + 1} for i, n in enumerate(names)])
+        if "professor names" in system:
+            names = _RESULT_LINE.findall(user)
+            return json.dumps([{"name": n.split(" - ")[0], "department": "Computer Science"} for n in names])
+        if "several research opportunities" in system:
+            ids = [int(i) for i in _TARGET_LINE.findall(user)]
+            return json.dumps({"results": [{"id": i, "score": 70 + i % 30, "reasoning": "Overlapping research areas.",
+                                            "confidence": 0.8} for i in ids]})
+        if "PhD application consultant" in system:
+            return json.dumps({"subject": "Prospective PhD student interested in your group",
+                               "body": "Dear Professor,\n\n" + "I have followed your recent work closely. " * 30,
+                               "quality_score": 85, "reasoning": "Mentions the group's research directly."})
+        if "PhD matching" in system:
+            return json.dumps({"score": 75, "reasoning": "Overlapping research areas.", "confidence": 0.8})
+        return "{}"
+
+    def create(self, messages: List[Dict[str, str]], model: str = "", temperature: float = 0.7,
+               stream: bool = False, **kwargs: Any):
+        with self._lock:
+            self.calls += 1
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = self._answer(system, user)
+        usage = SimpleNamespace(total_tokens=(len(system) + len(user) + len(content)) // 4)
+        time.sleep(self.latency)
+        if stream:
+            return self._stream(content)
+        if self.token_latency:
+            time.sleep(self.token_latency * len(content) / 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def _stream(self, content: str) -> Iterator[Any]:
+        for i in range(0, len(content), 16):
+            if self.token_latency:
+                time.sleep(self.token_latency * 4)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + 16]))])
+
+
+class FakeSearchBackend:
+    """
+    Replacement for the duckduckgo_search.DDGS class (patched over src.tools.DDGS).
+
+    University-list queries return `universities` distinct institutions,
+    faculty queries return `professors` names; links point at `base_url`.
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1", latency: float = 0.02,
+                 universities: int = 20, professors: int = 10):
+        self.base_url = base_url
+        self.latency = latency
+        self.universities = universities
+        self.professors = professors
+
+    def __call__(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def text(self, query: str, max_results: int = 10) -> List[Dict[str, str]]:
+        time.sleep(self.latency)
+        seed = int(hashlib.md5(query.encode("utf-8")).hexdigest(), 16)
+        if query.lower().startswith("faculty list"):
+            return [{"title": f"Prof. Bench{(seed + i) % 997} Person{i} - Computer Science",
+                     "href": f"{self.base_url}/people/{quote_plus(query)}/{i}",
+                     "body": f"Professor of computer science working on machine learning topic {i}."}
+                    for i in range(self.professors)]
+        return [{"title": f"Benchmark Institute of Science {i}",
+                 "href": f"{self.base_url}/uni/{i}",
+                 "body": f"Benchmark Institute of Science {i} is a research university ranked {i + 1} in the QS rankings."}
+                for i in range(self.universities)]
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    page_bytes = 20000
+
+    def do_GET(self):
+        etag = '"' + hashlib.md5(self.path.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        paragraph = f"<p>Research group page {self.path}: machine learning, robotics and systems.</p>"
+        body = ("<html><body><h1>Faculty</h1>" + paragraph * (self.page_bytes // len(paragraph))
+                + "</body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalSite:
+    """Threaded HTTP server on localhost serving synthetic faculty pages with ETags."""
+
+    def __init__(self, page_bytes: int = 20000):
+        handler = type("SiteHandler", (_SiteHandler,), {"page_bytes": page_bytes})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="LocalSite", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "LocalSite":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
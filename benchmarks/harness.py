@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import logging
+import platform
+import tempfile
+import subprocess
+import statistics
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from unittest import mock
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+import src.tools
+from benchmarks.fakes import FakeGroqClient, FakeSearchBackend, LocalSite
+from benchmarks.synthetic import generate, COUNTRIES
+from database.audit import audit_writer
+from database.db import db
+from database.db_init import init_db
+from src import dashboard
+from src.agents import MessageBus, QueuedMessageBus
+from src.entity_resolution import EntityResolver
+from src.events import events
+from src.llm_cache import LLMCache
+from src.llm_utils import llm
+from src.orchestrator import OrchestratorAgent
+from src.outreach import OutreachAgent
+from src.prerank import PreRanker
+from src.rate_limit import LLMRateLimiter
+from src.research import ResearchAgent
+from src.scrape_cache import ScrapeCache
+from src.search_cache import SearchCache
+from src.tools import WebSearch, WebScraper, RankingCalculator, HostThrottle
+from src.verification import VerificationAgent
+from config import SCRAPE_MAX_WORKERS, logger
+
+PROFILE = ("MSc in Computer Science. Research interests: machine learning, graph neural networks "
+           "and robotics. Thesis on reinforcement learning for manipulation.")
+BENCH_COUNTRY = "Benchland"
+
+# Only timing and memory metrics are compared; counts and sizes (rows, pages, llm_calls, text_mb) are not
+TIMED_SUFFIXES = ("_s", "_ms")
+MEMORY_METRICS = ("peak_mb", "rss")
+# Compared metrics where a larger value is an improvement; every other one is a cost
+HIGHER_IS_BETTER = ("per_s",)
+
+
+def comparable(metric: str) -> bool:
+    return metric.endswith(TIMED_SUFFIXES) or any(key in metric for key in MEMORY_METRICS)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency statistics in milliseconds for a list of durations in seconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {"n": len(samples), "mean_ms": statistics.fmean(samples) * 1000,
+            "p50_ms": statistics.median(samples) * 1000, "p95_ms": p95 * 1000, "max_ms": ordered[-1] * 1000}
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+class BenchmarkRun:
+    """
+    Runs the benchmark sections against an isolated database and collects results.
+
+    Every external dependency is replaced for the duration of the run: the
+    Groq client by FakeGroqClient, DuckDuckGo by FakeSearchBackend and real
+    sites by a LocalSite on localhost. Caches start cold (TTL 0) so each
+    section measures the work itself rather than cache hits.
+    """
+
+    def __init__(self, universities: int = 10000, professors: int = 200000, emails: int = 2000,
+                 llm_latency: float = 0.05, token_latency: float = 0.0, search_latency: float = 0.02,
+                 repeat: int = 20, flow_runs: int = 1, pages: int = 200, queued_bus: bool = False,
+                 track_memory: bool = True, workdir: Optional[str] = None):
+        self.sizes = {"universities": universities, "professors": professors, "emails": emails}
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.search_latency = search_latency
+        self.repeat = repeat
+        self.flow_runs = flow_runs
+        self.pages = pages
+        self.queued_bus = queued_bus
+        self.track_memory = track_memory
+        self.workdir = workdir
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[Dict[str, Any]]:
+        """Record wall time (and peak Python heap when enabled) for a block under results[name]."""
+        entry: Dict[str, Any] = {}
+        if self.track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["wall_s"] = time.perf_counter() - start
+            if self.track_memory:
+                entry["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                tracemalloc.stop()
+            self.results[name] = entry
+            logger.warning(f"⏱ {name}: {entry['wall_s']:.2f}s")
+
+    @contextmanager
+    def _environment(self, site: LocalSite) -> Iterator[FakeGroqClient]:
+        with ExitStack() as stack:
+            workdir = self.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix="phd-bench-"))
+            original_path = db.path
+            db.configure(os.path.join(workdir, "bench.db"))
+            stack.callback(db.configure, original_path)
+            # Decisions logged during the run must land in the benchmark database
+            stack.callback(audit_writer.flush)
+
+            client = FakeGroqClient(self.llm_latency, self.token_latency)
+            backend = FakeSearchBackend(site.base_url, self.search_latency)
+            stack.enter_context(mock.patch.object(src.tools, "DDGS", backend))
+            stack.enter_context(mock.patch.object(llm, "client", client))
+            stack.enter_context(mock.patch.object(llm, "cache", LLMCache(ttl=0)))
+            # The fake has no quota, so only the in-flight cap is kept realistic
+            stack.enter_context(mock.patch.object(llm, "limiter", LLMRateLimiter(
+                requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)))
+            level = logger.level
+            logger.setLevel(logging.WARNING)
+            stack.callback(logger.setLevel, level)
+            init_db()
+            yield client
+
+    def _agents(self):
+        search = WebSearch(cache=SearchCache(ttl=0))
+        scraper = WebScraper(cache=ScrapeCache(ttl=0))
+        return (ResearchAgent(search, scraper, RankingCalculator()), VerificationAgent(), OutreachAgent(), search)
+
+    def generate(self):
+        with self.section("db.generate") as entry:
+            entry.update(generate(db, **self.sizes))
+        self.results["db.generate"]["rows_per_s"] = sum(self.sizes.values()) / self.results["db.generate"]["wall_s"]
+
+    def bench_db(self):
+        queries: Dict[str, Callable[[], Any]] = {
+            "metrics": dashboard.metrics,
+            "recent_decisions": lambda: dashboard.recent_decisions(20),
+            "email_body": lambda: dashboard.email_body(1),
+            "change_token": db.change_token,
+            "universities_by_country": lambda: db.fetchall(
+                "SELECT id, name FROM universities WHERE country = ?", (COUNTRIES[0],)),
+        }
+        for label, sorts, loader in (("universities", dashboard.UNIVERSITY_SORTS, dashboard.universities_page),
+                                     ("professors", dashboard.PROFESSOR_SORTS, dashboard.professors_page),
+                                     ("emails", dashboard.EMAIL_SORTS, dashboard.emails_page)):
+            for sort in sorts:
+                queries[f"{label}_page[{sort}]"] = lambda loader=loader, sort=sort: loader(10, 50, sort, True)
+        for name, fn in queries.items():
+            self.results[f"db.query.{name}"] = timed(fn, self.repeat)
+
+        ranker = PreRanker()
+        with self.section("db.prerank.refresh_professors") as entry:
+            entry["rows"] = ranker.refresh("professor")
+        self.results["db.prerank.rank_professors"] = timed(
+            lambda: ranker.rank("professor", PROFILE, 10), max(1, self.repeat // 4))
+
+        resolver = EntityResolver()
+        batch = [{"name": f"University of Aachen {i}", "ranking_qs": i} for i in range(0, 2000, 20)]
+        self.results["db.resolve.upsert_universities"] = timed(
+            lambda: resolver.upsert_universities(batch, COUNTRIES[0]), max(1, self.repeat // 10))
+
+    def bench_agents(self):
+        research, verification, outreach, search = self._agents()
+        try:
+            uni_ids = [row[0] for row in db.fetchall("SELECT id FROM universities ORDER BY id LIMIT ?", (self.repeat,))]
+            prof_ids = [row[0] for row in db.fetchall("SELECT id FROM professors ORDER BY id LIMIT ?", (self.repeat,))]
+            # force_refresh keeps repeated cases on the same entities from hitting the fingerprint
+            # skip path; the "[memoized]" cases measure that path on purpose
+            cases = {
+                "research.find_universities": lambda i: research.find_universities(f"{BENCH_COUNTRY} {i}"),
+                "research.analyze_university_matches": lambda i: research.analyze_university_matches(
+                    uni_ids[:5], PROFILE, force_refresh=True),
+                "research.find_professors": lambda i: research.find_professors(uni_ids[i % len(uni_ids)],
+                                                                              force_refresh=True),
+                "verification.verify_university": lambda i: verification.verify_university(
+                    uni_ids[i % len(uni_ids)], force_refresh=True),
+                "outreach.generate_email": lambda i: outreach.generate_email(prof_ids[i % len(prof_ids)], PROFILE,
+                                                                             force_refresh=True),
+                "research.analyze_university_matches[memoized]": lambda i: research.analyze_university_matches(
+                    uni_ids[:5], PROFILE),
+                "outreach.generate_email[memoized]": lambda i: outreach.generate_email(prof_ids[i % len(prof_ids)],
+                                                                                       PROFILE),
+            }
+            for name, case in cases.items():
+                samples = []
+                with self.section(f"agent.{name}") as entry:
+                    for i in range(self.repeat):
+                        start = time.perf_counter()
+                        case(i)
+                        samples.append(time.perf_counter() - start)
+                    entry.update(summarize(samples))
+                    entry["ops_per_s"] = len(samples) / sum(samples)
+
+            first_update: List[float] = []
+            samples = []
+            for i in range(max(1, self.repeat // 4)):
+                start = time.perf_counter()
+                marks: List[float] = []
+                outreach.generate_email(prof_ids[i % len(prof_ids)], PROFILE, force_refresh=True,
+                                        on_update=lambda draft: marks.append(time.perf_counter()))
+                samples.append(time.perf_counter() - start)
+                first_update.append((marks[0] if marks else time.perf_counter()) - start)
+            self.results["agent.outreach.generate_email_streamed"] = {
+                **summarize(samples), "first_update_ms": statistics.fmean(first_update) * 1000}
+        finally:
+            search.close()
+
+    def bench_scrape(self, site: LocalSite):
+        scraper = WebScraper(cache=ScrapeCache(ttl=0))
+        # Every page lives on one local host; lift the politeness limits so the
+        # scraper's own concurrency is what gets measured
+        scraper.throttle = HostThrottle(SCRAPE_MAX_WORKERS, 0.0)
+        urls = [f"{site.base_url}/page/{i}" for i in range(self.pages)]
+        for name in ("scrape.cold", "scrape.revalidate"):
+            with self.section(name) as entry:
+                sizes = [len(text or "") for _, text in scraper.scrape_many(urls)]
+            entry.update({"pages": len(sizes), "pages_per_s": len(sizes) / entry["wall_s"],
+                          "text_mb": sum(sizes) / 2 ** 20})
+
+    def bench_flow(self, client: FakeGroqClient):
+        research, verification, outreach, search = self._agents()
+        bus = QueuedMessageBus() if self.queued_bus else MessageBus()
+        orchestrator = OrchestratorAgent(bus)
+        for agent in (research, verification, outreach, orchestrator):
+            bus.register_agent(agent)
+        try:
+            for run in range(self.flow_runs):
+                seq = events.last_seq
+                calls = client.calls
+                with self.section(f"flow.run_full_flow[{run}]") as entry:
+                    orchestrator.run_full_flow(f"{BENCH_COUNTRY} {run}", PROFILE)
+                phases = [e for e in events.since(seq) if e["kind"] == "phase"]
+                for current, following in zip(phases, phases[1:]):
+                    entry[f"phase_{current['phase']}_s"] = following["time"] - current["time"]
+                entry["llm_calls"] = client.calls - calls
+        finally:
+            if isinstance(bus, QueuedMessageBus):
+                bus.shutdown()
+            search.close()
+
+    def run(self, sections: List[str]) -> Dict[str, Any]:
+        with LocalSite() as site, self._environment(site) as client:
+            # Every section runs against the synthetic dataset
+            self.generate()
+            if "db" in sections:
+                self.bench_db()
+            if "agents" in sections:
+                self.bench_agents()
+            if "scrape" in sections:
+                self.bench_scrape(site)
+            if "flow" in sections:
+                self.bench_flow(client)
+        return {"meta": self.meta(sections), "results": self.results}
+
+    @staticmethod
+    def max_rss_mb() -> Optional[float]:
+        if resource is None:
+            return None
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if platform.system() == "Darwin" else 2 ** 10)
+
+    def meta(self, sections: List[str]) -> Dict[str, Any]:
+        try:
+            commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                    text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            commit = ""
+        return {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "sections": sections,
+            "sizes": self.sizes,
+            "llm_latency": self.llm_latency,
+            "token_latency": self.token_latency,
+            "search_latency": self.search_latency,
+            "repeat": self.repeat,
+            "queued_bus": self.queued_bus,
+            "track_memory": self.track_memory,
+            "max_rss_mb": self.max_rss_mb(),
+        }
+
+
+def save(report: Dict[str, Any], directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"bench-{report['meta']['timestamp'].replace(':', '')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Per-metric changes against a baseline report.
+
+    Only timing and memory metrics (see comparable) are included. Each entry
+    has the metric, both values, the relative change and whether it is a
+    regression beyond `threshold` (0.1 = 10% worse).
+    """
+    changes = []
+    for name, metrics in report["results"].items():
+        old_metrics = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if not comparable(metric) or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            changes.append({"name": name, "metric": metric, "baseline": old, "current": value,
+                            "change": change, "regression": worse > threshold})
+    return changes
@@ -0,0 +1,78 @@
+import random
+from typing import Dict, Iterator, List, Tuple
+from database.db import Database
+from database.keys import university_key, person_key
+
+COUNTRIES = ["Germany", "France", "Switzerland", "Netherlands", "Sweden", "United Kingdom",
+             "Canada", "United States", "Japan", "Australia"]
+CITIES = ["Aachen", "Berlin", "Lyon", "Zurich", "Delft", "Uppsala", "Leeds", "Toronto",
+          "Boston", "Kyoto", "Sydney", "Munich", "Geneva", "Lund", "Oxford", "Austin"]
+AREAS = ["machine learning", "computer vision", "natural language processing", "robotics",
+         "distributed systems", "databases", "security", "graph neural networks",
+         "reinforcement learning", "computational biology", "HCI", "compilers", "quantum computing"]
+FIRST = ["Anna", "Ben", "Chen", "Dana", "Elif", "Farid", "Greta", "Hiro", "Ines", "Jonas",
+         "Kofi", "Lena", "Mateo", "Nora", "Omar", "Priya"]
+LAST = ["Schmidt", "Martin", "Wang", "Kowalski", "Rossi", "Tanaka", "Nguyen", "Silva",
+        "Jensen", "Okafor", "Novak", "Dubois", "Khan", "Larsen", "Moreau", "Weber"]
+
+
+def _chunks(rows: Iterator[Tuple], size: int = 5000) -> Iterator[List[Tuple]]:
+    batch: List[Tuple] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(database: Database, universities: int = 10000, professors: int = 200000,
+             emails: int = 2000, seed: int = 7) -> Dict[str, int]:
+    """
+    Fill `database` with a deterministic synthetic dataset of the given size.
+
+    Rows are spread over COUNTRIES and carry realistic research areas,
+    scores and canonical name keys so dashboard, pre-ranking and
+    entity-resolution queries see production-like data.
+    """
+    rng = random.Random(seed)
+
+    def university_rows():
+        for i in range(universities):
+            name = f"University of {rng.choice(CITIES)} {i}"
+            areas = ", ".join(rng.sample(AREAS, 3))
+            yield (name, university_key(name), COUNTRIES[i % len(COUNTRIES)], rng.randint(1, 1500),
+                   areas, rng.randint(0, 100), rng.random(), rng.choice(["verified", "needs_check"]))
+
+    for batch in _chunks(university_rows()):
+        database.executemany("""
+            INSERT INTO universities (name, name_key, country, ranking_qs, research_areas,
+                                      match_score, confidence_score, verification_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+    uni_ids = [row[0] for row in database.fetchall("SELECT id FROM universities ORDER BY id")]
+
+    def professor_rows():
+        for i in range(professors):
+            name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}"
+            yield (rng.choice(uni_ids), name, person_key(name), "Computer Science",
+                   ", ".join(rng.sample(AREAS, 2)), rng.randint(1, 5), rng.randint(0, 100))
+
+    for batch in _chunks(professor_rows()):
+        database.executemany("""
+            INSERT INTO professors (university_id, name, name_key, department, research_areas,
+                                    contact_priority, match_score)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+    prof_count = database.fetchone("SELECT COUNT(*) FROM professors")[0]
+
+    def email_rows():
+        for i in range(emails):
+            yield (rng.randint(1, prof_count), f"PhD inquiry {i}", "Dear Professor, " * 50, rng.randint(40, 100))
+
+    for batch in _chunks(email_rows()):
+        database.executemany(
+            "INSERT INTO emails (professor_id, subject, body, quality_score) VALUES (?, ?, ?, ?)", batch)
+
+    return {"universities": universities, "professors": professors, "emails": emails}
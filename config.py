@@ -1,21 +1,28 @@
 import os
 import logging
+from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 # Configure Logging
+LOG_PATH = "agent_system.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024  # rotate the log file at this size
+LOG_BACKUP_COUNT = 3
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler("agent_system.log"),
+        RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger("PhDFinder")
 
+# Live activity feed
+EVENT_BUFFER_SIZE = 1000  # most recent agent events kept in memory
+
 # API Keys
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
@@ -23,6 +30,15 @@ if not GROQ_API_KEY:
 
 # Database
 DB_PATH = "database/phd_finder.db"
+DB_POOL_SIZE = 8
+DB_POOL_TIMEOUT = 30  # seconds to wait for a free pooled connection
+DB_BUSY_TIMEOUT = 5000  # milliseconds SQLite waits on a locked database
+DB_STATEMENT_CACHE = 256  # prepared statements kept per connection
+
+# Audit trail (agent_decisions) batching
+AUDIT_BATCH_SIZE = 50
+AUDIT_FLUSH_INTERVAL = 1.0  # seconds
+AUDIT_SYNC = os.getenv("AUDIT_SYNC", "0") == "1"  # write each decision immediately
 
 # User Data
 DATA_DIR = "data"
@@ -32,16 +48,80 @@ TRANSCRIPT_PATH = os.path.join(DATA_DIR, "transcript.pdf")
 # Ensure data dir exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Document ingestion
+INGEST_PARALLEL_MIN_PAGES = 20  # PDFs at least this long are extracted in worker processes
+INGEST_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
 # Email Config
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS", "")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
 
+# Tracing
+TRACING_ENABLED = os.getenv("TRACING", "1") == "1"  # set TRACING=0 to make spans no-ops
+TRACE_BATCH_SIZE = 500  # finished spans buffered before a write
+TRACE_KEEP_RUNS = 50  # traced runs kept in trace_spans
+
+# Orchestration
+BUS_QUEUE_SIZE = 100  # pending messages per agent on the queued bus
+BUS_DEFAULT_WORKERS = 1  # worker threads per agent on the queued bus
+# I/O-bound agents get more workers so scraping/search never waits behind LLM calls
+BUS_AGENT_WORKERS = {"Research": 3, "Verification": 3, "Outreach": 2}
+ORCHESTRATOR_MAX_WORKERS = 4  # concurrent per-university tasks in run_full_flow
+ORCHESTRATOR_TASK_TIMEOUT = 180  # seconds a single task may run before it is abandoned
+RUN_HEARTBEAT_TIMEOUT = 600  # seconds without a heartbeat before an owned run counts as abandoned
+
+# Batch runner
+BATCH_WORKERS = 4  # worker processes, each with its own agent graph
+BATCH_PROGRESS_INTERVAL = 5.0  # seconds between aggregate progress reports
+
+# Entity resolution
+ENTITY_MATCH_THRESHOLD = 0.9  # minimum name similarity to merge into an existing record
+ENTITY_BLOCK_MAX_SIZE = 50  # keys compared per block; larger blocks only resolve exact matches
+
+# Local pre-ranking
+PRERANK_DIM = 1 << 18  # hashed n-gram feature space
+PRERANK_TOP_UNIVERSITIES = 5  # universities sent to the LLM per flow
+PRERANK_TOP_PROFESSORS = 3  # professors emailed per flow
+
 # LLM Settings
 MODEL_NAME = "llama-3.3-70b-versatile"  # Updated to latest Llama 3.3
+LLM_CACHE_TTL = 30 * 24 * 3600  # seconds a cached completion stays valid
+LLM_CACHE_MEMORY_SIZE = 256  # completions kept in the in-process LRU
+LLM_CACHE_MAX_ROWS = 5000  # completions kept in the llm_cache table
+LLM_BATCH_TOKEN_BUDGET = 6000  # estimated prompt tokens per batched matching request
+LLM_BATCH_MAX_ITEMS = 10  # targets scored per batched matching request
+# Groq limits for MODEL_NAME; the client stays just under them instead of tripping 429s
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "12000"))
+LLM_MAX_IN_FLIGHT = 4  # concurrent LLM calls
+LLM_MAX_RETRIES = 4  # retries for 429/5xx/connection errors
+LLM_BACKOFF_BASE = 1.0  # seconds, doubled per retry (with jitter)
+LLM_BACKOFF_MAX = 30.0  # cap on a single backoff sleep
+LLM_COMPLETION_TOKENS = 600  # completion size assumed when reserving tokens
+LLM_BREAKER_THRESHOLD = 5  # consecutive failures that open the circuit
+LLM_BREAKER_RESET = 60  # seconds the circuit stays open before a trial call
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "1") == "1"  # request JSON-object output for structured calls
+LLM_STRUCTURED_REASKS = 1  # follow-up requests for fields that still fail validation after local repair
+PROMPT_SEARCH_TOKEN_BUDGET = 1500  # estimated tokens of search results per extraction prompt
+PROMPT_SNIPPET_MAX_CHARS = 300  # snippet length kept per search result
+PROMPT_DEDUPE_THRESHOLD = 0.8  # shingle overlap above which two snippets count as duplicates
+
+# Search Settings
+SEARCH_CACHE_TTL = 3 * 24 * 3600  # seconds cached search results stay valid
+SEARCH_CACHE_MAX_ROWS = 5000  # cached queries kept; the oldest go first
+SEARCH_MAX_WORKERS = 3  # concurrent queries in WebSearch.search_many
 
 # Scraping Settings
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 TIMEOUT = 15
+SCRAPE_MAX_WORKERS = 8  # concurrent fetches across all hosts
+SCRAPE_PER_HOST_LIMIT = 2  # concurrent fetches against a single host
+SCRAPE_HOST_DELAY = 0.5  # seconds between request starts on the same host
+SCRAPE_BACKOFF_BASE = 1.0  # seconds, doubled on each retry
+BROWSER_POOL_SIZE = 3  # reusable Playwright pages for JS-heavy sites
+BROWSER_NAV_TIMEOUT = 30  # seconds per Playwright navigation
+SCRAPE_CACHE_TTL = 7 * 24 * 3600  # seconds before a cached page is revalidated
+SCRAPE_CACHE_MAX_BYTES = 200 * 1024 * 1024  # compressed bytes kept in scrape_cache
 max_retries = 3
\ No newline at end of file
@@ -0,0 +1,95 @@
+import time
+import atexit
+import threading
+from typing import Any, List, Optional, Tuple
+from database.db import Database, db
+from config import AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_SYNC, logger
+
+INSERT_DECISION = """
+    INSERT INTO agent_decisions (agent_name, task, decision, reasoning, confidence, success, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class AuditWriter:
+    """
+    Buffers agent_decisions rows and writes them in batches from a background thread.
+
+    Records are flushed with a single executemany transaction once `batch_size`
+    rows are pending or `flush_interval` seconds have passed, and on shutdown.
+    With `sync=True` every record is written immediately (used by tests).
+    """
+
+    def __init__(self, database: Database = db, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_INTERVAL, sync: bool = AUDIT_SYNC):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+        self._buffer: List[Tuple[Any, ...]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, agent_name: str, task: str, decision: str, reasoning: str,
+               confidence: float, success: bool):
+        # Timestamp at submit time so batching does not skew created_at
+        created_at = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        row = (agent_name, task, decision, reasoning, confidence, success, created_at)
+        if self.sync or self._stopped.is_set():
+            self._write([row])
+            return
+
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write every pending record now."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if rows:
+                self._write(rows)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def close(self):
+        """Stop the background thread and flush whatever is still buffered."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="AuditWriter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _write(self, rows: List[Tuple[Any, ...]]):
+        try:
+            self.database.executemany(INSERT_DECISION, rows)
+        except Exception as e:
+            logger.error(f"Failed to log {len(rows)} decision(s) to DB: {str(e)}")
+
+
+audit_writer = AuditWriter()
+atexit.register(audit_writer.close)
@@ -0,0 +1,163 @@
+import os
+import queue
+import sqlite3
+import threading
+import atexit
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from src.tracing import tracer
+from config import DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_BUSY_TIMEOUT, DB_STATEMENT_CACHE, logger
+
+# Applied to every pooled connection. WAL lets dashboard readers run alongside
+# a writer; NORMAL sync is durable in WAL mode and avoids an fsync per commit.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT}",
+)
+
+
+class Database:
+    """
+    Thread-safe pool of SQLite connections shared by all agents and the dashboard.
+
+    Connections are opened lazily up to `pool_size` and handed out LIFO so the
+    warmest connection (and its prepared statement cache) is reused first.
+    Connections run in autocommit mode; use `transaction()` for grouped writes.
+    """
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = DB_POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._watch: Optional[sqlite3.Connection] = None
+        self._watch_lock = threading.Lock()
+
+    def configure(self, path: Optional[str] = None, pool_size: Optional[int] = None):
+        """Point the pool at a different database file, closing open connections."""
+        self.close()
+        if path is not None:
+            self.path = path
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.pool_size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+        try:
+            return self._pool.get(timeout=DB_POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {DB_POOL_TIMEOUT}s")
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._pool.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for the duration of the block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, label: str = "transaction") -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a connection inside a write transaction (traced as one "db" span named `label`).
+
+        BEGIN IMMEDIATE takes the write lock up front so concurrent writers wait
+        on busy_timeout instead of failing with "database is locked" on upgrade.
+        """
+        with tracer.span("db", label), self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        """Run a single statement and commit it. Returns the cursor for lastrowid/rowcount."""
+        with tracer.span("db", sql), self.connection() as conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """Run a statement for every row inside one transaction. Returns affected rows."""
+        with self.transaction(sql) as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        with tracer.span("db", sql), self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        with tracer.span("db", sql) as span, self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            span.set(rows=len(rows))
+            return rows
+
+    def change_token(self) -> int:
+        """
+        A number that changes whenever any connection (or process) commits a write.
+
+        Backed by PRAGMA data_version on a dedicated read-only-by-convention
+        connection, which SQLite bumps for commits made by every *other*
+        connection. Cheap enough to call on every dashboard rerun.
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = self._connect()
+            return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        """Close every connection owned by the pool."""
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to close DB connection: {str(e)}")
+            self._all = []
+
+
+db = Database()
+atexit.register(db.close)
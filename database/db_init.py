@@ -1,19 +1,165 @@
-import sqlite3
 import os
-from config import DB_PATH
+import sqlite3
+from typing import Callable, List, Tuple
+from database.db import db
+from database.keys import name_key, university_key, person_key
+from config import logger
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema.sql")
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, decl: str):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _merge_duplicates(conn: sqlite3.Connection, table: str, group_by: str,
+                      child_table: str, child_column: str):
+    """Keep the lowest id per duplicate group, re-pointing child rows at it."""
+    rows = conn.execute(f"""
+        SELECT t.id, keep.id FROM {table} t
+        JOIN (SELECT MIN(id) AS id, {group_by} FROM {table}
+              WHERE name_key IS NOT NULL GROUP BY {group_by} HAVING COUNT(*) > 1) keep
+        USING ({group_by})
+        WHERE t.id != keep.id
+    """).fetchall()
+    conn.executemany(f"UPDATE {child_table} SET {child_column} = ? WHERE {child_column} = ?",
+                     [(keep, dup) for dup, keep in rows])
+    conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(dup,) for dup, _ in rows])
+    if rows:
+        logger.info(f"Merged {len(rows)} duplicate {table} row(s)")
+
+
+def _migration_1(conn: sqlite3.Connection):
+    # Validators and bookkeeping for the scrape cache
+    for column, decl in (("etag", "TEXT"), ("last_modified", "TEXT"), ("size_bytes", "INTEGER DEFAULT 0"),
+                         ("fetched_at", "REAL"), ("accessed_at", "REAL")):
+        _add_column(conn, "scrape_cache", column, decl)
+
+
+def _migration_2(conn: sqlite3.Connection):
+    # Normalized name keys with uniqueness, plus indexes for the hot queries
+    for table in ("universities", "professors"):
+        _add_column(conn, table, "name_key", "TEXT")
+        conn.executemany(f"UPDATE {table} SET name_key = ? WHERE id = ?",
+                         [(name_key(name), row_id) for row_id, name in conn.execute(f"SELECT id, name FROM {table}")])
+    _merge_duplicates(conn, "universities", "name_key", "professors", "university_id")
+    _merge_duplicates(conn, "professors", "university_id, name_key", "emails", "professor_id")
+    conn.execute("DELETE FROM entity_vectors WHERE entity_type = 'university' AND entity_id NOT IN (SELECT id FROM universities)")
+    conn.execute("DELETE FROM entity_vectors WHERE entity_type = 'professor' AND entity_id NOT IN (SELECT id FROM professors)")
+
+    for statement in (
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_universities_name_key ON universities (name_key)",
+        "CREATE INDEX IF NOT EXISTS idx_universities_country ON universities (country, name)",
+        "CREATE INDEX IF NOT EXISTS idx_universities_match_score ON universities (match_score)",
+        "CREATE INDEX IF NOT EXISTS idx_universities_verification ON universities (verification_status)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_professors_university_name_key ON professors (university_id, name_key)",
+        "CREATE INDEX IF NOT EXISTS idx_professors_contact_priority ON professors (contact_priority)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_professor ON emails (professor_id)",
+        "CREATE INDEX IF NOT EXISTS idx_agent_decisions_created_at ON agent_decisions (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_scrape_cache_accessed_at ON scrape_cache (accessed_at)",
+        "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed_at ON llm_cache (accessed_at)",
+    ):
+        conn.execute(statement)
+
+
+def _migration_3(conn: sqlite3.Connection):
+    # Canonical keys: expand university abbreviations, drop professor titles
+    conn.execute("DROP INDEX IF EXISTS ux_universities_name_key")
+    conn.execute("DROP INDEX IF EXISTS ux_professors_university_name_key")
+    for table, key_fn in (("universities", university_key), ("professors", person_key)):
+        conn.executemany(f"UPDATE {table} SET name_key = ? WHERE id = ?",
+                         [(key_fn(name), row_id) for row_id, name in conn.execute(f"SELECT id, name FROM {table}")])
+    _merge_duplicates(conn, "universities", "name_key", "professors", "university_id")
+    _merge_duplicates(conn, "professors", "university_id, name_key", "emails", "professor_id")
+    conn.execute("DELETE FROM entity_vectors WHERE entity_type = 'university' AND entity_id NOT IN (SELECT id FROM universities)")
+    conn.execute("DELETE FROM entity_vectors WHERE entity_type = 'professor' AND entity_id NOT IN (SELECT id FROM professors)")
+    conn.execute("CREATE UNIQUE INDEX ux_universities_name_key ON universities (name_key)")
+    conn.execute("CREATE UNIQUE INDEX ux_professors_university_name_key ON professors (university_id, name_key)")
+
+
+def _migration_4(conn: sqlite3.Connection):
+    # Indexed sort orders for the paginated dashboard tables
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_universities_ranking_qs ON universities (ranking_qs)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_quality ON emails (quality_score)")
+
+
+def _migration_5(conn: sqlite3.Connection):
+    # Emails remember the checkpointed run that drafted them, so a resumed run never drafts twice
+    _add_column(conn, "emails", "run_id", "INTEGER")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_emails_run_professor ON emails (run_id, professor_id)")
+
+
+def _migration_6(conn: sqlite3.Connection):
+    # Input fingerprints next to derived results, so unchanged inputs are not recomputed
+    _add_column(conn, "universities", "match_fingerprint", "TEXT")
+    _add_column(conn, "universities", "verification_fingerprint", "TEXT")
+    _add_column(conn, "professors", "fingerprint", "TEXT")
+    _add_column(conn, "emails", "fingerprint", "TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_emails_professor_fingerprint ON emails (professor_id, fingerprint)")
+
+
+def _migration_7(conn: sqlite3.Connection):
+    # The thread executing a run and when it last made progress, so live runs are not resumed twice
+    _add_column(conn, "flow_runs", "owner", "TEXT")
+    _add_column(conn, "flow_runs", "heartbeat_at", "REAL")
+
+
+def _migration_8(conn: sqlite3.Connection):
+    # Lookups added with fingerprints and run ownership that otherwise scan or sort
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_professors_university_fingerprint ON professors (university_id, fingerprint)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flow_runs_updated_at ON flow_runs (updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flow_runs_owner ON flow_runs (owner) WHERE owner IS NOT NULL")
+
+
+def _migration_9(conn: sqlite3.Connection):
+    # Search cache pruning deletes by age
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_created_at ON search_cache (created_at)")
+
+
+# (version, description, apply). Append only; each runs once per database
+# in its own transaction and bumps PRAGMA user_version.
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "scrape_cache validators", _migration_1),
+    (2, "name keys, unique constraints and hot-query indexes", _migration_2),
+    (3, "canonical university and professor name keys", _migration_3),
+    (4, "dashboard sort indexes", _migration_4),
+    (5, "email run ids for resumable flows", _migration_5),
+    (6, "input fingerprints for incremental recomputation", _migration_6),
+    (7, "flow run owners and heartbeats", _migration_7),
+    (8, "fingerprint and run ownership indexes", _migration_8),
+    (9, "search cache age index", _migration_9),
+]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations. Returns the resulting schema version."""
+    for version, description, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock so concurrent processes apply each version once
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                conn.execute("ROLLBACK")
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Applied migration {version}: {description}")
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
 
 def init_db():
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    conn = sqlite3.connect(DB_PATH)
-    with open('database/schema.sql', 'r') as f:
+    with open(SCHEMA_PATH, 'r') as f:
         schema = f.read()
-    
-    conn.executescript(schema)
-    conn.commit()
-    conn.close()
-    print(f"Database initialized at {DB_PATH}")
+
+    with db.connection() as conn:
+        conn.executescript(schema)
+        version = migrate(conn)
+    print(f"Database initialized at {db.path} (schema version {version})")
 
 if __name__ == "__main__":
     init_db()
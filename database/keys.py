@@ -0,0 +1,61 @@
+import re
+import unicodedata
+from typing import Optional
+
+# Expanded before comparing university names so common short forms collide
+UNIVERSITY_ABBREVIATIONS = {
+    "tu": "technical university",
+    "tum": "technical university munich",
+    "univ": "university",
+    "uni": "university",
+    "u": "university",
+    "inst": "institute",
+    "tech": "technology",
+    "sci": "science",
+    "natl": "national",
+    "intl": "international",
+}
+UNIVERSITY_STOPWORDS = {"the", "of", "at", "in", "and", "for"}
+# Shared by most university names, so they say nothing about which university is meant
+UNIVERSITY_GENERIC_TOKENS = {
+    "university", "universitat", "universite", "universidad", "universidade", "universita", "universiteit",
+    "technical", "technology", "technological", "institute", "college", "school", "academy", "polytechnic",
+    "science", "sciences", "applied", "national", "international", "federal", "state", "research", "center",
+    "centre", "studies",
+}
+PERSON_TITLES = {"dr", "prof", "professor", "phd", "mr", "mrs", "ms", "sir", "assoc", "asst", "emeritus"}
+
+
+def name_key(name: Optional[str]) -> Optional[str]:
+    """
+    Normalized form of a university/professor name used for uniqueness.
+
+    Case, accents, punctuation and repeated whitespace are ignored, so
+    "Universität Zürich" and "universitat  zurich" share a key. Returns
+    None for names with no usable characters so they never collide.
+    """
+    if not name:
+        return None
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    key = " ".join(re.sub(r"[^\w\s]", " ", text).split())
+    return key or None
+
+
+def university_key(name: Optional[str]) -> Optional[str]:
+    """name_key plus abbreviation expansion and stopword removal ("TU Munich" == "Technical University of Munich")."""
+    key = name_key(name)
+    if not key:
+        return None
+    tokens = []
+    for token in key.split():
+        tokens.extend(UNIVERSITY_ABBREVIATIONS.get(token, token).split())
+    return " ".join(t for t in tokens if t not in UNIVERSITY_STOPWORDS) or key
+
+
+def person_key(name: Optional[str]) -> Optional[str]:
+    """name_key without academic titles ("Prof. Dr. Jane Doe" == "Jane Doe")."""
+    key = name_key(name)
+    if not key:
+        return None
+    return " ".join(t for t in key.split() if t not in PERSON_TITLES) or key
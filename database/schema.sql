@@ -86,10 +86,134 @@ CREATE TABLE IF NOT EXISTS agent_decisions (
 
 -- Scrape Cache (Avoid redundant scraping)
 CREATE TABLE IF NOT EXISTS scrape_cache (
-    url TEXT PRIMARY KEY,
-    content TEXT,
-    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    url TEXT PRIMARY KEY, -- canonical URL (prefixed with renderer for non-HTTP fetches)
+    content TEXT, -- zlib-compressed page text
+    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    etag TEXT,
+    last_modified TEXT,
+    size_bytes INTEGER DEFAULT 0,
+    fetched_at REAL, -- unix time of last fetch or revalidation
+    accessed_at REAL
+);
+
+-- Search Cache (Avoid repeat web searches)
+CREATE TABLE IF NOT EXISTS search_cache (
+    query_key TEXT PRIMARY KEY, -- normalized query
+    query TEXT,
+    results TEXT, -- JSON list of {title, link, snippet}
+    created_at REAL
+);
+
+-- LLM Response Cache (Avoid repeat completions for identical prompts)
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY, -- sha256 of model, prompts and temperature
+    model TEXT,
+    response TEXT,
+    latency REAL, -- seconds the original call took
+    created_at REAL,
+    accessed_at REAL
+);
+
+-- Parsed Documents (CV / transcript text keyed by file content)
+CREATE TABLE IF NOT EXISTS documents (
+    content_hash TEXT PRIMARY KEY, -- sha256 of the PDF bytes
+    path TEXT,
+    page_count INTEGER,
+    text TEXT,
+    parsed_at REAL
+);
+
+-- Student Profiles (combined CV + transcript text)
+CREATE TABLE IF NOT EXISTS student_profiles (
+    profile_hash TEXT PRIMARY KEY, -- sha256 of the input document hashes
+    cv_hash TEXT,
+    transcript_hash TEXT,
+    text TEXT,
+    created_at REAL
+);
+
+-- Entity Vectors (Local pre-ranking, sparse hashed TF vectors)
+CREATE TABLE IF NOT EXISTS entity_vectors (
+    entity_type TEXT NOT NULL, -- 'university' or 'professor'
+    entity_id INTEGER NOT NULL,
+    text_hash TEXT NOT NULL, -- sha1 of the text that was vectorized
+    indices BLOB, -- int32 feature indices
+    tf BLOB, -- float32 term frequencies
+    PRIMARY KEY (entity_type, entity_id)
+);
+
+-- Flow Runs (checkpointed run_full_flow executions)
+CREATE TABLE IF NOT EXISTS flow_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    country TEXT NOT NULL,
+    student_profile TEXT,
+    status TEXT NOT NULL DEFAULT 'running', -- 'running', 'done', 'failed'
+    phase TEXT, -- last phase entered
+    shortlist TEXT, -- JSON [[university_id, name], ...] frozen on the first pass
+    professor_shortlist TEXT, -- JSON [[professor_id, name], ...]
+    error TEXT,
+    created_at REAL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_flow_runs_status ON flow_runs (status, updated_at);
+
+-- Flow Tasks (one row per bus message of a run; the unit of resumption)
+CREATE TABLE IF NOT EXISTS flow_tasks (
+    run_id INTEGER NOT NULL,
+    label TEXT NOT NULL, -- 'discover', 'match', 'verify:<id>', 'professors:<id>', 'email:<id>'
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'running', 'done', 'failed'
+    result TEXT, -- JSON response of the agent
+    error TEXT,
+    attempts INTEGER DEFAULT 0,
+    updated_at REAL,
+    PRIMARY KEY (run_id, label),
+    FOREIGN KEY (run_id) REFERENCES flow_runs (id)
+);
+
+-- Trace Spans (per-run timing of bus messages, agents, LLM calls, search, scraping, queries)
+CREATE TABLE IF NOT EXISTS trace_spans (
+    trace_id TEXT NOT NULL, -- one per run_full_flow
+    span_id TEXT PRIMARY KEY,
+    parent_id TEXT, -- NULL for the run's root span
+    kind TEXT NOT NULL, -- 'run', 'bus', 'agent', 'llm', 'search', 'scrape', 'db'
+    name TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    duration_ms REAL NOT NULL,
+    attributes TEXT, -- JSON
+    status TEXT -- 'ok' or 'error'
+);
+CREATE INDEX IF NOT EXISTS idx_trace_spans_trace ON trace_spans (trace_id, kind);
+CREATE INDEX IF NOT EXISTS idx_trace_spans_roots ON trace_spans (parent_id, start_time);
+
+-- Batch Runs (headless multi-country runs of the batch runner)
+CREATE TABLE IF NOT EXISTS batch_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL DEFAULT 'running', -- 'running', 'done', 'failed'
+    force_refresh INTEGER DEFAULT 0,
+    created_at REAL,
+    finished_at REAL
+);
+
+-- Batch Jobs (one country/profile pair; claimed by one worker process at a time)
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id INTEGER NOT NULL,
+    country TEXT NOT NULL,
+    profile_name TEXT,
+    student_profile TEXT,
+    status TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'running', 'done', 'failed'
+    worker INTEGER, -- index of the claiming worker process
+    run_id INTEGER, -- flow_runs row, kept so a retried job resumes its run
+    result TEXT, -- JSON summary of the run
+    error TEXT,
+    attempts INTEGER DEFAULT 0,
+    started_at REAL,
+    finished_at REAL,
+    FOREIGN KEY (batch_id) REFERENCES batch_runs (id),
+    FOREIGN KEY (run_id) REFERENCES flow_runs (id)
 );
+CREATE INDEX IF NOT EXISTS idx_batch_jobs_batch ON batch_jobs (batch_id, status);
 
 -- User Preferences (Learning Agent)
 CREATE TABLE IF NOT EXISTS user_preferences (
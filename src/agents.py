@@ -1,11 +1,31 @@
 from abc import ABC, abstractmethod
 import json
-import sqlite3
+import queue
 import logging
-from typing import Dict, Any, List
-from config import DB_PATH, logger
+import functools
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from database.audit import audit_writer
+from src.events import events
+from src.tracing import tracer
+from config import BUS_QUEUE_SIZE, BUS_DEFAULT_WORKERS, logger
+
+def _traced_process(process):
+    @functools.wraps(process)
+    def wrapper(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        with tracer.span("agent", self.name, action=message.get("action")):
+            return process(self, message)
+    return wrapper
+
 
 class Agent(ABC):
+    def __init_subclass__(cls, **kwargs):
+        # Every concrete process() is traced as an "agent" span
+        super().__init_subclass__(**kwargs)
+        if "process" in cls.__dict__:
+            cls.process = _traced_process(cls.__dict__["process"])
+
     def __init__(self, name: str, orchestrator=None):
         self.name = name
         self.orchestrator = orchestrator
@@ -22,18 +42,9 @@ class Agent(ABC):
         }
         self.history.append(decision_entry)
         
-        # Persistent logging to DB
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO agent_decisions (agent_name, task, decision, reasoning, confidence, success)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (self.name, task, decision, reasoning, confidence, success))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.error(f"Failed to log decision to DB: {str(e)}")
+        # Persistent logging to DB (batched off the critical path)
+        audit_writer.submit(self.name, task, decision, reasoning, confidence, success)
+        events.publish("decision", decision, agent=self.name, task=task, confidence=confidence, success=success)
 
         logger.info(f"[{self.name}] {decision} (Conf: {confidence})")
 
@@ -51,4 +62,104 @@ class MessageBus:
     def send_message(self, recipient_name: str, message: Dict[str, Any]) -> Dict[str, Any]:
         if recipient_name not in self.agents:
             raise ValueError(f"Agent {recipient_name} not found")
-        return self.agents[recipient_name].process(message)
+        with tracer.span("bus", recipient_name, action=message.get("action")):
+            return self.agents[recipient_name].process(message)
+
+
+class BusFullError(RuntimeError):
+    """Raised when an agent's queue stays full for longer than the submit timeout."""
+
+
+class QueuedMessageBus(MessageBus):
+    """
+    MessageBus that queues work per agent and processes it on worker threads.
+
+    Each registered agent gets a bounded queue and its own pool of workers,
+    so I/O-bound agents can run in parallel with LLM-bound ones. `submit`
+    returns a Future; when a queue is full it blocks (backpressure) and
+    raises BusFullError after `timeout`. `send_message` keeps the
+    synchronous request/response API of MessageBus.
+    """
+
+    def __init__(self, queue_size: int = BUS_QUEUE_SIZE, default_workers: int = BUS_DEFAULT_WORKERS):
+        super().__init__()
+        self.queue_size = queue_size
+        self.default_workers = default_workers
+        self._queues: Dict[str, "queue.Queue[Optional[Tuple[Future, Callable, Dict[str, Any]]]]"] = {}
+        self._workers: Dict[str, List[threading.Thread]] = {}
+
+    def register_agent(self, agent: Agent, workers: Optional[int] = None):
+        if agent.name in self._queues:
+            raise ValueError(f"Agent {agent.name} already registered")
+        super().register_agent(agent)
+        inbox: "queue.Queue[Optional[Tuple[Future, Callable, Dict[str, Any]]]]" = queue.Queue(maxsize=self.queue_size)
+        self._queues[agent.name] = inbox
+        self._workers[agent.name] = []
+        for i in range(workers or self.default_workers):
+            thread = threading.Thread(target=self._work, args=(agent, inbox),
+                                      name=f"{agent.name}-worker-{i}", daemon=True)
+            thread.start()
+            self._workers[agent.name].append(thread)
+
+    def _work(self, agent: Agent, inbox: "queue.Queue"):
+        while True:
+            item = inbox.get()
+            try:
+                if item is None:
+                    return
+                future, process, message = item
+                # Skip messages whose caller cancelled them while queued
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(process(message))
+                except BaseException as e:
+                    logger.error(f"[{agent.name}] failed to process message: {str(e)}")
+                    future.set_exception(e)
+            finally:
+                inbox.task_done()
+
+    def submit(self, recipient_name: str, message: Dict[str, Any], timeout: Optional[float] = None) -> Future:
+        """Queue a message for an agent and return a Future for its response."""
+        if recipient_name not in self._queues:
+            raise ValueError(f"Agent {recipient_name} not found")
+        future: Future = Future()
+        try:
+            # The sender's trace context travels with the message to the worker thread
+            process = tracer.wrap(self.agents[recipient_name].process)
+            self._queues[recipient_name].put((future, process, message), timeout=timeout)
+        except queue.Full:
+            raise BusFullError(f"Queue for agent {recipient_name} is full")
+        return future
+
+    def send_message(self, recipient_name: str, message: Dict[str, Any],
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        with tracer.span("bus", recipient_name, action=message.get("action")):
+            future = self.submit(recipient_name, message, timeout=timeout)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeout:
+                future.cancel()
+                raise
+
+    def pending(self, recipient_name: str) -> int:
+        return self._queues[recipient_name].qsize()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop all workers once their queues drain (or after cancelling what is queued)."""
+        for name, inbox in self._queues.items():
+            if cancel_pending:
+                while True:
+                    try:
+                        item = inbox.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+                    inbox.task_done()
+            for _ in self._workers[name]:
+                inbox.put(None)
+        if wait:
+            for threads in self._workers.values():
+                for thread in threads:
+                    thread.join()
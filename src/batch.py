@@ -0,0 +1,411 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.agents import MessageBus, QueuedMessageBus
+from src.orchestrator import OrchestratorAgent
+from src.research import ResearchAgent
+from src.verification import VerificationAgent
+from src.outreach import OutreachAgent
+from src.learning import LearningAgent
+from src.tools import WebSearch, WebScraper, RankingCalculator
+from src.llm_utils import llm
+from src.rate_limit import LLMRateLimiter
+from src.tracing import tracer
+from src.run_store import RunStore, PENDING, RUNNING, DONE, FAILED
+from database.db import Database, db
+from database.db_init import init_db
+from database.audit import audit_writer
+from config import (BATCH_WORKERS, BATCH_PROGRESS_INTERVAL, BUS_AGENT_WORKERS,
+                    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LOG_PATH, logger)
+
+# (country, profile name, student profile)
+Job = Tuple[str, str, str]
+
+
+def build_agent_graph(queued: bool = True) -> Tuple[OrchestratorAgent, MessageBus]:
+    """Create a bus with the full set of agents registered on it."""
+    bus = QueuedMessageBus() if queued else MessageBus()
+    orchestrator = OrchestratorAgent(bus)
+    agents = (ResearchAgent(WebSearch(), WebScraper(), RankingCalculator()), VerificationAgent(),
+              OutreachAgent(), LearningAgent(), orchestrator)
+    for agent in agents:
+        if queued:
+            bus.register_agent(agent, workers=BUS_AGENT_WORKERS.get(agent.name))
+        else:
+            bus.register_agent(agent)
+    return orchestrator, bus
+
+
+class BatchStore:
+    """
+    Job table shared by the batch runner and its worker processes.
+
+    Workers pull jobs by claiming them inside a BEGIN IMMEDIATE transaction,
+    so each pending job goes to exactly one process however many run
+    against the same database. A job remembers the flow run it started,
+    which lets a retried job resume that run instead of starting over.
+    """
+
+    def __init__(self, database: Database = db):
+        self.database = database
+
+    def create_batch(self, jobs: List[Job], force_refresh: bool = False) -> int:
+        with self.database.transaction("create batch") as conn:
+            batch_id = conn.execute("INSERT INTO batch_runs (force_refresh, created_at) VALUES (?, ?)",
+                                    (int(force_refresh), time.time())).lastrowid
+            conn.executemany("""
+                INSERT INTO batch_jobs (batch_id, country, profile_name, student_profile) VALUES (?, ?, ?, ?)
+            """, [(batch_id, country, name, profile) for country, name, profile in jobs])
+        return batch_id
+
+    def get_batch(self, batch_id: int) -> Optional[Dict[str, Any]]:
+        row = self.database.fetchone("SELECT id, status, force_refresh, created_at FROM batch_runs WHERE id = ?",
+                                     (batch_id,))
+        if not row:
+            return None
+        return {"id": row[0], "status": row[1], "force_refresh": bool(row[2]), "created_at": row[3]}
+
+    def claim(self, batch_id: int, worker: int) -> Optional[Dict[str, Any]]:
+        """Atomically take the next pending job of the batch, or None when there is none left."""
+        with self.database.transaction("claim batch job") as conn:
+            row = conn.execute("""
+                SELECT id, country, profile_name, student_profile, run_id FROM batch_jobs
+                WHERE batch_id = ? AND status = 'pending' ORDER BY id LIMIT 1
+            """, (batch_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""
+                UPDATE batch_jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                                      started_at = ?, finished_at = NULL, error = NULL
+                WHERE id = ?
+            """, (worker, time.time(), row[0]))
+        return dict(zip(("id", "country", "profile_name", "student_profile", "run_id"), row))
+
+    def attach_run(self, job_id: int, run_id: int):
+        self.database.execute("UPDATE batch_jobs SET run_id = ? WHERE id = ?", (run_id, job_id))
+
+    def finish(self, job_id: int, summary: Dict[str, Any]):
+        """Store a job's run summary; anything but a fully successful run marks it failed."""
+        failed = summary.get("status") != "success"
+        self.database.execute("""
+            UPDATE batch_jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?
+        """, (FAILED if failed else DONE, json.dumps(summary, default=str),
+              summary.get("message") if failed else None, time.time(), job_id))
+
+    def release_worker(self, batch_id: int, worker: int, error: str) -> int:
+        """Fail the jobs a dead worker process left running. Returns how many."""
+        return self.database.execute("""
+            UPDATE batch_jobs SET status = 'failed', error = ?, finished_at = ?
+            WHERE batch_id = ? AND worker = ? AND status = 'running'
+        """, (error, time.time(), batch_id, worker)).rowcount
+
+    def reset_interrupted(self, batch_id: int, retry_failed: bool = True) -> int:
+        """Put running (and optionally failed) jobs back to pending. Returns how many."""
+        statuses = (RUNNING, FAILED) if retry_failed else (RUNNING,)
+        return self.database.execute(f"""
+            UPDATE batch_jobs SET status = 'pending', worker = NULL
+            WHERE batch_id = ? AND status IN ({",".join("?" for _ in statuses)})
+        """, (batch_id, *statuses)).rowcount
+
+    def finish_batch(self, batch_id: int) -> str:
+        counts = self.progress(batch_id)
+        status = DONE if counts[DONE] == counts["total"] else FAILED
+        self.database.execute("UPDATE batch_runs SET status = ?, finished_at = ? WHERE id = ?",
+                              (status, time.time(), batch_id))
+        return status
+
+    def progress(self, batch_id: int, since: float = 0.0) -> Dict[str, Any]:
+        """Job counts by status plus totals of the finished runs; `finished_since` counts jobs finished after `since`."""
+        counts: Dict[str, Any] = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0, "total": 0, "finished_since": 0,
+                                  "universities": 0, "professors": 0, "emails": 0}
+        for status, jobs, recent, universities, professors, emails in self.database.fetchall("""
+            SELECT status, COUNT(*), SUM(finished_at >= ?),
+                   SUM(json_extract(result, '$.universities')), SUM(json_extract(result, '$.professors')),
+                   SUM(json_extract(result, '$.emails'))
+            FROM batch_jobs WHERE batch_id = ? GROUP BY status
+        """, (since, batch_id)):
+            counts[status] = jobs
+            counts["total"] += jobs
+            counts["finished_since"] += recent or 0
+            counts["universities"] += universities or 0
+            counts["professors"] += professors or 0
+            counts["emails"] += emails or 0
+        return counts
+
+    def jobs(self, batch_id: int) -> List[Dict[str, Any]]:
+        rows = self.database.fetchall("""
+            SELECT id, country, profile_name, status, worker, run_id, error, attempts FROM batch_jobs
+            WHERE batch_id = ? ORDER BY id
+        """, (batch_id,))
+        return [dict(zip(("id", "country", "profile_name", "status", "worker", "run_id", "error", "attempts"), row))
+                for row in rows]
+
+
+def run_job(orchestrator: OrchestratorAgent, store: BatchStore, job: Dict[str, Any],
+            force_refresh: bool = False) -> Dict[str, Any]:
+    """Run (or resume) one job's flow and return the summary stored for it."""
+    started = time.monotonic()
+    run_id = job["run_id"]
+    run = orchestrator.runs.get_run(run_id) if run_id else None
+    try:
+        if run and run["status"] != DONE:
+            result = orchestrator.resume_flow(run_id, force_refresh=force_refresh)
+        else:
+            run_id = orchestrator.runs.create_run(job["country"], job["student_profile"])
+            store.attach_run(job["id"], run_id)
+            result = orchestrator.run_full_flow(job["country"], job["student_profile"], run_id=run_id,
+                                                force_refresh=force_refresh)
+    except Exception as e:
+        logger.error(f"❌ Batch job {job['id']} ({job['country']}) crashed: {str(e)}")
+        result = {"status": "error", "message": str(e)}
+
+    data = result.get("data") or {}
+    return {
+        "status": result.get("status"),
+        "message": result.get("message"),
+        "run_id": result.get("run_id", run_id),
+        "universities": len(data.get("universities") or []),
+        "professors": len(data.get("professors") or []),
+        "emails": sum(1 for email in data.get("emails") or [] if isinstance(email, dict) and email.get("subject")),
+        "failed_tasks": len(result.get("failed_tasks") or []),
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def work(orchestrator: OrchestratorAgent, store: BatchStore, batch_id: int, worker: int,
+         force_refresh: bool = False) -> int:
+    """Claim and run jobs until the batch has none pending. Returns how many this worker ran."""
+    ran = 0
+    while True:
+        job = store.claim(batch_id, worker)
+        if job is None:
+            return ran
+        logger.info(f"🌍 Worker {worker}: {job['country']} / {job['profile_name']} (job {job['id']})")
+        store.finish(job["id"], run_job(orchestrator, store, job, force_refresh))
+        ran += 1
+
+
+def use_worker_log(worker: int, target: Optional[logging.Logger] = None):
+    """
+    Move `target`'s (default: root) rotating log file to a per-worker one, `<file>.worker<N>`.
+
+    Every spawned worker re-imports config and would otherwise rotate the
+    parent's log file concurrently, which corrupts it (and fails on Windows).
+    """
+    target = target or logging.getLogger()
+    for handler in list(target.handlers):
+        if isinstance(handler, RotatingFileHandler):
+            target.removeHandler(handler)
+            handler.close()
+            own = RotatingFileHandler(f"{handler.baseFilename}.worker{worker}", maxBytes=handler.maxBytes,
+                                      backupCount=handler.backupCount, encoding="utf-8")
+            own.setFormatter(handler.formatter)
+            target.addHandler(own)
+
+
+def _worker_main(db_path: str, batch_id: int, worker: int, workers: int, force_refresh: bool,
+                 queued_bus: bool, log_level: int):
+    """Entry point of a worker process: its own log file, DB pool, rate limiter and agent graph."""
+    use_worker_log(worker)
+    logger.setLevel(log_level)
+    db.configure(db_path)
+    # The API quota is shared by every worker, so each gets an equal slice of it
+    llm.limiter = LLMRateLimiter(requests_per_minute=max(LLM_REQUESTS_PER_MINUTE // workers, 1),
+                                 tokens_per_minute=max(LLM_TOKENS_PER_MINUTE // workers, 1))
+    orchestrator, bus = build_agent_graph(queued_bus)
+    try:
+        work(orchestrator, BatchStore(), batch_id, worker, force_refresh)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if isinstance(bus, QueuedMessageBus):
+            bus.shutdown(wait=False, cancel_pending=True)
+        audit_writer.flush()
+        tracer.flush()
+
+
+def format_progress(progress: Dict[str, Any], elapsed: float) -> str:
+    finished = progress[DONE] + progress[FAILED]
+    rate = progress["finished_since"] / elapsed * 60 if elapsed > 0 else 0.0
+    remaining = progress[PENDING] + progress[RUNNING]
+    eta = f"{remaining / rate:.1f} min" if rate > 0 and remaining else "-"
+    return (f"[{elapsed:7.1f}s] {finished}/{progress['total']} jobs "
+            f"({progress[DONE]} done, {progress[FAILED]} failed, {progress[RUNNING]} running) · "
+            f"{rate:.2f} jobs/min · {progress['emails']} emails · ETA {eta}")
+
+
+class BatchRunner:
+    """
+    Runs many country/profile flows headlessly, sharded over worker processes.
+
+    Each worker process builds its own agent graph, database pool and LLM
+    rate limiter (with 1/N of the configured quota) and pulls jobs from the
+    batch_jobs table until none are pending, so slow countries never hold
+    back a fixed shard. The parent only creates the batch, watches the
+    workers and reports aggregate progress. With `workers=0` jobs run in
+    this process, which is handy for debugging.
+    """
+
+    def __init__(self, workers: int = BATCH_WORKERS, progress_interval: float = BATCH_PROGRESS_INTERVAL,
+                 queued_bus: bool = True, force_refresh: bool = False, database: Database = db):
+        self.workers = workers
+        self.progress_interval = progress_interval
+        self.queued_bus = queued_bus
+        self.force_refresh = force_refresh
+        self.database = database
+        self.store = BatchStore(database)
+
+    def run(self, jobs: Optional[List[Job]] = None, batch_id: Optional[int] = None,
+            on_progress: Optional[Callable[[Dict[str, Any], float], None]] = None) -> Dict[str, Any]:
+        """Start a batch from `jobs`, or continue batch `batch_id`, and wait for it to finish."""
+        init_db()
+        released = RunStore(self.database).release_dead_owners()
+        if released:
+            logger.info(f"🔓 Released {released} run(s) left owned by dead processes")
+        if batch_id is None:
+            batch_id = self.store.create_batch(jobs or [], self.force_refresh)
+            logger.info(f"📦 Batch {batch_id}: {len(jobs or [])} job(s) over {self.workers} worker(s)")
+        else:
+            batch = self.store.get_batch(batch_id)
+            if not batch:
+                return {"status": "error", "message": f"Batch {batch_id} not found", "batch_id": batch_id}
+            self.force_refresh = self.force_refresh or batch["force_refresh"]
+            requeued = self.store.reset_interrupted(batch_id)
+            logger.info(f"▶️ Resuming batch {batch_id} ({requeued} job(s) requeued)")
+
+        started_at, clock = time.time(), time.monotonic()
+        report = on_progress or (lambda progress, elapsed: None)
+        if self.workers <= 0:
+            orchestrator, bus = build_agent_graph(self.queued_bus)
+            try:
+                work(orchestrator, self.store, batch_id, 0, self.force_refresh)
+            finally:
+                if isinstance(bus, QueuedMessageBus):
+                    bus.shutdown()
+        else:
+            self._run_workers(batch_id, started_at, clock, report)
+
+        progress = self.store.progress(batch_id, since=started_at)
+        elapsed = time.monotonic() - clock
+        if self.workers <= 0:
+            report(progress, elapsed)
+        return {
+            "status": self.store.finish_batch(batch_id),
+            "batch_id": batch_id,
+            "elapsed_s": round(elapsed, 2),
+            "jobs_per_min": round(progress["finished_since"] / elapsed * 60, 2) if elapsed > 0 else 0.0,
+            **progress,
+        }
+
+    def _run_workers(self, batch_id: int, started_at: float, clock: float,
+                     report: Callable[[Dict[str, Any], float], None]):
+        pending = self.store.progress(batch_id)[PENDING]
+        count = min(self.workers, pending)
+        # Spawned (not forked) so no worker inherits the parent's connections or threads
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_worker_main, name=f"BatchWorker-{worker}",
+                                     args=(os.path.abspath(self.database.path), batch_id, worker, count,
+                                           self.force_refresh, self.queued_bus, logger.level))
+                     for worker in range(count)]
+        for process in processes:
+            process.start()
+        logger.info(f"🧵 Started {count} worker process(es); each logs to {LOG_PATH}.worker<N>")
+        live = dict(enumerate(processes))
+        try:
+            while live:
+                deadline = time.monotonic() + self.progress_interval
+                while live and time.monotonic() < deadline:
+                    for worker, process in list(live.items()):
+                        process.join(timeout=0.2)
+                        if process.exitcode is None:
+                            continue
+                        del live[worker]
+                        if process.exitcode != 0:
+                            lost = self.store.release_worker(batch_id, worker,
+                                                             f"Worker {worker} exited with code {process.exitcode}")
+                            logger.error(f"❌ Batch worker {worker} exited with code {process.exitcode} "
+                                         f"({lost} job(s) failed)")
+                report(self.store.progress(batch_id, since=started_at), time.monotonic() - clock)
+        except KeyboardInterrupt:
+            logger.warning(f"⏹ Interrupted; stopping workers. Resume with --resume {batch_id}")
+            for process in live.values():
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+            self.store.reset_interrupted(batch_id, retry_failed=False)
+            raise
+
+
+def _read_lines(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def load_profile(path: str) -> str:
+    """Profile text from a .txt/.md file, or parsed from a CV PDF."""
+    if path.lower().endswith(".pdf"):
+        from src.tools import CVParser
+        return CVParser().parse_profile(path)
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.batch",
+                                     description="Run the PhD search flow for many countries and profiles.")
+    parser.add_argument("countries", nargs="*", help="countries to search")
+    parser.add_argument("--countries-file", help="file with one country per line")
+    parser.add_argument("--profile", action="append", default=[], help="student profile text (repeatable)")
+    parser.add_argument("--profile-file", action="append", default=[],
+                        help="profile .txt/.md or CV .pdf (repeatable); every country runs for every profile")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="worker processes (0 runs jobs in this process)")
+    parser.add_argument("--resume", type=int, metavar="BATCH_ID", help="continue an earlier batch")
+    parser.add_argument("--force-refresh", action="store_true", help="recompute results with unchanged inputs")
+    parser.add_argument("--direct-bus", action="store_true", help="use the synchronous MessageBus in workers")
+    parser.add_argument("--progress-interval", type=float, default=BATCH_PROGRESS_INTERVAL)
+    parser.add_argument("--db", help="database file (default: the configured DB_PATH)")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings from the agents")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        db.configure(args.db)
+    if args.quiet:
+        logger.setLevel(logging.WARNING)
+
+    jobs: List[Job] = []
+    if args.resume is None:
+        countries = args.countries + (_read_lines(args.countries_file) if args.countries_file else [])
+        profiles = [(f"profile{i}", text) for i, text in enumerate(args.profile, 1)]
+        profiles += [(os.path.splitext(os.path.basename(path))[0], load_profile(path)) for path in args.profile_file]
+        if not countries or not profiles:
+            parser.error("give at least one country and one --profile/--profile-file (or --resume)")
+        jobs = [(country, name, text) for name, text in profiles for country in countries]
+
+    runner = BatchRunner(workers=args.workers, progress_interval=args.progress_interval,
+                         queued_bus=not args.direct_bus, force_refresh=args.force_refresh)
+    summary = runner.run(jobs, batch_id=args.resume,
+                         on_progress=lambda progress, elapsed: print(format_progress(progress, elapsed), flush=True))
+    if summary["status"] == "error":
+        print(summary["message"], file=sys.stderr)
+        return 2
+
+    failed = [job for job in runner.store.jobs(summary["batch_id"]) if job["status"] != DONE]
+    for job in failed:
+        print(f"FAILED {job['country']} / {job['profile_name']} (run {job['run_id']}): {job['error']}")
+    print(f"\nBatch {summary['batch_id']} {summary['status']}: {summary[DONE]}/{summary['total']} jobs in "
+          f"{summary['elapsed_s']:.1f}s ({summary['jobs_per_min']:.2f} jobs/min), "
+          f"{summary['universities']} universities, {summary['emails']} emails")
+    if failed:
+        print(f"Retry the failed jobs with: python -m src.batch --resume {summary['batch_id']}")
+    return 0 if summary["status"] == DONE else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
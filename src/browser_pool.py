@@ -0,0 +1,145 @@
+import atexit
+import asyncio
+import threading
+from typing import Optional
+from config import HEADERS, BROWSER_POOL_SIZE, BROWSER_NAV_TIMEOUT, logger
+
+# Resource types that never affect the page text we extract
+BLOCKED_RESOURCES = {"image", "font", "media"}
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium shared by every Playwright scrape.
+
+    Playwright objects must stay on the thread that created them, so the pool
+    owns a private event loop thread and runs the async API there; `fetch` is
+    safe to call from any thread. A bounded set of pages (each in its own
+    context) is reused across requests, and images, fonts and media are
+    aborted before they are downloaded.
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, headless: bool = True,
+                 timeout: float = BROWSER_NAV_TIMEOUT):
+        self.size = size
+        self.headless = headless
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._playwright = None
+        self._browser = None
+        self._pages: Optional[asyncio.Queue] = None
+        # Pages owned by the pool, in the queue or out on a fetch
+        self._live = 0
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return
+            from playwright.async_api import async_playwright
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="BrowserPool", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(async_playwright), loop).result()
+            except BaseException:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                raise
+            self._loop, self._thread = loop, thread
+            logger.info(f"Browser pool started with {self.size} pages")
+
+    async def _start(self, async_playwright):
+        self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            await self._pages.put(await self._new_page(browser))
+        self._live = self.size
+        self._browser = browser
+
+    async def _new_page(self, browser):
+        context = await browser.new_context(user_agent=HEADERS['User-Agent'])
+        await context.route("**/*", self._filter_request)
+        page = await context.new_page()
+        page.set_default_navigation_timeout(self.timeout * 1000)
+        return page
+
+    @staticmethod
+    async def _filter_request(route):
+        if route.request.resource_type in BLOCKED_RESOURCES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _replace(self, page):
+        """
+        Close a possibly wedged page and open a clean one in its place.
+
+        Returns None, shrinking the pool, when no new page can be opened; the
+        old page is never handed back.
+        """
+        try:
+            await page.context.close()
+        except Exception as e:
+            logger.warning(f"Closing a failed browser page raised: {str(e)}")
+        try:
+            return await self._new_page(self._browser)
+        except Exception as e:
+            self._live -= 1
+            logger.error(f"Could not replace browser page, pool down to {self._live}: {str(e)}")
+            return None
+
+    async def _fetch(self, url: str) -> str:
+        if self._live == 0:
+            # Every page was lost to failed replacements; open one on demand
+            await self._pages.put(await self._new_page(self._browser))
+            self._live += 1
+        page = await self._pages.get()
+        try:
+            await page.goto(url)
+            return await page.content()
+        except Exception:
+            # The page may be wedged mid-navigation; swap in a clean one
+            page = await self._replace(page)
+            raise
+        finally:
+            if page is not None:
+                await self._pages.put(page)
+
+    def fetch(self, url: str) -> str:
+        """Render `url` in a pooled page and return the resulting HTML."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._fetch(url), self._loop).result()
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = self._pages = None
+        self._live = 0
+
+    def close(self):
+        """Close the browser and stop the pool's event loop thread."""
+        with self._lock:
+            if self._loop is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            except Exception as e:
+                logger.error(f"Browser pool shutdown failed: {str(e)}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = self._thread = None
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
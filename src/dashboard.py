@@ -0,0 +1,117 @@
+from typing import Any, Dict, List, Optional, Tuple
+from database.db import Database, db
+
+# Sortable columns per table, mapped to indexed SQL expressions. Only
+# whitelisted names ever reach the ORDER BY clause.
+UNIVERSITY_SORTS = {"Match %": "match_score", "Rank": "ranking_qs"}
+PROFESSOR_SORTS = {"Priority": "p.contact_priority"}
+EMAIL_SORTS = {"Newest": "e.id", "Quality": "e.quality_score"}
+
+
+def _rows(database: Database, sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+    with database.connection() as conn:
+        cursor = conn.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _order_by(sorts: Dict[str, str], sort: str, descending: bool, id_column: str = "id") -> str:
+    column = sorts.get(sort, next(iter(sorts.values())))
+    direction = "DESC" if descending else "ASC"
+    # id as a tiebreaker keeps pages stable when many rows share a score
+    return f"ORDER BY {column} {direction}, {id_column} {direction}"
+
+
+def metrics(database: Database = db) -> Dict[str, int]:
+    """All dashboard counters in a single round trip."""
+    row = database.fetchone("""
+        SELECT
+            (SELECT count(*) FROM universities),
+            (SELECT count(*) FROM professors),
+            (SELECT count(*) FROM emails),
+            (SELECT count(*) FROM universities WHERE verification_status = 'verified')
+    """)
+    return dict(zip(("universities", "professors", "emails", "verified"), row))
+
+
+def universities_page(page: int, page_size: int, sort: str = "Match %", descending: bool = True,
+                      database: Database = db) -> List[Dict[str, Any]]:
+    return _rows(database, f"""
+        SELECT name, ranking_qs as 'Rank', match_score as 'Match %', 
+               verification_status as 'Status', match_reasoning as 'Reasoning'
+        FROM universities 
+        {_order_by(UNIVERSITY_SORTS, sort, descending)}
+        LIMIT ? OFFSET ?
+    """, (page_size, page * page_size))
+
+
+def professors_page(page: int, page_size: int, sort: str = "Priority", descending: bool = True,
+                    database: Database = db) -> List[Dict[str, Any]]:
+    return _rows(database, f"""
+        SELECT p.name, u.name as 'University', p.department, p.contact_priority as 'Priority', p.accepting_students as 'Recruiting'
+        FROM professors p
+        JOIN universities u ON p.university_id = u.id
+        {_order_by(PROFESSOR_SORTS, sort, descending, "p.id")}
+        LIMIT ? OFFSET ?
+    """, (page_size, page * page_size))
+
+
+def emails_page(page: int, page_size: int, sort: str = "Newest", descending: bool = True,
+                database: Database = db) -> List[Dict[str, Any]]:
+    """Email headers only; bodies are fetched one at a time with email_body."""
+    return _rows(database, f"""
+        SELECT e.id, p.name as 'Professor', e.subject, e.quality_score as 'Quality'
+        FROM emails e
+        JOIN professors p ON e.professor_id = p.id
+        {_order_by(EMAIL_SORTS, sort, descending, "e.id")}
+        LIMIT ? OFFSET ?
+    """, (page_size, page * page_size))
+
+
+def email_body(email_id: int, database: Database = db) -> Optional[str]:
+    row = database.fetchone("SELECT body FROM emails WHERE id = ?", (email_id,))
+    return row[0] if row else None
+
+
+def email_professor(email_id: int, database: Database = db) -> Optional[int]:
+    row = database.fetchone("SELECT professor_id FROM emails WHERE id = ?", (email_id,))
+    return row[0] if row else None
+
+
+def recent_decisions(limit: int = 20, database: Database = db) -> List[Dict[str, Any]]:
+    return _rows(database, """
+        SELECT agent_name as 'Agent', task, decision, reasoning 
+        FROM agent_decisions 
+        ORDER BY created_at DESC 
+        LIMIT ?
+    """, (limit,))
+
+
+def recent_traces(limit: int = 10, database: Database = db) -> List[Dict[str, Any]]:
+    """Root spans of the latest traced runs, newest first."""
+    return _rows(database, """
+        SELECT trace_id, name, start_time, duration_ms, status
+        FROM trace_spans
+        WHERE parent_id IS NULL
+        ORDER BY start_time DESC
+        LIMIT ?
+    """, (limit,))
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def trace_summary(trace_id: str, database: Database = db) -> List[Dict[str, Any]]:
+    """Count, total, p50, p95 and max duration (ms) of a run's spans, per span kind."""
+    durations: Dict[str, List[float]] = {}
+    for kind, duration in database.fetchall(
+            "SELECT kind, duration_ms FROM trace_spans WHERE trace_id = ?", (trace_id,)):
+        durations.setdefault(kind, []).append(duration)
+    summary = []
+    for kind, values in durations.items():
+        values.sort()
+        summary.append({"Span": kind, "Count": len(values), "Total ms": round(sum(values), 1),
+                        "p50 ms": round(_percentile(values, 0.5), 1), "p95 ms": round(_percentile(values, 0.95), 1),
+                        "Max ms": round(values[-1], 1)})
+    return sorted(summary, key=lambda row: row["Total ms"], reverse=True)
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from difflib import SequenceMatcher, get_close_matches
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from database.db import Database, db
+from database.keys import university_key, person_key, UNIVERSITY_GENERIC_TOKENS
+from config import ENTITY_MATCH_THRESHOLD, ENTITY_BLOCK_MAX_SIZE, logger
+
+
+def similarity(a: str, b: str) -> float:
+    """Best of character-level and token-order-insensitive similarity."""
+    direct = SequenceMatcher(None, a, b).ratio()
+    sorted_a, sorted_b = " ".join(sorted(a.split())), " ".join(sorted(b.split()))
+    return max(direct, SequenceMatcher(None, sorted_a, sorted_b).ratio())
+
+
+@lru_cache(maxsize=65536)
+def _generic(token: str) -> Optional[str]:
+    """The generic university word a token is (or is a typo of, "universty"), else None."""
+    if token in UNIVERSITY_GENERIC_TOKENS:
+        return token
+    if len(token) < 5 or token.isdigit():
+        return None
+    close = get_close_matches(token, UNIVERSITY_GENERIC_TOKENS, n=1, cutoff=0.85)
+    return close[0] if close else None
+
+
+def university_block(key: str) -> str:
+    """
+    The distinguishing part of a university key: its sorted non-generic tokens.
+
+    Numbers count as distinguishing. Names made only of generic words
+    ("Technical University") fall back to all their (typo-corrected) tokens.
+    """
+    tokens = key.split()
+    distinct = sorted(t for t in tokens if _generic(t) is None)
+    return " ".join(distinct or sorted(_generic(t) for t in tokens))
+
+
+def person_block(key: str) -> str:
+    """Surname (last non-numeric token) plus any numbers in a person key."""
+    tokens = key.split()
+    names = [t for t in tokens if not t.isdigit()]
+    return " ".join(names[-1:] + sorted(t for t in tokens if t.isdigit())) or key
+
+
+def _given_names(key: str) -> str:
+    names = [t for t in key.split() if not t.isdigit()]
+    return " ".join(names[:-1])
+
+
+class BlockingIndex:
+    """
+    Maps canonical keys to entity ids, with blocking for fuzzy lookups.
+
+    Keys are only compared within their block, and keys in different blocks
+    never match: universities must agree exactly on their distinguishing
+    tokens and numbers ("Berlin" vs "Dublin" stay apart) and people on their
+    surname, with only the given names compared fuzzily ("Yang Liu" vs
+    "Yang Lu" stay apart). Blocks stop growing at `max_block` keys, so a
+    crowded block costs at most that many comparisons; keys past the cap
+    still resolve exactly.
+    """
+
+    def __init__(self, threshold: float = ENTITY_MATCH_THRESHOLD, person: bool = False,
+                 max_block: int = ENTITY_BLOCK_MAX_SIZE):
+        self.threshold = threshold
+        self.person = person
+        self.max_block = max_block
+        self.exact: Dict[str, int] = {}
+        self.blocks: Dict[str, Set[str]] = defaultdict(set)
+
+    def _block(self, key: str) -> str:
+        return person_block(key) if self.person else university_block(key)
+
+    def _score(self, key: str, candidate: str) -> float:
+        if self.person:
+            return similarity(_given_names(key), _given_names(candidate))
+        return similarity(key, candidate)
+
+    def add(self, key: str, entity_id: int):
+        self.exact.setdefault(key, entity_id)
+        block = self.blocks[self._block(key)]
+        if len(block) < self.max_block:
+            block.add(key)
+
+    def resolve(self, key: str) -> Optional[int]:
+        if key in self.exact:
+            return self.exact[key]
+        best, best_score = None, self.threshold
+        for candidate in self.blocks.get(self._block(key), ()):
+            score = self._score(key, candidate)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return self.exact[best] if best else None
+
+
+class EntityResolver:
+    """Merges discovered universities/professors into existing rows before writing them in bulk."""
+
+    def __init__(self, database: Database = db, threshold: float = ENTITY_MATCH_THRESHOLD):
+        self.database = database
+        self.threshold = threshold
+
+    def _partition(self, rows: List[Tuple[int, str]], items: List[Dict[str, Any]],
+                   key_fn: Callable[[Optional[str]], Optional[str]], person: bool = False):
+        """Split items into (new rows keyed by canonical key, matches to existing ids)."""
+        index = BlockingIndex(self.threshold, person=person)
+        for entity_id, key in rows:
+            if key:
+                index.add(key, entity_id)
+
+        new: Dict[str, Dict[str, Any]] = {}
+        matched: List[Tuple[int, Dict[str, Any]]] = []
+        new_index = BlockingIndex(self.threshold, person=person)
+        new_keys: List[str] = []
+        for item in items:
+            key = key_fn(item.get("name"))
+            if not key:
+                continue
+            existing = index.resolve(key)
+            if existing is not None:
+                matched.append((existing, item))
+                continue
+            # Collapse near-duplicates within the same batch as well, keeping the twin's fields
+            twin = new_index.resolve(key)
+            if twin is None:
+                new[key] = dict(item)
+                new_index.add(key, len(new_keys))
+                new_keys.append(key)
+            else:
+                kept = new[new_keys[twin]]
+                for field, value in item.items():
+                    if kept.get(field) is None:
+                        kept[field] = value
+        return new, matched
+
+    def upsert_universities(self, universities: List[Dict[str, Any]], default_country: str) -> int:
+        """Insert unseen universities and fill gaps on matched ones, in one transaction. Returns new rows."""
+        with self.database.transaction() as conn:
+            rows = conn.execute("SELECT id, name_key FROM universities").fetchall()
+            new, matched = self._partition(rows, universities, university_key)
+            conn.executemany("""
+                INSERT INTO universities (name, name_key, country, ranking_qs, verification_status)
+                VALUES (?, ?, ?, ?, 'needs_check')
+                ON CONFLICT (name_key) DO UPDATE SET
+                    ranking_qs = COALESCE(universities.ranking_qs, excluded.ranking_qs),
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(u.get('name'), key, u.get('country') or default_country, u.get('ranking_qs'))
+                  for key, u in new.items()])
+            conn.executemany("""
+                UPDATE universities
+                SET ranking_qs = COALESCE(ranking_qs, ?), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(u.get('ranking_qs'), uid) for uid, u in matched])
+        if matched:
+            logger.info(f"Resolved {len(matched)} discovered universities to existing records")
+        return len(new)
+
+    def upsert_professors(self, university_id: int, professors: List[Dict[str, Any]],
+                          fingerprint: Optional[str] = None) -> int:
+        """
+        Insert unseen professors at one university and fill gaps on matched ones. Returns new rows.
+
+        `fingerprint` identifies the discovery that produced the list; it is
+        stamped on every new and matched row (existing stamps are kept when None).
+        """
+        with self.database.transaction() as conn:
+            rows = conn.execute("SELECT id, name_key FROM professors WHERE university_id = ?",
+                                (university_id,)).fetchall()
+            new, matched = self._partition(rows, professors, person_key, person=True)
+            conn.executemany("""
+                INSERT INTO professors (university_id, name, name_key, department, contact_priority,
+                                        accepting_students, fingerprint)
+                VALUES (?, ?, ?, ?, 3, 'unknown', ?)
+                ON CONFLICT (university_id, name_key) DO UPDATE SET
+                    department = COALESCE(professors.department, excluded.department),
+                    fingerprint = COALESCE(excluded.fingerprint, professors.fingerprint)
+            """, [(university_id, p.get('name'), key, p.get('department'), fingerprint) for key, p in new.items()])
+            conn.executemany("""
+                UPDATE professors SET department = COALESCE(department, ?), fingerprint = COALESCE(?, fingerprint)
+                WHERE id = ?
+            """, [(p.get('department'), fingerprint, pid) for pid, p in matched])
+        return len(new)
@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List
+from config import EVENT_BUFFER_SIZE
+
+
+class EventStream:
+    """
+    In-process ring buffer of agent activity, readable incrementally by sequence number.
+
+    Producers call `publish`; readers remember the last sequence they saw and
+    call `since(seq)` to get only newer events. Old events fall off the end
+    once the buffer is full.
+    """
+
+    def __init__(self, maxlen: int = EVENT_BUFFER_SIZE):
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=maxlen)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, message: str, **data: Any) -> int:
+        with self._lock:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "time": time.time(), "kind": kind,
+                                 "message": message, **data})
+            return self._seq
+
+    def since(self, seq: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Events newer than `seq`, oldest first; at most the last `limit` of them if given."""
+        with self._lock:
+            if not self._events or self._events[-1]["seq"] <= seq:
+                return []
+            # Sequence numbers are contiguous, so the start offset is computed directly
+            start = max(0, seq - self._events[0]["seq"] + 1)
+            newer = list(self._events)[start:]
+        return newer[-limit:] if limit else newer
+
+    @property
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._seq
+
+
+def tail_lines(path: str, n: int = 20, max_bytes: int = 64 * 1024, block_size: int = 4096) -> List[str]:
+    """
+    Last `n` lines of a text file, reading backwards from the end.
+
+    Reads at most `max_bytes`, so the cost is independent of the file size;
+    if the budget runs out first, fewer lines are returned.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= n and len(data) < max_bytes:
+            step = min(block_size, position, max_bytes - len(data))
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    if position > 0 and lines:
+        # The first line is probably cut off mid-way
+        lines = lines[1:]
+    return lines[-n:]
+
+
+events = EventStream()
@@ -0,0 +1,16 @@
+import json
+import hashlib
+from typing import Any
+
+
+def fingerprint(version: str, *inputs: Any) -> str:
+    """
+    Stable hash of the inputs a derived result was computed from.
+
+    `version` names the prompt (or rule set) that produced the result, so
+    bumping it invalidates every stored result of that kind. Results whose
+    stored fingerprint equals the current one are up to date and can be
+    reused instead of recomputed.
+    """
+    payload = json.dumps([version, *inputs], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
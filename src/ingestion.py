@@ -0,0 +1,118 @@
+import os
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from PyPDF2 import PdfReader
+from database.db import Database, db
+from config import INGEST_PARALLEL_MIN_PAGES, INGEST_MAX_WORKERS, logger
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_pages(path: str, start: int, end: int) -> str:
+    """Extract pages [start, end) of a PDF. Runs in a worker process."""
+    reader = PdfReader(path)
+    return "\n".join(reader.pages[i].extract_text() or "" for i in range(start, end))
+
+
+class DocumentIngestor:
+    """
+    Extracts text from PDFs once per file content.
+
+    Documents are cached in the documents table under the SHA-256 of their
+    bytes, so re-parsing an unchanged CV is a single lookup. Large documents
+    are split into page ranges and extracted in worker processes.
+    """
+
+    def __init__(self, database: Database = db, parallel_min_pages: int = INGEST_PARALLEL_MIN_PAGES,
+                 max_workers: int = INGEST_MAX_WORKERS):
+        self.database = database
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers
+        self.stats = {"hits": 0, "misses": 0}
+
+    def extract_text(self, path: str) -> Tuple[str, int]:
+        """Return (text, page_count) without consulting the cache."""
+        page_count = len(PdfReader(path).pages)
+        workers = min(self.max_workers, page_count)
+        if page_count < self.parallel_min_pages or workers < 2:
+            return _extract_pages(path, 0, page_count), page_count
+
+        step = -(-page_count // workers)
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = executor.map(_extract_pages, [path] * len(ranges), *zip(*ranges))
+            return "\n".join(parts), page_count
+
+    def parse(self, path: str) -> str:
+        """Return the text of a PDF, extracting it only if this content was never seen."""
+        if not os.path.exists(path):
+            logger.error(f"Document not found: {path}")
+            return ""
+
+        content_hash = file_hash(path)
+        row = self.database.fetchone("SELECT text FROM documents WHERE content_hash = ?", (content_hash,))
+        if row:
+            self.stats["hits"] += 1
+            return row[0]
+
+        self.stats["misses"] += 1
+        try:
+            text, page_count = self.extract_text(path)
+        except Exception as e:
+            logger.error(f"Error parsing {path}: {str(e)}")
+            return ""
+        self.database.execute("""
+            INSERT OR REPLACE INTO documents (content_hash, path, page_count, text, parsed_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (content_hash, path, page_count, text, time.time()))
+        logger.info(f"Parsed {page_count} page(s) from {path}")
+        return text
+
+    def parse_profile(self, cv_path: str, transcript_path: Optional[str] = None) -> str:
+        """
+        Build the student profile from a CV and optional transcript.
+
+        The combined text is cached in student_profiles under a hash of both
+        input documents, so an unchanged pair is returned without re-reading
+        either PDF's text. A profile missing a document that failed to parse
+        is returned but not cached, so the next call tries that document again.
+        """
+        paths = [p for p in (cv_path, transcript_path) if p and os.path.exists(p)]
+        if not paths:
+            logger.error(f"CV file not found: {cv_path}")
+            return ""
+
+        hashes = [file_hash(p) for p in paths]
+        profile_hash = hashlib.sha256("|".join(hashes).encode("utf-8")).hexdigest()
+        row = self.database.fetchone("SELECT text FROM student_profiles WHERE profile_hash = ?", (profile_hash,))
+        if row:
+            self.stats["hits"] += 1
+            return row[0]
+
+        sections: List[str] = []
+        failed: List[str] = []
+        for label, path in (("CV", cv_path), ("Transcript", transcript_path)):
+            if path in paths:
+                text = self.parse(path)
+                if text:
+                    sections.append(f"{label}:\n{text}")
+                else:
+                    failed.append(path)
+        profile = "\n\n".join(sections)
+        if failed:
+            logger.warning(f"Not caching the profile; no text from {', '.join(failed)}")
+            return profile
+        self.database.execute("""
+            INSERT OR REPLACE INTO student_profiles (profile_hash, cv_hash, transcript_hash, text, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (profile_hash, hashes[0] if cv_path in paths else None,
+              hashes[-1] if transcript_path in paths else None, profile, time.time()))
+        return profile
@@ -0,0 +1,119 @@
+import json
+from typing import Dict, Any, Optional, Tuple
+
+
+def _decode_string(raw: str) -> str:
+    """Decode the body of a JSON string, dropping an escape sequence cut off mid-stream."""
+    for cut in range(0, 7):
+        try:
+            return json.loads(f'"{raw[:len(raw) - cut]}"')
+        except ValueError:
+            continue
+    return raw
+
+
+class IncrementalJSONParser:
+    """
+    Surfaces the top-level fields of a streamed JSON object as soon as each one is complete.
+
+    Text before the opening brace (e.g. a ```json fence) is ignored. `feed`
+    returns the fields finished by that chunk; `partial()` exposes the string
+    value currently being written so drafts can be shown while they stream.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = "start"  # start | key | in_key | colon | value | in_string | in_scalar | in_nested
+        self._key = ""
+        self._raw = ""
+        self._escape = False
+        self._depth = 0
+        self._nested_string = False
+
+    def _finish_value(self, raw: str, completed: Dict[str, Any]):
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw.strip()
+        self.fields[self._key] = completed[self._key] = value
+        self._raw = ""
+        self._state = "key"
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        completed: Dict[str, Any] = {}
+        for ch in chunk:
+            if self.done:
+                break
+            state = self._state
+            if state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self._state, self._raw = "in_key", ""
+                elif ch == "}":
+                    self.done = True
+            elif state in ("in_key", "in_string"):
+                if self._escape:
+                    self._escape = False
+                    self._raw += ch
+                elif ch == "\\":
+                    self._escape = True
+                    self._raw += ch
+                elif ch == '"':
+                    if state == "in_key":
+                        self._key, self._raw, self._state = _decode_string(self._raw), "", "colon"
+                    else:
+                        self._finish_value(f'"{self._raw}"', completed)
+                else:
+                    self._raw += ch
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._state, self._raw = "in_string", ""
+                elif ch in "{[":
+                    self._state, self._raw, self._depth = "in_nested", ch, 1
+                elif not ch.isspace():
+                    self._state, self._raw = "in_scalar", ch
+            elif state == "in_scalar":
+                if ch in ",}":
+                    self._finish_value(self._raw, completed)
+                    if ch == "}":
+                        self.done = True
+                else:
+                    self._raw += ch
+            elif state == "in_nested":
+                self._raw += ch
+                if self._nested_string:
+                    if self._escape:
+                        self._escape = False
+                    elif ch == "\\":
+                        self._escape = True
+                    elif ch == '"':
+                        self._nested_string = False
+                elif ch == '"':
+                    self._nested_string = True
+                elif ch in "{[":
+                    self._depth += 1
+                elif ch in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._finish_value(self._raw, completed)
+        return completed
+
+    def partial(self) -> Tuple[Optional[str], str]:
+        """(key, decoded text so far) of the string value being streamed, or (None, "")."""
+        if self._state != "in_string":
+            return None, ""
+        return self._key, _decode_string(self._raw)
+
+    def snapshot(self, *keys: str) -> Dict[str, Any]:
+        """Completed fields plus the in-progress string, limited to `keys` when given."""
+        view = dict(self.fields)
+        key, text = self.partial()
+        if key is not None:
+            view[key] = text
+        return {k: v for k, v in view.items() if not keys or k in keys}
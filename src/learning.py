@@ -1,8 +1,7 @@
 from typing import Dict, Any, List
 from src.agents import Agent
-import sqlite3
 import json
-from config import DB_PATH
+from database.db import db
 
 class LearningAgent(Agent):
     def __init__(self):
@@ -24,13 +23,9 @@ class LearningAgent(Agent):
         )
         
         # Simple persistence for now
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        db.execute("""
             INSERT OR REPLACE INTO user_preferences (key, value)
             VALUES (?, ?)
         """, (f"feedback_{source}_{feedback.get('id')}", json.dumps(feedback)))
-        conn.commit()
-        conn.close()
         
         return {"status": "success", "message": "Feedback recorded. I will improve next time!"}
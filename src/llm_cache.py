@@ -0,0 +1,95 @@
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from database.db import Database, db
+from config import LLM_CACHE_TTL, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_MAX_ROWS, logger
+
+
+class LLMCache:
+    """
+    Two-tier cache of LLM completions keyed on a hash of the request inputs.
+
+    An in-process LRU answers hot keys without touching SQLite; the llm_cache
+    table persists responses across runs. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, database: Database = db, ttl: float = LLM_CACHE_TTL,
+                 memory_size: int = LLM_CACHE_MEMORY_SIZE, max_rows: int = LLM_CACHE_MAX_ROWS):
+        self.database = database
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        # key -> (response, created_at, latency)
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0,
+                      "evictions": 0, "latency_saved": 0.0}
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        payload = json.dumps([model, system_prompt, user_prompt, round(temperature, 4)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                self.stats["latency_saved"] += entry[2]
+                return entry[0]
+
+        try:
+            row = self.database.fetchone(
+                "SELECT response, created_at, latency FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            )
+        except Exception as e:
+            logger.error(f"LLM cache lookup failed: {str(e)}")
+            row = None
+        if not row:
+            self.stats["misses"] += 1
+            return None
+
+        response, created_at, latency = row
+        self.database.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self._remember(key, (response, created_at, latency or 0.0))
+        self.stats["disk_hits"] += 1
+        self.stats["latency_saved"] += latency or 0.0
+        return response
+
+    def put(self, key: str, model: str, response: str, latency: float):
+        now = time.time()
+        self._remember(key, (response, now, latency))
+        try:
+            self.database.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, model, response, latency, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, model, response, latency, now, now))
+            self.stats["stores"] += 1
+            self._evict()
+        except Exception as e:
+            logger.error(f"LLM cache store failed: {str(e)}")
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        count = self.database.fetchone("SELECT count(*) FROM llm_cache")[0]
+        if count <= self.max_rows:
+            return
+        excess = count - self.max_rows
+        self.database.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?
+            )
+        """, (excess,))
+        self.stats["evictions"] += excess
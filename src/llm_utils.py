@@ -1,48 +1,220 @@
 import os
+import time
 import groq
 import json
-from typing import Dict, Any, List, Optional
-from config import GROQ_API_KEY, MODEL_NAME, logger
+import threading
+from typing import Dict, Any, List, Iterator, Optional
+from src import structured
+from src.llm_cache import LLMCache
+from src.rate_limit import LLMRateLimiter, llm_limiter
+from src.tracing import tracer
+from config import (GROQ_API_KEY, MODEL_NAME, LLM_COMPLETION_TOKENS, LLM_JSON_MODE,
+                    LLM_STRUCTURED_REASKS, logger)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)."""
+    return len(text) // 4 + 1
 
 class LLMUtils:
-    def __init__(self):
+    def __init__(self, limiter: Optional[LLMRateLimiter] = None):
         if not GROQ_API_KEY:
             self.client = None
             logger.error("Groq Client initialized without API Key.")
         else:
-            self.client = groq.Groq(api_key=GROQ_API_KEY)
+            # Retries are handled by the rate limiter so they respect the shared budget
+            self.client = groq.Groq(api_key=GROQ_API_KEY, max_retries=0)
+        self.cache = LLMCache()
+        self.limiter = limiter or llm_limiter
+        self._lock = threading.Lock()
+        # How structured replies were obtained: parsed as-is, repaired locally, re-asked, or given up on
+        self.output_stats = {"parsed": 0, "repaired": 0, "reasked": 0, "failed": 0}
+
+    def _create(self, system_prompt: str, user_prompt: str, temperature: float, **kwargs):
+        tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt) + LLM_COMPLETION_TOKENS
+        return self.limiter.call(
+            self.client.chat.completions.create,
+            tokens=tokens,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            model=MODEL_NAME,
+            temperature=temperature,
+            **kwargs,
+        )
 
-    def generate_response(self, system_prompt: str, user_prompt: str, temperature: float = 0.7) -> str:
+    def generate_response(self, system_prompt: str, user_prompt: str, temperature: float = 0.7,
+                          use_cache: bool = True, json_mode: bool = False) -> str:
+        """Complete a prompt. With `json_mode` the API is asked to return a single JSON object."""
         if not self.client:
             return "Error: LLM client not configured. Please add GROQ_API_KEY to .env"
-        
+
+        json_mode = json_mode and LLM_JSON_MODE
+        with tracer.span("llm", MODEL_NAME) as span:
+            cache_key = LLMCache.key(MODEL_NAME + (":json" if json_mode else ""), system_prompt, user_prompt, temperature)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    span.set(cached=True)
+                    return cached
+
+            try:
+                start = time.monotonic()
+                kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+                chat_completion = self._create(system_prompt, user_prompt, temperature, **kwargs)
+                content = chat_completion.choices[0].message.content
+                span.set(cached=False, **self._token_counts(chat_completion, system_prompt, user_prompt, content))
+                if use_cache and content:
+                    self.cache.put(cache_key, MODEL_NAME, content, time.monotonic() - start)
+                return content
+            except Exception as e:
+                logger.error(f"LLM Error: {str(e)}")
+                span.set(error=str(e))
+                return f"Error communicating with LLM: {str(e)}"
+
+    @staticmethod
+    def _token_counts(completion: Any, system_prompt: str, user_prompt: str, content: Optional[str]) -> Dict[str, int]:
+        """Token usage reported by the API, falling back to estimates."""
+        usage = getattr(completion, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if not isinstance(prompt_tokens, int):
+            prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+        if not isinstance(completion_tokens, int):
+            completion_tokens = estimate_tokens(content or "")
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+    def stream_response(self, system_prompt: str, user_prompt: str, temperature: float = 0.7,
+                        use_cache: bool = True) -> Iterator[str]:
+        """
+        Streaming variant of generate_response: yields content deltas as they arrive.
+
+        A cache hit is yielded as a single chunk. The joined stream is cached
+        like a normal completion once it finishes.
+        """
+        if not self.client:
+            yield "Error: LLM client not configured. Please add GROQ_API_KEY to .env"
+            return
+
+        cache_key = LLMCache.key(MODEL_NAME, system_prompt, user_prompt, temperature)
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts: List[str] = []
+        started_at = time.time()
+        start = time.monotonic()
+        first_token: Optional[float] = None
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                model=MODEL_NAME,
-                temperature=temperature,
-            )
-            return chat_completion.choices[0].message.content
+            stream = self._create(system_prompt, user_prompt, temperature, stream=True)
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token is None:
+                        first_token = time.monotonic() - start
+                    parts.append(delta)
+                    yield delta
         except Exception as e:
             logger.error(f"LLM Error: {str(e)}")
-            return f"Error communicating with LLM: {str(e)}"
+            tracer.record("llm", MODEL_NAME, started_at, (time.monotonic() - start) * 1000, ok=False,
+                          stream=True, error=str(e))
+            yield f"Error communicating with LLM: {str(e)}"
+            return
+        content = "".join(parts)
+        tracer.record("llm", MODEL_NAME, started_at, (time.monotonic() - start) * 1000, stream=True, cached=False,
+                      first_token_ms=(first_token or 0) * 1000,
+                      **self._token_counts(None, system_prompt, user_prompt, content))
+        if use_cache and parts:
+            self.cache.put(cache_key, MODEL_NAME, content, time.monotonic() - start)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.output_stats[name] += 1
+
+    def generate_structured(self, system_prompt: str, user_prompt: str, schema: structured.Schema,
+                            temperature: float = 0.7, use_cache: bool = True) -> Any:
+        """
+        Complete a prompt whose reply must match `schema` and return the parsed value.
+
+        Object schemas are requested in the API's JSON mode. The reply then
+        goes through conform_response: local repair and validation first,
+        and a re-ask for only the failing fields as a last resort.
+        """
+        response = self.generate_response(system_prompt, user_prompt, temperature, use_cache=use_cache,
+                                          json_mode=structured.is_object(schema))
+        return self.conform_response(response, schema, system_prompt, user_prompt, temperature, use_cache)
+
+    def conform_response(self, response: str, schema: structured.Schema, system_prompt: Optional[str] = None,
+                         user_prompt: Optional[str] = None, temperature: float = 0.7,
+                         use_cache: bool = True) -> Any:
+        """
+        Parse and validate an already generated reply against `schema`.
+
+        Malformed JSON is repaired locally. If fields are still missing or
+        invalid and the prompts are given, the model is asked once more for
+        just those fields (the whole value when nothing parsed) and the answer
+        is merged in. Returns the value, with invalid fields dropped, or an
+        error dict like parse_json_response when nothing usable remains.
+        """
+        value, errors, repaired = structured.parse(response, schema)
+        attempts = 0
+        while errors and system_prompt is not None and attempts < LLM_STRUCTURED_REASKS \
+                and not response.startswith("Error"):
+            attempts += 1
+            self._count("reasked")
+            value, errors = self._reask(response, value, errors, schema, system_prompt, user_prompt,
+                                        temperature, use_cache)
+
+        if errors:
+            self._count("failed")
+            logger.error(f"Structured LLM output failed validation: {'; '.join(errors)}")
+            if value is None:
+                return {"error": "Invalid JSON format", "raw": response, "errors": errors}
+        elif not attempts:
+            self._count("repaired" if repaired else "parsed")
+        return value
+
+    def _reask(self, response: str, value: Any, errors: List[str], schema: structured.Schema,
+               system_prompt: str, user_prompt: str, temperature: float, use_cache: bool = True):
+        fields = structured.failing_fields(errors)
+        if isinstance(value, dict) and fields and structured.is_object(schema):
+            properties = schema.get("properties", {})
+            subschema = {"type": "object", "properties": {f: properties[f] for f in fields if f in properties},
+                         "required": [f for f in fields if f in schema.get("required", [])]}
+            logger.warning(f"🔁 Re-asking the LLM for invalid field(s): {', '.join(fields)}")
+            reply = self.generate_response(system_prompt, f"""{user_prompt}
+
+        Your previous reply was:
+        {response}
+
+        These fields were missing or invalid: {'; '.join(errors)}.
+        Reply with only a JSON object containing corrected values for {', '.join(fields)}, matching this JSON schema:
+        {json.dumps(subschema)}
+        """, temperature, use_cache=use_cache, json_mode=True)
+            patch, _, _ = structured.parse(reply, subschema)
+            merged = {**value, **patch} if isinstance(patch, dict) else value
+            return structured.conform(merged, schema)
+
+        logger.warning("🔁 Re-asking the LLM for a valid JSON reply")
+        reply = self.generate_response(system_prompt, f"""{user_prompt}
+
+        Your previous reply could not be used ({'; '.join(errors)}).
+        Reply with only valid JSON matching this JSON schema:
+        {json.dumps(schema)}
+        """, temperature, use_cache=use_cache, json_mode=structured.is_object(schema))
+        value, errors, _ = structured.parse(reply, schema)
+        return value, errors
 
     def parse_json_response(self, response: str) -> Dict[str, Any]:
-        """Attempt to extract and parse JSON from LLM response."""
+        """Extract and parse JSON from an LLM response, repairing common malformations locally."""
         try:
-            # Simple extractor if LLM surrounds with ```json
-            if "```json" in response:
-                content = response.split("```json")[1].split("```")[0].strip()
-            elif "```" in response:
-                content = response.split("```")[1].split("```")[0].strip()
-            else:
-                content = response.strip()
-            return json.loads(content)
-        except Exception as e:
+            value, repaired = structured.loads(response)
+        except ValueError as e:
             logger.error(f"Failed to parse JSON from LLM: {str(e)}")
             return {"error": "Invalid JSON format", "raw": response}
+        self._count("repaired" if repaired else "parsed")
+        return value
 
 llm = LLMUtils()
@@ -1,21 +1,166 @@
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from src.agents import Agent, MessageBus
-import sqlite3
-from config import DB_PATH
+from src.prerank import PreRanker
+from src.events import events
+from src.tracing import tracer
+from src.run_store import RunStore, DONE, FAILED
+from database.db import db
+from config import (ORCHESTRATOR_MAX_WORKERS, ORCHESTRATOR_TASK_TIMEOUT,
+                    PRERANK_TOP_UNIVERSITIES, PRERANK_TOP_PROFESSORS, logger)
+
+# (label, recipient agent, message)
+Task = Tuple[str, str, Dict[str, Any]]
 
 class OrchestratorAgent(Agent):
-    def __init__(self, message_bus: MessageBus):
+    def __init__(self, message_bus: MessageBus, max_workers: int = ORCHESTRATOR_MAX_WORKERS,
+                 task_timeout: float = ORCHESTRATOR_TASK_TIMEOUT):
         super().__init__("Orchestrator")
         self.message_bus = message_bus
+        self.max_workers = max_workers
+        self.task_timeout = task_timeout
+        self.preranker = PreRanker()
+        self.runs = RunStore()
         self.plan: List[Dict[str, Any]] = []
 
     def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
         action = message.get("action")
         if action == "run_full_flow":
-            return self.run_full_flow(message.get("country"), message.get("student_profile"))
+            return self.run_full_flow(message.get("country"), message.get("student_profile"),
+                                      max_workers=message.get("max_workers"),
+                                      force_refresh=message.get("force_refresh", False))
+        if action == "resume_flow":
+            return self.resume_flow(message.get("run_id"), country=message.get("country"),
+                                    max_workers=message.get("max_workers"),
+                                    force_refresh=message.get("force_refresh", False))
         return {"status": "error", "message": "Unknown action"}
 
-    def run_full_flow(self, country: str, student_profile: str) -> Dict[str, Any]:
+    def _announce_phase(self, phase: str, title: str, country: str):
+        logger.info("=" * 50)
+        logger.info(title)
+        logger.info("=" * 50)
+        events.publish("phase", title, phase=phase, country=country)
+
+    def _fan_out(self, executor: ThreadPoolExecutor, tasks: List[Task],
+                 on_done: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Run independent bus messages concurrently and collect results by label.
+
+        Each task gets `task_timeout` seconds from the moment it starts running;
+        a task that overruns is reported as failed and no longer waited on, so
+        one slow university cannot hold back the rest of the phase. `on_done`
+        is called with each label and result as soon as it is known.
+        """
+        started: Dict[str, float] = {}
+
+        def run(label: str, recipient: str, message: Dict[str, Any]) -> Dict[str, Any]:
+            started[label] = time.monotonic()
+            return self.message_bus.send_message(recipient, message)
+
+        def settle(label: str, result: Dict[str, Any]):
+            results[label] = result
+            if on_done is not None:
+                on_done(label, result)
+
+        futures = {executor.submit(tracer.wrap(run), *task): task[0] for task in tasks}
+        results: Dict[str, Dict[str, Any]] = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                label = futures[future]
+                try:
+                    settle(label, future.result())
+                except Exception as e:
+                    logger.error(f"Task {label} failed: {str(e)}")
+                    settle(label, {"status": "error", "message": str(e)})
+
+            now = time.monotonic()
+            for future in list(pending):
+                label = futures[future]
+                if label in started and now - started[label] > self.task_timeout:
+                    logger.warning(f"⏱ Task {label} timed out after {self.task_timeout}s")
+                    settle(label, {"status": "error", "message": "Timed out"})
+                    pending.discard(future)
+        return results
+
+    def _run_phase(self, executor: ThreadPoolExecutor, run_id: int, phase: str,
+                   tasks: List[Task]) -> Dict[str, Dict[str, Any]]:
+        """
+        Run one phase's tasks under the run's checkpoint.
+
+        Tasks a previous attempt completed are not sent again; their stored
+        results are returned alongside the fresh ones. Every outcome is
+        persisted the moment it arrives, so a crash mid-phase loses nothing
+        that already finished.
+        """
+        self.runs.update_run(run_id, phase=phase)
+        self.runs.register(run_id, phase, [label for label, _, _ in tasks])
+        self.runs.prune(run_id, phase, [label for label, _, _ in tasks])
+        results = {label: task["result"] for label, task in self.runs.tasks(run_id, phase).items()
+                   if task["status"] == DONE}
+        todo = [task for task in tasks if task[0] not in results]
+        if results:
+            logger.info(f"⏭ Phase {phase}: reusing {len(results)} completed task(s), running {len(todo)}")
+        self.runs.start(run_id, [label for label, _, _ in todo])
+        results.update(self._fan_out(executor, todo,
+                                     on_done=lambda label, result: self.runs.finish(run_id, label, result)))
+        return results
+
+    def run_full_flow(self, country: str, student_profile: str, max_workers: Optional[int] = None,
+                      run_id: Optional[int] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Run (or, with `run_id`, continue) the checkpointed search flow.
+
+        A new run is recorded first; every task's state and result is stored
+        as it completes, so an interrupted or partly failed run can be picked
+        up with resume_flow without repeating finished work. Agents reuse
+        results whose input fingerprints are unchanged; `force_refresh`
+        recomputes everything. A run another live process or thread is
+        executing is refused rather than run twice.
+        """
+        if run_id is None:
+            run_id = self.runs.create_run(country, student_profile)
+        elif not self.runs.acquire(run_id):
+            return {"status": "error", "message": f"Run {run_id} is being executed elsewhere", "run_id": run_id}
+        # Every span recorded during the run is grouped under this trace
+        with tracer.trace("run_full_flow", country=country, run_id=run_id) as trace:
+            try:
+                result = self._run_full_flow(run_id, country, student_profile, max_workers, force_refresh)
+            except Exception as e:
+                self.runs.update_run(run_id, status=FAILED, error=str(e))
+                raise
+            finally:
+                self.runs.release(run_id)
+        result["trace_id"] = trace.trace_id
+        return result
+
+    def resume_flow(self, run_id: Optional[int] = None, country: Optional[str] = None,
+                    max_workers: Optional[int] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """Continue a run (by default the latest unfinished one), executing only incomplete tasks."""
+        run_id = run_id or self.runs.latest_incomplete(country)
+        run = self.runs.get_run(run_id) if run_id else None
+        if not run:
+            return {"status": "error", "message": "No unfinished run to resume"}
+        if run["status"] == DONE:
+            return {"status": "error", "message": f"Run {run_id} already completed"}
+        # Owning the run first guarantees the "running" tasks below really were interrupted
+        if not self.runs.acquire(run_id):
+            return {"status": "error", "message": f"Run {run_id} is being executed elsewhere"}
+        interrupted = self.runs.reset_interrupted(run_id)
+        logger.info(f"▶️ Resuming run {run_id} for {run['country']} ({interrupted} interrupted task(s) requeued)")
+        self.runs.update_run(run_id, status="running", error=None)
+        return self.run_full_flow(run["country"], run["student_profile"], max_workers=max_workers, run_id=run_id,
+                                  force_refresh=force_refresh)
+
+    def _tasks_done(self, run_id: int, phase: str, prefix: str = "") -> bool:
+        """Whether every task of `phase` (with labels starting with `prefix`) has succeeded."""
+        return all(task["status"] == DONE for label, task in self.runs.tasks(run_id, phase).items()
+                   if label.startswith(prefix))
+
+    def _run_full_flow(self, run_id: int, country: str, student_profile: str,
+                       max_workers: Optional[int], force_refresh: bool) -> Dict[str, Any]:
         self.log_decision(
             task=f"PhD Search Flow: {country}",
             decision="Starting 6-Phase Autonomous Flow",
@@ -23,58 +168,94 @@ class OrchestratorAgent(Agent):
             confidence=1.0,
             success=True
         )
-        
+
+        run = self.runs.get_run(run_id)
         results = {"universities": [], "professors": [], "emails": []}
-        
-        # Phase 1: University Discovery
-        logger.info("=" * 50)
-        logger.info("🔍 PHASE 1: Discovering universities in " + country)
-        logger.info("=" * 50)
-        disc_res = self.message_bus.send_message("Research", {"action": "find_universities", "country": country})
-        logger.info(f"✅ Discovered {disc_res.get('count', 0)} universities")
-        
-        # Phase 2: Analysis & Matching (for top 5 discovered)
-        logger.info("=" * 50)
-        logger.info("🎯 PHASE 2 & 3: Analyzing and verifying top universities")
-        logger.info("=" * 50)
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM universities WHERE country = ? LIMIT 5", (country,))
-        unis = cursor.fetchall()
-        conn.close()
-        
-        for idx, (uid, uname) in enumerate(unis, 1):
-            logger.info(f"📊 Analyzing university {idx}/5: {uname}")
-            # Match
-            self.message_bus.send_message("Research", {"action": "analyze_university_match", "university_id": uid, "student_profile": student_profile})
-            # Verify
-            self.message_bus.send_message("Verification", {"action": "verify_university", "university_id": uid})
-            
-            # Phase 4: Professor Discovery (for each top university)
-            logger.info(f"👨‍🔬 PHASE 4: Finding professors at {uname}")
-            self.message_bus.send_message("Research", {"action": "find_professors", "university_id": uid})
-            
-        # Phase 5: Email Generation (for top 3 professors found)
-        logger.info("=" * 50)
-        logger.info("📧 PHASE 5: Generating personalized emails")
-        logger.info("=" * 50)
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name FROM professors LIMIT 3")
-        profs = cursor.fetchall()
-        conn.close()
-        
-        for idx, (pid, pname) in enumerate(profs, 1):
-            logger.info(f"✍️ Generating email {idx}/3 for {pname}")
-            self.message_bus.send_message("Outreach", {"action": "generate_email", "professor_id": pid, "student_profile": student_profile})
-        
-        logger.info("=" * 50)
-        logger.info("✅ FLOW COMPLETED SUCCESSFULLY!")
-        logger.info("=" * 50)
-            
+        # Timed-out tasks keep their worker thread busy, so never block on shutdown
+        executor = ThreadPoolExecutor(max_workers=max_workers or self.max_workers,
+                                      thread_name_prefix="Orchestrator")
+        try:
+            # Phase 1: University Discovery
+            self._announce_phase("1", "🔍 PHASE 1: Discovering universities in " + country, country)
+            disc_res = self._run_phase(executor, run_id, "1", [
+                ("discover", "Research", {"action": "find_universities", "country": country})])["discover"]
+            logger.info(f"✅ Discovered {disc_res.get('count', 0)} universities")
+
+            # Phase 2-4: Analysis, verification and professor discovery (for the top local matches).
+            # The three steps are independent per university, so they all run concurrently.
+            self._announce_phase("2-4", "🎯 PHASE 2-4: Analyzing, verifying and finding professors at top universities", country)
+            shortlist_frozen = run["shortlist"] is not None
+            if not shortlist_frozen:
+                names = dict(db.fetchall("SELECT id, name FROM universities WHERE country = ?", (country,)))
+                shortlist = self.preranker.rank("university", student_profile or "", PRERANK_TOP_UNIVERSITIES, candidate_ids=names)
+                run["shortlist"] = [(uid, names[uid]) for uid, _ in shortlist]
+                # Frozen so a resumed run works on exactly the same universities, but only once
+                # discovery succeeded; otherwise a resume rebuilds it from what discovery finds then
+                shortlist_frozen = self._tasks_done(run_id, "1")
+                if shortlist_frozen:
+                    self.runs.update_run(run_id, shortlist=run["shortlist"])
+            unis = [(uid, uname) for uid, uname in run["shortlist"]]
+
+            # Matching for all universities goes out as one batched request
+            tasks: List[Task] = [("match", "Research", {
+                "action": "analyze_university_matches",
+                "university_ids": [uid for uid, _ in unis],
+                "student_profile": student_profile,
+                "force_refresh": force_refresh,
+            })]
+            for idx, (uid, uname) in enumerate(unis, 1):
+                logger.info(f"📊 Queued university {idx}/{len(unis)}: {uname}")
+                tasks.append((f"verify:{uid}", "Verification", {"action": "verify_university", "university_id": uid,
+                                                                 "force_refresh": force_refresh}))
+                tasks.append((f"professors:{uid}", "Research", {"action": "find_professors", "university_id": uid,
+                                                                "force_refresh": force_refresh}))
+            uni_results = self._run_phase(executor, run_id, "2-4", tasks)
+            # Stored results come back from JSON with string keys
+            matches = {int(uid): match for uid, match in (uni_results.get("match", {}).get("results") or {}).items()}
+            results["universities"] = [
+                {"id": uid, "name": uname, "match": matches.get(uid),
+                 "verification": uni_results.get(f"verify:{uid}"), "professors": uni_results.get(f"professors:{uid}")}
+                for uid, uname in unis
+            ]
+
+            # Phase 5: Email Generation (for the top local professor matches at shortlisted universities)
+            self._announce_phase("5", "📧 PHASE 5: Generating personalized emails", country)
+            if run["professor_shortlist"] is None:
+                placeholders = ",".join("?" for _ in unis)
+                prof_names = dict(db.fetchall(
+                    f"SELECT id, name FROM professors WHERE university_id IN ({placeholders})",
+                    tuple(uid for uid, _ in unis),
+                )) if unis else {}
+                prof_shortlist = self.preranker.rank("professor", student_profile or "", PRERANK_TOP_PROFESSORS, candidate_ids=prof_names)
+                run["professor_shortlist"] = [(pid, prof_names[pid]) for pid, _ in prof_shortlist]
+                if shortlist_frozen and self._tasks_done(run_id, "2-4", "professors:"):
+                    self.runs.update_run(run_id, professor_shortlist=run["professor_shortlist"])
+            profs = [(pid, pname) for pid, pname in run["professor_shortlist"]]
+
+            tasks = []
+            for idx, (pid, pname) in enumerate(profs, 1):
+                logger.info(f"✍️ Queued email {idx}/{len(profs)} for {pname}")
+                tasks.append((f"email:{pid}", "Outreach", {"action": "generate_email", "professor_id": pid,
+                                                           "student_profile": student_profile, "run_id": run_id,
+                                                           "force_refresh": force_refresh}))
+            email_results = self._run_phase(executor, run_id, "5", tasks)
+            results["professors"] = [{"id": pid, "name": pname} for pid, pname in profs]
+            results["emails"] = [email_results.get(f"email:{pid}") for pid, _ in profs]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        failed = [label for label, task in self.runs.tasks(run_id).items() if task["status"] != DONE]
+        self.runs.update_run(run_id, status=FAILED if failed else DONE, phase="done")
+        if failed:
+            logger.warning(f"⚠️ Run {run_id}: {len(failed)} task(s) did not complete; resume to retry them")
+        self._announce_phase("done", "✅ FLOW COMPLETED SUCCESSFULLY!" if not failed
+                             else f"⚠️ FLOW FINISHED WITH {len(failed)} FAILED TASK(S)", country)
+
         return {
-            "status": "success",
-            "message": "Full autonomous search completed successfully.",
+            "status": "success" if not failed else "partial",
+            "message": "Full autonomous search completed successfully." if not failed
+                       else f"{len(failed)} task(s) failed; resume run {run_id} to retry them.",
+            "run_id": run_id,
+            "failed_tasks": failed,
             "data": results
         }
-
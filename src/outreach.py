@@ -1,9 +1,24 @@
-import sqlite3
-import json
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 from src.agents import Agent
 from src.llm_utils import llm
-from config import DB_PATH, logger
+from src.json_stream import IncrementalJSONParser
+from src.fingerprint import fingerprint
+from database.db import db
+from config import logger
+
+# Bump when the email prompt changes so existing drafts stop being reused
+EMAIL_PROMPT_VERSION = "email-v1"
+_EMAIL_FIELDS = ("subject", "body", "quality_score", "reasoning")
+EMAIL_SCHEMA = {
+    "type": "object",
+    "required": ["subject", "body"],
+    "properties": {
+        "subject": {"type": "string", "minLength": 1},
+        "body": {"type": "string", "minLength": 1},
+        "quality_score": {"type": "number", "minimum": 0, "maximum": 100},
+        "reasoning": {"type": "string"},
+    },
+}
 
 class OutreachAgent(Agent):
     def __init__(self):
@@ -12,25 +27,63 @@ class OutreachAgent(Agent):
     def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
         action = message.get("action")
         if action == "generate_email":
-            return self.generate_email(message.get("professor_id"), message.get("student_profile"))
+            return self.generate_email(message.get("professor_id"), message.get("student_profile"),
+                                       on_update=message.get("on_update"), run_id=message.get("run_id"),
+                                       force_refresh=message.get("force_refresh", False),
+                                       email_id=message.get("email_id"))
         return {"status": "error", "message": "Unknown action"}
 
-    def generate_email(self, professor_id: int, student_profile: str) -> Dict[str, Any]:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.name, p.department, u.name 
+    def generate_email(self, professor_id: int, student_profile: str,
+                       on_update: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       run_id: Optional[int] = None, force_refresh: bool = False,
+                       email_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Draft and store an email for a professor.
+
+        When `on_update` is given the completion is streamed and the callback
+        receives the partial draft ({"subject": ..., "body": ...}) every time
+        it grows, so the UI can show it before generation finishes. With a
+        `run_id` the call is idempotent: a draft that run already stored for
+        this professor is returned instead of generating another. Outside
+        that, a stored draft whose fingerprint (profile, professor, university
+        and prompt version) matches is reused unless `force_refresh` is set.
+        With `email_id` the stored email is redrafted in place: the LLM cache
+        is bypassed and that row is updated instead of a new one inserted.
+        """
+        if email_id is not None:
+            force_refresh = True
+        if run_id is not None:
+            existing = db.fetchone("""
+                SELECT subject, body, quality_score, generation_reasoning
+                FROM emails WHERE run_id = ? AND professor_id = ?
+            """, (run_id, professor_id))
+            if existing:
+                return dict(zip(_EMAIL_FIELDS, existing))
+
+        prof = db.fetchone("""
+            SELECT p.name, p.department, p.research_areas, u.name 
             FROM professors p 
             JOIN universities u ON p.university_id = u.id 
             WHERE p.id = ?
         """, (professor_id,))
-        prof = cursor.fetchone()
-        conn.close()
         
         if not prof:
             return {"status": "error", "message": "Professor not found"}
             
-        prof_name, dept, uni_name = prof
+        prof_name, dept, research_areas, uni_name = prof
+        current = fingerprint(EMAIL_PROMPT_VERSION, student_profile, prof_name, dept, research_areas, uni_name)
+        if not force_refresh:
+            existing = db.fetchone("""
+                SELECT subject, body, quality_score, generation_reasoning
+                FROM emails WHERE professor_id = ? AND fingerprint = ?
+                ORDER BY id DESC LIMIT 1
+            """, (professor_id, current))
+            if existing:
+                logger.info(f"⏭ Draft for {prof_name} is up to date, skipping")
+                email_data = dict(zip(_EMAIL_FIELDS, existing))
+                if on_update is not None:
+                    on_update({"subject": email_data["subject"], "body": email_data["body"]})
+                return email_data
         
         self.log_decision(
             task="Generate Personalized Email",
@@ -61,19 +114,44 @@ class OutreachAgent(Agent):
         Output in JSON format: {{"subject": "...", "body": "...", "quality_score": 90, "reasoning": "..."}}
         """
         
-        response = llm.generate_response(system_prompt, user_prompt)
-        email_data = llm.parse_json_response(response)
+        if on_update is None:
+            email_data = llm.generate_structured(system_prompt, user_prompt, EMAIL_SCHEMA, use_cache=not force_refresh)
+        else:
+            response = self._stream_draft(system_prompt, user_prompt, on_update, use_cache=not force_refresh)
+            email_data = llm.conform_response(response, EMAIL_SCHEMA, system_prompt, user_prompt,
+                                              use_cache=not force_refresh)
+        if not isinstance(email_data, dict) or not email_data.get("subject") or not email_data.get("body"):
+            # Nothing is stored, so the fingerprint cannot pin a failed draft
+            logger.error(f"❌ Draft for {prof_name} failed; not storing it")
+            return {"status": "error", "message": f"Email generation for {prof_name} failed"}
         
         # Save to DB
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO emails (professor_id, subject, body, quality_score, generation_reasoning)
-            VALUES (?, ?, ?, ?, ?)
+        if email_id is not None:
+            db.execute("""
+                UPDATE emails SET subject = ?, body = ?, quality_score = ?, generation_reasoning = ?, fingerprint = ?
+                WHERE id = ?
+            """, (email_data.get('subject'), email_data.get('body'), email_data.get('quality_score'),
+                  email_data.get('reasoning'), current, email_id))
+            return email_data
+        db.execute("""
+            INSERT INTO emails (professor_id, subject, body, quality_score, generation_reasoning, run_id, fingerprint)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (run_id, professor_id) DO NOTHING
         """, (professor_id, email_data.get('subject'), email_data.get('body'), 
-              email_data.get('quality_score'), email_data.get('reasoning')))
-        conn.commit()
-        conn.close()
+              email_data.get('quality_score'), email_data.get('reasoning'), run_id, current))
         
         return email_data
-        
+
+    def _stream_draft(self, system_prompt: str, user_prompt: str,
+                      on_update: Callable[[Dict[str, Any]], None], use_cache: bool = True) -> str:
+        parser = IncrementalJSONParser()
+        parts = []
+        last: Dict[str, Any] = {}
+        for delta in llm.stream_response(system_prompt, user_prompt, use_cache=use_cache):
+            parts.append(delta)
+            parser.feed(delta)
+            draft = parser.snapshot("subject", "body")
+            if draft and draft != last:
+                on_update(draft)
+                last = draft
+        return "".join(parts)
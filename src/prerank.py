@@ -0,0 +1,127 @@
+import re
+import zlib
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from database.db import Database, db
+from config import PRERANK_DIM, logger
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Text that describes each entity type, id first
+ENTITY_SOURCES = {
+    "university": "SELECT id, name, research_areas FROM universities",
+    "professor": "SELECT id, name, department, research_areas, profile_summary FROM professors",
+}
+
+
+class PreRanker:
+    """
+    Local TF-IDF shortlist of universities/professors for a student profile.
+
+    Texts are hashed into sparse unigram+bigram term-frequency vectors that
+    are persisted in entity_vectors, so only new or edited rows are ever
+    vectorized, and the source rows are only re-read after the database
+    changed. Scoring applies IDF over the candidate set and computes all
+    cosine similarities at once with NumPy over a flat sparse layout.
+    """
+
+    def __init__(self, database: Database = db, dim: int = PRERANK_DIM):
+        self.database = database
+        self.dim = dim
+        self._lock = threading.Lock()
+        # entity_type -> (ids, row index per nonzero, feature indices, tf values)
+        self._matrices: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+        # entity_type -> database change token at the last refresh
+        self._tokens: Dict[str, int] = {}
+
+    def vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse (indices, values) of sublinear term frequencies for hashed n-grams."""
+        tokens = TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not grams:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        hashed = np.fromiter((zlib.crc32(g.encode("utf-8")) % self.dim for g in grams),
+                             dtype=np.int32, count=len(grams))
+        indices, counts = np.unique(hashed, return_counts=True)
+        return indices.astype(np.int32), (1.0 + np.log(counts)).astype(np.float32)
+
+    def refresh(self, entity_type: str) -> int:
+        """Vectorize rows whose text changed since they were last stored. Returns rows updated."""
+        token = self.database.change_token()
+        if self._tokens.get(entity_type) == token:
+            return 0
+        stored = dict(self.database.fetchall(
+            "SELECT entity_id, text_hash FROM entity_vectors WHERE entity_type = ?", (entity_type,)
+        ))
+        updates = []
+        for row in self.database.fetchall(ENTITY_SOURCES[entity_type]):
+            text = " ".join(str(field) for field in row[1:] if field)
+            text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+            if stored.get(row[0]) == text_hash:
+                continue
+            indices, values = self.vectorize(text)
+            updates.append((entity_type, row[0], text_hash, indices.tobytes(), values.tobytes()))
+
+        if updates:
+            self.database.executemany("""
+                INSERT OR REPLACE INTO entity_vectors (entity_type, entity_id, text_hash, indices, tf)
+                VALUES (?, ?, ?, ?, ?)
+            """, updates)
+            with self._lock:
+                self._matrices.pop(entity_type, None)
+            logger.info(f"Pre-ranker vectorized {len(updates)} {entity_type} row(s)")
+        # Taken before the scan, so writes made during it trigger another one
+        self._tokens[entity_type] = token
+        return len(updates)
+
+    def _matrix(self, entity_type: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        with self._lock:
+            if entity_type in self._matrices:
+                return self._matrices[entity_type]
+        rows = self.database.fetchall(
+            "SELECT entity_id, indices, tf FROM entity_vectors WHERE entity_type = ? ORDER BY entity_id",
+            (entity_type,),
+        )
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        indices = [np.frombuffer(r[1], dtype=np.int32) for r in rows]
+        values = [np.frombuffer(r[2], dtype=np.float32) for r in rows]
+        row_of = np.repeat(np.arange(len(rows)), [len(i) for i in indices])
+        matrix = (ids, row_of,
+                  np.concatenate(indices) if indices else np.empty(0, dtype=np.int32),
+                  np.concatenate(values) if values else np.empty(0, dtype=np.float32))
+        with self._lock:
+            self._matrices[entity_type] = matrix
+        return matrix
+
+    def rank(self, entity_type: str, profile: str, top_k: int,
+             candidate_ids: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """Return the top_k (entity_id, cosine score) pairs, restricted to candidate_ids if given."""
+        self.refresh(entity_type)
+        ids, row_of, indices, values = self._matrix(entity_type)
+        if candidate_ids is not None:
+            keep_rows = np.isin(ids, np.asarray(list(candidate_ids), dtype=np.int64))
+            mask = keep_rows[row_of]
+            remap = np.cumsum(keep_rows) - 1
+            ids, row_of, indices, values = ids[keep_rows], remap[row_of[mask]], indices[mask], values[mask]
+        if len(ids) == 0:
+            return []
+
+        # IDF over the candidate set, then cosine between weighted vectors
+        df = np.bincount(indices, minlength=self.dim)
+        idf = np.log((1 + len(ids)) / (1 + df)) + 1.0
+        weighted = values * idf[indices]
+        norms = np.sqrt(np.bincount(row_of, weights=weighted ** 2, minlength=len(ids)))
+
+        q_indices, q_values = self.vectorize(profile)
+        query = np.zeros(self.dim, dtype=np.float64)
+        query[q_indices] = q_values * idf[q_indices]
+        q_norm = np.linalg.norm(query)
+
+        dots = np.bincount(row_of, weights=weighted * query[indices], minlength=len(ids))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(norms * q_norm > 0, dots / (norms * q_norm), 0.0)
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(ids[i]), float(scores[i])) for i in order]
@@ -0,0 +1,117 @@
+import re
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from src.llm_utils import estimate_tokens
+from config import (PROMPT_SEARCH_TOKEN_BUDGET, PROMPT_SNIPPET_MAX_CHARS,
+                    PROMPT_DEDUPE_THRESHOLD, logger)
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _shingles(words: List[str], size: int = 3) -> Set[Tuple[str, ...]]:
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def trim_text(text: str, max_chars: int) -> str:
+    """Shorten text to max_chars, cutting at a word boundary."""
+    text = " ".join((text or "").split())
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+class SearchPromptBuilder:
+    """
+    Turns raw search results into a compact, token-budgeted prompt block.
+
+    Results are trimmed to title/snippet/host, near-duplicates (same story
+    returned by several queries or mirrors) are dropped by word-shingle
+    overlap, and the rest are added in relevance order until the budget is
+    spent. Cumulative token savings are kept in `stats`.
+    """
+
+    def __init__(self, budget: int = PROMPT_SEARCH_TOKEN_BUDGET,
+                 snippet_chars: int = PROMPT_SNIPPET_MAX_CHARS,
+                 dedupe_threshold: float = PROMPT_DEDUPE_THRESHOLD):
+        self.budget = budget
+        self.snippet_chars = snippet_chars
+        self.dedupe_threshold = dedupe_threshold
+        self._lock = threading.Lock()
+        self.stats = {"prompts": 0, "raw_tokens": 0, "prompt_tokens": 0, "tokens_saved": 0,
+                      "duplicates_dropped": 0, "over_budget_dropped": 0}
+
+    def _trim(self, result: Dict[str, Any]) -> Dict[str, str]:
+        link = result.get("link") or result.get("href") or ""
+        return {
+            "title": trim_text(result.get("title") or "", 120),
+            "snippet": trim_text(result.get("snippet") or result.get("body") or "", self.snippet_chars),
+            "source": urlparse(link).netloc.lower().removeprefix("www."),
+        }
+
+    @staticmethod
+    def _render(item: Dict[str, str]) -> str:
+        source = f" ({item['source']})" if item["source"] else ""
+        return f"- {item['title']}{source}: {item['snippet']}"
+
+    def build(self, results: List[Dict[str, Any]], focus: str = "",
+              budget: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Returns (prompt_block, metrics) for one prompt.
+
+        `focus` holds the terms the prompt is about (e.g. the search queries);
+        results sharing more of those terms rank first, ties keep search order.
+        """
+        budget = self.budget if budget is None else budget
+        focus_terms = set(_words(focus))
+        raw_tokens = sum(estimate_tokens(str(r)) for r in results)
+
+        kept: List[Tuple[float, int, Dict[str, str]]] = []
+        seen: List[Set[Tuple[str, ...]]] = []
+        duplicates = 0
+        for position, result in enumerate(results):
+            item = self._trim(result)
+            words = _words(f"{item['title']} {item['snippet']}")
+            if not words:
+                continue
+            shingles = _shingles(words)
+            if any(len(shingles & other) / len(shingles | other) >= self.dedupe_threshold for other in seen):
+                duplicates += 1
+                continue
+            seen.append(shingles)
+            relevance = len(focus_terms.intersection(words)) / (len(focus_terms) or 1)
+            kept.append((relevance, position, item))
+        kept.sort(key=lambda entry: (-entry[0], entry[1]))
+
+        lines: List[str] = []
+        used = 0
+        dropped = 0
+        for _, _, item in kept:
+            line = self._render(item)
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                dropped += 1
+                continue
+            lines.append(line)
+            used += cost
+
+        metrics = {"raw_tokens": raw_tokens, "prompt_tokens": used,
+                   "tokens_saved": max(raw_tokens - used, 0),
+                   "duplicates_dropped": duplicates, "over_budget_dropped": dropped}
+        with self._lock:
+            self.stats["prompts"] += 1
+            for name, value in metrics.items():
+                self.stats[name] += value
+        logger.info(f"📉 Search prompt: {raw_tokens} → {used} tokens "
+                    f"({duplicates} duplicates, {dropped} over budget)")
+        return "\n".join(lines) or "(no results)", metrics
+
+
+prompt_builder = SearchPromptBuilder()
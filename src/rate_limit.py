@@ -0,0 +1,230 @@
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+import groq
+from config import (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_IN_FLIGHT,
+                    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX,
+                    LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET, logger)
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `capacity` per `period` seconds.
+
+    `acquire` blocks until enough tokens are available. The balance may go
+    negative through `adjust` (when a call used more than was reserved), in
+    which case later callers wait for the debt to be refilled.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens, sleeping as needed. Returns the seconds spent waiting."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `reset_timeout` seconds.
+
+    After the timeout a single trial call is let through (half-open); its
+    outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, reset_timeout: float = LLM_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                if self.opened_at is None or self._trial:
+                    logger.warning(f"⚡ LLM circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (groq.APIConnectionError, groq.APITimeoutError)):
+        return True
+    return getattr(error, "status_code", None) in RETRY_STATUSES
+
+
+class LLMRateLimiter:
+    """
+    Wraps LLM API calls with client-side rate limiting and fault handling.
+
+    Every call reserves one request and its estimated tokens from per-minute
+    token buckets, holds one of `max_in_flight` slots while running, retries
+    retryable errors with exponential backoff plus jitter (never sooner than a
+    Retry-After header asks) and goes through a circuit breaker so an outage
+    fails fast instead of queueing work behind retries. Counters live in `stats`.
+    """
+
+    def __init__(self, requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = LLM_TOKENS_PER_MINUTE, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 max_retries: int = LLM_MAX_RETRIES, backoff_base: float = LLM_BACKOFF_BASE,
+                 backoff_max: float = LLM_BACKOFF_MAX, breaker: Optional[CircuitBreaker] = None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+                      "circuit_rejections": 0, "throttle_wait": 0.0, "in_flight": 0}
+
+    def _count(self, name: str, value: float = 1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)  # jitter keeps parallel workers from retrying in lockstep
+        retry_after = _retry_after(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _attempt(self, fn: Callable[..., Any], tokens: int, kwargs: Dict[str, Any]) -> Any:
+        """One call under the buckets and an in-flight slot; the caller releases the slot."""
+        waited = self.requests.acquire(1) + self.tokens.acquire(tokens)
+        self._count("throttle_wait", waited)
+        self.slots.acquire()
+        self._count("in_flight")
+        self._count("attempts")
+        try:
+            return fn(**kwargs)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self):
+        self._count("in_flight", -1)
+        self.slots.release()
+
+    def _settle(self, result: Any, tokens: int):
+        usage = getattr(result, "usage", None)
+        used = getattr(usage, "total_tokens", None)
+        if isinstance(used, int):
+            self.tokens.adjust(used - tokens)
+
+    def call(self, fn: Callable[..., Any], tokens: int = 0, **kwargs) -> Any:
+        """
+        Call `fn(**kwargs)` under the limits, retrying retryable failures.
+
+        `tokens` is the estimated prompt + completion size; it is reconciled
+        with the response's usage when available. For `stream=True` calls the
+        in-flight slot is held until the returned iterator is exhausted.
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count("circuit_rejections")
+                raise CircuitOpenError("LLM circuit breaker is open; skipping call")
+            try:
+                result = self._attempt(fn, tokens, kwargs)
+            except Exception as e:
+                if getattr(e, "status_code", None) == 429:
+                    self._count("rate_limited")
+                if not is_retryable(e):
+                    # Client errors say nothing about API health
+                    self.breaker.record_success()
+                    self._count("failures")
+                    raise
+                self.breaker.record_failure()
+                if attempt >= self.max_retries or self.breaker.state == "open":
+                    self._count("failures")
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self._count("retries")
+                logger.warning(f"🔁 LLM call failed ({str(e)}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            if kwargs.get("stream"):
+                return self._hold_while_streaming(result)
+            self._release()
+            self._settle(result, tokens)
+            return result
+
+    def _hold_while_streaming(self, stream: Iterator[Any]) -> Iterator[Any]:
+        try:
+            yield from stream
+        finally:
+            self._release()
+
+
+llm_limiter = LLMRateLimiter()
@@ -1,10 +1,42 @@
-import sqlite3
-import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from src.agents import Agent, MessageBus
-from src.tools import WebSearch, WebScraper, RankingCalculator
+from src.tools import WebSearch, WebScraper, RankingCalculator, MATCH_SCHEMA
 from src.llm_utils import llm
-from config import DB_PATH, logger
+from src.prompt_builder import prompt_builder
+from database.db import db
+from src.entity_resolution import EntityResolver
+from src.fingerprint import fingerprint
+from config import logger
+
+# Bump when a prompt changes so results it produced are recomputed
+MATCH_PROMPT_VERSION = "match-v1"
+PROFESSORS_PROMPT_VERSION = "professors-v2"
+
+# Reply schemas for the extraction prompts (see src.structured)
+UNIVERSITIES_SCHEMA = {"type": "array", "items": {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "country": {"type": ["string", "null"]},
+        "ranking_qs": {"type": ["integer", "null"], "minimum": 1},
+    },
+}}
+PROFESSORS_SCHEMA = {"type": "array", "items": {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": {"type": "string", "minLength": 1},
+        "department": {"type": ["string", "null"]},
+    },
+}}
+
+def _valid_match(match: Any) -> bool:
+    """A score worth storing: both the score and its reasoning came back."""
+    return isinstance(match, dict) and match.get("score") is not None and bool(match.get("reasoning"))
+
+_MATCH_COLUMNS = """name, research_areas, ranking_qs, ranking_the, ranking_arwu,
+                    match_fingerprint, match_score, match_reasoning, confidence_score"""
 
 class ResearchAgent(Agent):
     def __init__(self, search_tool: WebSearch, scraper_tool: WebScraper, ranker: RankingCalculator):
@@ -12,13 +44,20 @@ class ResearchAgent(Agent):
         self.search_tool = search_tool
         self.scraper_tool = scraper_tool
         self.ranker = ranker
+        self.resolver = EntityResolver()
 
     def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
         action = message.get("action")
         if action == "find_universities":
             return self.find_universities(message.get("country"))
+        elif action == "analyze_university_match":
+            return self.analyze_university_match(message.get("university_id"), message.get("student_profile"),
+                                                 force_refresh=message.get("force_refresh", False))
+        elif action == "analyze_university_matches":
+            return self.analyze_university_matches(message.get("university_ids", []), message.get("student_profile"),
+                                                   force_refresh=message.get("force_refresh", False))
         elif action == "find_professors":
-            return self.find_professors(message.get("university_id"))
+            return self.find_professors(message.get("university_id"), force_refresh=message.get("force_refresh", False))
         return {"status": "error", "message": "Unknown action"}
 
     def find_universities(self, country: str) -> Dict[str, Any]:
@@ -36,33 +75,19 @@ class ResearchAgent(Agent):
             f"top universities in {country} QS rankings 2025"
         ]
         
-        raw_search_results = []
-        for query in queries:
-            results = self.search_tool.search(query)
-            raw_search_results.extend(results)
+        raw_search_results = self.search_tool.search_many(queries)
         
         # Use LLM to extract a clean list of university names and countries from raw snippets
         system_prompt = "You are a research assistant. Extract a list of university names and their QS rankings from search results."
-        user_prompt = f"Search Results: {json.dumps(raw_search_results)}\n\nExtract universities in JSON format: [{{'name': '...', 'country': '...', 'ranking_qs': 0}}]. Only include real ones from the text."
+        results_block, _ = prompt_builder.build(raw_search_results, focus=" ".join(queries))
+        user_prompt = f'Search Results:\n{results_block}\n\nExtract universities in JSON format: [{{"name": "...", "country": "...", "ranking_qs": 1}}]. Only include real ones from the text.'
         
-        response = llm.generate_response(system_prompt, user_prompt)
-        extracted_unis = llm.parse_json_response(response)
+        extracted_unis = llm.generate_structured(system_prompt, user_prompt, UNIVERSITIES_SCHEMA)
         
         # 2. Save to DB
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         found_count = 0
         if isinstance(extracted_unis, list):
-            for uni in extracted_unis:
-                cursor.execute("SELECT id FROM universities WHERE name = ?", (uni.get('name'),))
-                if not cursor.fetchone():
-                    cursor.execute("""
-                        INSERT INTO universities (name, country, ranking_qs, verification_status)
-                        VALUES (?, ?, ?, 'needs_check')
-                    """, (uni.get('name'), uni.get('country', country), uni.get('ranking_qs')))
-                    found_count += 1
-        conn.commit()
-        conn.close()
+            found_count = self.resolver.upsert_universities([u for u in extracted_unis if isinstance(u, dict)], country)
 
         return {
             "status": "success", 
@@ -70,17 +95,25 @@ class ResearchAgent(Agent):
             "count": found_count
         }
 
-    def analyze_university_match(self, university_id: int, student_profile: str) -> Dict[str, Any]:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, research_areas FROM universities WHERE id = ?", (university_id,))
-        uni = cursor.fetchone()
-        conn.close()
+    @staticmethod
+    def _match_fingerprint(student_profile: str, name: str, research_areas: Optional[str],
+                           ranking_qs: Optional[int], ranking_the: Optional[int], ranking_arwu: Optional[int]) -> str:
+        return fingerprint(MATCH_PROMPT_VERSION, student_profile, name, research_areas,
+                           ranking_qs, ranking_the, ranking_arwu)
+
+    def analyze_university_match(self, university_id: int, student_profile: str,
+                                 force_refresh: bool = False) -> Dict[str, Any]:
+        """Score one university; the stored score is reused while its inputs are unchanged."""
+        uni = db.fetchone(f"SELECT {_MATCH_COLUMNS} FROM universities WHERE id = ?", (university_id,))
         
         if not uni:
             return {"status": "error", "message": "University not found"}
         
-        name, research_areas = uni
+        name, research_areas, qs, the, arwu, stored, score, reasoning, confidence = uni
+        current = self._match_fingerprint(student_profile, name, research_areas, qs, the, arwu)
+        if stored == current and not force_refresh:
+            logger.info(f"⏭ Match for {name} is up to date, skipping")
+            return {"score": score, "reasoning": reasoning, "confidence": confidence}
         
         system_prompt = "You are an expert PhD matching assistant. Analyze if a university is a good fit for a student."
         user_prompt = f"""
@@ -96,33 +129,82 @@ class ResearchAgent(Agent):
         Output in JSON format: {{"score": 85, "reasoning": "...", "confidence": 0.9}}
         """
         
-        response = llm.generate_response(system_prompt, user_prompt)
-        match_data = llm.parse_json_response(response)
+        match_data = llm.generate_structured(system_prompt, user_prompt, MATCH_SCHEMA, use_cache=not force_refresh)
+        if not _valid_match(match_data):
+            # Keep the old fingerprint so the next run scores this university again
+            logger.error(f"❌ Match analysis for {name} failed; not storing it")
+            return {"status": "error", "message": f"Match analysis for {name} failed"}
         
         # Save results
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        db.execute("""
             UPDATE universities 
-            SET match_score = ?, match_reasoning = ?, confidence_score = ?
+            SET match_score = ?, match_reasoning = ?, confidence_score = ?, match_fingerprint = ?
             WHERE id = ?
-        """, (match_data.get('score'), match_data.get('reasoning'), match_data.get('confidence'), university_id))
-        conn.commit()
-        conn.close()
+        """, (match_data.get('score'), match_data.get('reasoning'), match_data.get('confidence'), current, university_id))
         
         return match_data
 
-    def find_professors(self, university_id: int) -> Dict[str, Any]:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name, website_url FROM universities WHERE id = ?", (university_id,))
-        uni = cursor.fetchone()
-        conn.close()
+    def analyze_university_matches(self, university_ids: List[int], student_profile: str,
+                                   force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Batched variant of analyze_university_match: one LLM request scores many universities.
+
+        Universities whose stored match fingerprint still equals the current
+        one (same profile, name, research areas, rankings and prompt version)
+        keep their score and are left out of the request.
+        """
+        if not university_ids:
+            return {"status": "success", "results": {}, "reused": 0}
+        placeholders = ",".join("?" for _ in university_ids)
+        rows = db.fetchall(
+            f"SELECT id, {_MATCH_COLUMNS} FROM universities WHERE id IN ({placeholders})",
+            tuple(university_ids),
+        )
+        results: Dict[int, Dict[str, Any]] = {}
+        targets: Dict[int, str] = {}
+        fingerprints: Dict[int, str] = {}
+        for uid, name, research_areas, qs, the, arwu, stored, score, reasoning, confidence in rows:
+            current = self._match_fingerprint(student_profile, name, research_areas, qs, the, arwu)
+            if stored == current and not force_refresh:
+                results[uid] = {"score": score, "reasoning": reasoning, "confidence": confidence}
+                continue
+            fingerprints[uid] = current
+            targets[uid] = f"University: {name}. Known Research Areas: {research_areas or 'Not yet scraped'}"
+        if results:
+            logger.info(f"⏭ Reusing {len(results)} up-to-date match(es), scoring {len(targets)}")
+
+        match_data = self.ranker.calculate_matches(student_profile, targets, use_cache=not force_refresh) if targets else {}
+        scored = {uid: m for uid, m in match_data.items() if uid in targets and _valid_match(m)}
+        failed = [uid for uid in targets if uid not in scored]
+        db.executemany("""
+            UPDATE universities 
+            SET match_score = ?, match_reasoning = ?, confidence_score = ?, match_fingerprint = ?
+            WHERE id = ?
+        """, [(m.get('score'), m.get('reasoning'), m.get('confidence'), fingerprints[uid], uid)
+              for uid, m in scored.items()])
+        reused = len(results)
+        results.update(scored)
+
+        if failed:
+            # Failed scores keep their old fingerprint, so a rerun only scores those again
+            logger.error(f"❌ Match analysis failed for {len(failed)} of {len(targets)} universities")
+            return {"status": "error", "message": f"Match analysis failed for {len(failed)} universities",
+                    "results": results, "reused": reused, "failed": failed}
+        return {"status": "success", "results": results, "reused": reused}
+
+    def find_professors(self, university_id: int, force_refresh: bool = False) -> Dict[str, Any]:
+        """Discover faculty at a university, unless the same discovery already produced its professors."""
+        uni = db.fetchone("SELECT name, website_url FROM universities WHERE id = ?", (university_id,))
         
         if not uni:
             return {"status": "error", "message": "University not found"}
             
         uni_name, uni_url = uni
+        current = fingerprint(PROFESSORS_PROMPT_VERSION, uni_name, uni_url)
+        if not force_refresh and db.fetchone(
+                "SELECT 1 FROM professors WHERE university_id = ? AND fingerprint = ? LIMIT 1", (university_id, current)):
+            logger.info(f"⏭ Professors at {uni_name} are up to date, skipping discovery")
+            return {"status": "success", "count": 0, "skipped": True}
         self.log_decision(
             task="Discover Professors",
             decision=f"Searching for faculty at {uni_name}",
@@ -137,22 +219,15 @@ class ResearchAgent(Agent):
         
         # 2. Extract professor info via LLM
         system_prompt = "Extract professor names and departments from search results."
-        user_prompt = f"Search Results: {json.dumps(search_results)}\n\nExtract in JSON format: [{{'name': '...', 'department': '...'}}]"
+        results_block, _ = prompt_builder.build(search_results, focus=f"{query} faculty professor department")
+        user_prompt = f'Search Results:\n{results_block}\n\nExtract in JSON format: [{{"name": "...", "department": "..."}}]'
         
-        response = llm.generate_response(system_prompt, user_prompt)
-        profs = llm.parse_json_response(response)
+        profs = llm.generate_structured(system_prompt, user_prompt, PROFESSORS_SCHEMA, use_cache=not force_refresh)
             
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        saved_count = 0
-        if isinstance(profs, list):
-            for prof in profs:
-                cursor.execute("""
-                    INSERT INTO professors (university_id, name, department, contact_priority, accepting_students)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (university_id, prof.get('name'), prof.get('department'), 3, 'unknown'))
-                saved_count += 1
-        conn.commit()
-        conn.close()
+        if not isinstance(profs, list):
+            logger.error(f"❌ Professor extraction for {uni_name} failed")
+            return {"status": "error", "message": f"Professor extraction for {uni_name} failed"}
+        saved_count = self.resolver.upsert_professors(university_id, [p for p in profs if isinstance(p, dict)],
+                                                      fingerprint=current)
         
         return {"status": "success", "count": saved_count}
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+from database.db import Database, db
+from config import RUN_HEARTBEAT_TIMEOUT
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def current_owner() -> str:
+    """Identifies the thread executing a run: host, process and thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_alive(owner: str) -> Optional[bool]:
+    """
+    Whether the thread named by a current_owner() string still runs.
+
+    Decidable only for owners on this host (None otherwise): a thread of this
+    process must still exist, another process must still exist.
+    """
+    try:
+        host, pid, thread = owner.rsplit(":", 2)
+        pid, thread = int(pid), int(thread)
+    except ValueError:
+        return None
+    if host != socket.gethostname():
+        return None
+    if pid == os.getpid():
+        return any(t.ident == thread for t in threading.enumerate())
+    return _pid_alive(pid)
+
+
+class RunStore:
+    """
+    Persistent checkpoints for run_full_flow.
+
+    A run row records the inputs and the frozen shortlists; every bus message
+    of the run is a task row keyed by (run_id, label) whose state moves
+    pending → running → done/failed. Registering a task twice is a no-op, so a
+    resumed run re-registers its plan and only executes tasks not yet done.
+
+    While a run executes, its row names the owning thread and every finished
+    task refreshes its heartbeat. Runs owned elsewhere are only handed out
+    again once their owner is gone: a dead thread or process on this host is
+    noticed at once, an owner on another host once its heartbeat is
+    RUN_HEARTBEAT_TIMEOUT seconds old. A run a batch worker is executing is
+    therefore never resumed in parallel.
+    """
+
+    def __init__(self, database: Database = db, heartbeat_timeout: float = RUN_HEARTBEAT_TIMEOUT):
+        self.database = database
+        self.heartbeat_timeout = heartbeat_timeout
+
+    def create_run(self, country: str, student_profile: str) -> int:
+        now = time.time()
+        return self.database.execute("""
+            INSERT INTO flow_runs (country, student_profile, status, owner, heartbeat_at, created_at, updated_at)
+            VALUES (?, ?, 'running', ?, ?, ?, ?)
+        """, (country, student_profile, current_owner(), now, now, now)).lastrowid
+
+    def release_dead_owners(self) -> int:
+        """Clear the owner of unfinished runs whose owning thread is known to be gone. Returns how many."""
+        dead = [(run_id, owner) for run_id, owner in self.database.fetchall(
+            "SELECT id, owner FROM flow_runs WHERE owner IS NOT NULL AND status != 'done'"
+        ) if owner != current_owner() and owner_alive(owner) is False]
+        if not dead:
+            return 0
+        return self.database.executemany("UPDATE flow_runs SET owner = NULL WHERE id = ? AND owner = ?", dead)
+
+    def acquire(self, run_id: int) -> bool:
+        """Take ownership of a run unless another live thread holds it. Returns whether it is ours."""
+        self.release_dead_owners()
+        now = time.time()
+        return self.database.execute("""
+            UPDATE flow_runs SET owner = ?, heartbeat_at = ?
+            WHERE id = ? AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)
+        """, (current_owner(), now, run_id, current_owner(), now - self.heartbeat_timeout)).rowcount == 1
+
+    def release(self, run_id: int):
+        self.database.execute("UPDATE flow_runs SET owner = NULL WHERE id = ? AND owner = ?",
+                              (run_id, current_owner()))
+
+    def get_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        row = self.database.fetchone("""
+            SELECT id, country, student_profile, status, phase, shortlist, professor_shortlist, error
+            FROM flow_runs WHERE id = ?
+        """, (run_id,))
+        if not row:
+            return None
+        run = dict(zip(("id", "country", "student_profile", "status", "phase", "shortlist",
+                        "professor_shortlist", "error"), row))
+        for key in ("shortlist", "professor_shortlist"):
+            run[key] = json.loads(run[key]) if run[key] else None
+        return run
+
+    def latest_incomplete(self, country: Optional[str] = None) -> Optional[int]:
+        """Most recently touched unfinished run no other live thread owns, optionally for one country."""
+        self.release_dead_owners()
+        row = self.database.fetchone(f"""
+            SELECT id FROM flow_runs
+            WHERE status != 'done' AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)
+            {"AND country = ?" if country else ""}
+            ORDER BY updated_at DESC LIMIT 1
+        """, (current_owner(), time.time() - self.heartbeat_timeout, *((country,) if country else ())))
+        return row[0] if row else None
+
+    def update_run(self, run_id: int, **fields: Any):
+        """Set run columns (status, phase, shortlist, professor_shortlist, error)."""
+        for key in ("shortlist", "professor_shortlist"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        self.database.execute(f"UPDATE flow_runs SET {assignments} WHERE id = ?", (*fields.values(), run_id))
+
+    def register(self, run_id: int, phase: str, labels: List[str]):
+        self.database.executemany("""
+            INSERT INTO flow_tasks (run_id, label, phase, status, updated_at) VALUES (?, ?, ?, 'pending', ?)
+            ON CONFLICT (run_id, label) DO NOTHING
+        """, [(run_id, label, phase, time.time()) for label in labels])
+
+    def prune(self, run_id: int, phase: str, labels: List[str]) -> int:
+        """Drop a phase's tasks that are no longer in its plan (its shortlist was rebuilt). Returns how many."""
+        placeholders = ",".join("?" for _ in labels)
+        return self.database.execute(f"""
+            DELETE FROM flow_tasks WHERE run_id = ? AND phase = ? {f"AND label NOT IN ({placeholders})" if labels else ""}
+        """, (run_id, phase, *labels)).rowcount
+
+    def tasks(self, run_id: int, phase: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        rows = self.database.fetchall(f"""
+            SELECT label, phase, status, result, error, attempts FROM flow_tasks
+            WHERE run_id = ? {"AND phase = ?" if phase else ""}
+        """, (run_id, phase) if phase else (run_id,))
+        return {label: {"phase": task_phase, "status": status, "result": json.loads(result) if result else None,
+                        "error": error, "attempts": attempts}
+                for label, task_phase, status, result, error, attempts in rows}
+
+    def start(self, run_id: int, labels: List[str]):
+        self.database.executemany("""
+            UPDATE flow_tasks SET status = 'running', attempts = attempts + 1, updated_at = ?
+            WHERE run_id = ? AND label = ?
+        """, [(time.time(), run_id, label) for label in labels])
+
+    def finish(self, run_id: int, label: str, result: Dict[str, Any]):
+        """Store a task's response; responses with status "error" mark the task failed."""
+        failed = not isinstance(result, dict) or result.get("status") == "error"
+        now = time.time()
+        with self.database.transaction("run_task_finish") as conn:
+            conn.execute("""
+                UPDATE flow_tasks SET status = ?, result = ?, error = ?, updated_at = ?
+                WHERE run_id = ? AND label = ?
+            """, (FAILED if failed else DONE, json.dumps(result, default=str),
+                  result.get("message") if failed and isinstance(result, dict) else None, now, run_id, label))
+            conn.execute("UPDATE flow_runs SET heartbeat_at = ? WHERE id = ? AND owner IS NOT NULL", (now, run_id))
+
+    def reset_interrupted(self, run_id: int) -> int:
+        """Tasks left 'running' by a crashed process go back to pending. Returns how many."""
+        return self.database.execute("""
+            UPDATE flow_tasks SET status = 'pending', updated_at = ? WHERE run_id = ? AND status = 'running'
+        """, (time.time(), run_id)).rowcount
+
+    def phase_states(self, run_id: int) -> Dict[str, str]:
+        """Per-phase state: failed if any task failed, done if all done, running if any started, else pending."""
+        states: Dict[str, str] = {}
+        for phase, statuses in self.database.fetchall("""
+            SELECT phase, group_concat(DISTINCT status) FROM flow_tasks WHERE run_id = ? GROUP BY phase
+        """, (run_id,)):
+            statuses = set(statuses.split(","))
+            if FAILED in statuses:
+                states[phase] = FAILED
+            elif statuses == {DONE}:
+                states[phase] = DONE
+            elif statuses & {RUNNING, DONE}:
+                states[phase] = RUNNING
+            else:
+                states[phase] = PENDING
+        return states
@@ -0,0 +1,149 @@
+import time
+import zlib
+import threading
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from database.db import Database, db
+from config import SCRAPE_CACHE_TTL, SCRAPE_CACHE_MAX_BYTES, logger
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Stores between re-reading the cache's true size (other processes write to it too)
+RESYNC_EVERY = 100
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share one cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class ScrapeCache:
+    """
+    Persistent page cache backed by the scrape_cache table.
+
+    Entries hold zlib-compressed page text plus the ETag/Last-Modified
+    validators needed to revalidate stale entries with a conditional GET.
+    Total stored size is bounded; least recently accessed pages go first.
+    The size is tracked as a running total, re-read from the table only
+    every RESYNC_EVERY stores or when the total says the budget is exceeded.
+    """
+
+    def __init__(self, database: Database = db, ttl: float = SCRAPE_CACHE_TTL,
+                 max_bytes: int = SCRAPE_CACHE_MAX_BYTES):
+        self.database = database
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        # scrape_many looks pages up from several threads at once
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self._since_resync = 0
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    @staticmethod
+    def key(url: str, renderer: str = "http") -> str:
+        canonical = canonicalize_url(url)
+        return canonical if renderer == "http" else f"{renderer}:{canonical}"
+
+    def lookup(self, url: str, renderer: str = "http") -> Optional[Dict[str, Any]]:
+        """Return the cached entry for `url` (with a `fresh` flag) or None."""
+        key = self.key(url, renderer)
+        try:
+            row = self.database.fetchone(
+                "SELECT content, etag, last_modified, fetched_at FROM scrape_cache WHERE url = ?", (key,)
+            )
+        except Exception as e:
+            logger.error(f"Scrape cache lookup failed for {url}: {str(e)}")
+            row = None
+        if not row or row[0] is None:
+            self._count("misses")
+            return None
+
+        content, etag, last_modified, fetched_at = row
+        fresh = fetched_at is not None and time.time() - fetched_at < self.ttl
+        self._count("hits" if fresh else "stale")
+        try:
+            # Only feeds eviction order, so a busy database must not turn the hit into an error
+            self.database.execute("UPDATE scrape_cache SET accessed_at = ? WHERE url = ?", (time.time(), key))
+        except Exception as e:
+            logger.warning(f"Scrape cache access time not updated for {url}: {str(e)}")
+        return {
+            "content": zlib.decompress(content).decode("utf-8"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": fresh,
+        }
+
+    def store(self, url: str, content: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, renderer: str = "http"):
+        key = self.key(url, renderer)
+        blob = zlib.compress(content.encode("utf-8"))
+        now = time.time()
+        try:
+            with self.database.transaction("scrape cache store") as conn:
+                old = conn.execute("SELECT size_bytes FROM scrape_cache WHERE url = ?", (key,)).fetchone()
+                conn.execute("""
+                    INSERT OR REPLACE INTO scrape_cache
+                        (url, content, etag, last_modified, size_bytes, fetched_at, accessed_at, scraped_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                """, (key, blob, etag, last_modified, len(blob), now, now))
+            self._count("stores")
+            with self._lock:
+                self._since_resync += 1
+                if self._total is not None and self._since_resync < RESYNC_EVERY:
+                    self._total += len(blob) - ((old[0] or 0) if old else 0)
+                else:
+                    self._total = None
+            self.evict()
+        except Exception as e:
+            logger.error(f"Scrape cache store failed for {url}: {str(e)}")
+
+    def touch(self, url: str, renderer: str = "http"):
+        """Mark a stale entry fresh again after a 304 Not Modified."""
+        now = time.time()
+        self.database.execute(
+            "UPDATE scrape_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+            (now, now, self.key(url, renderer)),
+        )
+        self._count("revalidated")
+
+    def evict(self):
+        """Drop least recently accessed entries until the cache fits in max_bytes."""
+        with self._lock:
+            total = self._total
+        if total is not None and total <= self.max_bytes:
+            return
+        # Unknown or over budget: the true size decides
+        total = self.database.fetchone("SELECT COALESCE(SUM(size_bytes), 0) FROM scrape_cache")[0]
+        with self._lock:
+            self._total, self._since_resync = total, 0
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        freed = 0
+        for url, size in self.database.fetchall(
+            "SELECT url, size_bytes FROM scrape_cache ORDER BY accessed_at ASC"
+        ):
+            victims.append((url,))
+            excess -= size or 0
+            freed += size or 0
+            if excess <= 0:
+                break
+        self.database.executemany("DELETE FROM scrape_cache WHERE url = ?", victims)
+        with self._lock:
+            self._total = total - freed
+        self._count("evictions", len(victims))
@@ -0,0 +1,60 @@
+import re
+import json
+import time
+from typing import Dict, List, Optional
+from database.db import Database, db
+from config import SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ROWS, logger
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so equivalent queries share a key."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class SearchCache:
+    """
+    Persistent cache of web search results keyed on the normalized query.
+
+    Every store also deletes expired entries and, past max_rows, the oldest
+    ones, so the table stays bounded.
+    """
+
+    def __init__(self, database: Database = db, ttl: float = SEARCH_CACHE_TTL,
+                 max_rows: int = SEARCH_CACHE_MAX_ROWS):
+        self.database = database
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def get(self, query: str) -> Optional[List[Dict[str, str]]]:
+        try:
+            row = self.database.fetchone(
+                "SELECT results FROM search_cache WHERE query_key = ? AND created_at > ?",
+                (normalize_query(query), time.time() - self.ttl),
+            )
+        except Exception as e:
+            logger.error(f"Search cache lookup failed for '{query}': {str(e)}")
+            row = None
+        if not row:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, query: str, results: List[Dict[str, str]]):
+        now = time.time()
+        try:
+            with self.database.transaction("search cache store") as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO search_cache (query_key, query, results, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (normalize_query(query), query, json.dumps(results), now))
+                evicted = conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+                evicted += conn.execute("""
+                    DELETE FROM search_cache WHERE query_key IN (
+                        SELECT query_key FROM search_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)
+                """, (self.max_rows,)).rowcount
+            self.stats["stores"] += 1
+            self.stats["evictions"] += evicted
+        except Exception as e:
+            logger.error(f"Search cache store failed for '{query}': {str(e)}")
@@ -0,0 +1,279 @@
+import re
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+Schema = Dict[str, Any]
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false",
+             "None": "null", "NaN": "null", "Infinity": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _candidate(text: str) -> Optional[str]:
+    """The part of an LLM reply that should hold the JSON value."""
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):] if starts else None
+
+
+def _read_string(text: str, start: int) -> Tuple[str, int]:
+    """
+    Read a string literal quoted with text[start] and return it double-quoted.
+
+    A quote only ends the string when it is followed by a JSON delimiter, so
+    apostrophes inside single-quoted strings and stray inner double quotes
+    survive. An unterminated (truncated) string is closed at the end of input.
+    """
+    quote = text[start]
+    parts: List[str] = []
+    i = start + 1
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\":
+            if i + 1 >= len(text):
+                break
+            escaped = text[i + 1]
+            if escaped == "'":
+                parts.append("'")
+            elif escaped in '"\\/bfnrtu':
+                parts.append("\\" + escaped)
+            else:
+                parts.append("\\\\" + escaped)
+            i += 2
+            continue
+        if ch == quote:
+            rest = text[i + 1:].lstrip()
+            if not rest or rest[0] in ",:}]":
+                return '"' + "".join(parts) + '"', i + 1
+        if ch == '"':
+            parts.append('\\"')
+        elif ch == "\n":
+            parts.append("\\n")
+        elif ch == "\t":
+            parts.append("\\t")
+        elif ch != "\r":
+            parts.append(ch)
+        i += 1
+    return '"' + "".join(parts) + '"', len(text)
+
+
+def _is_key(tokens: List[str]) -> bool:
+    return len(tokens) >= 2 and tokens[-1].startswith('"') and tokens[-2] in ("{", ",")
+
+
+def repair_json(text: str) -> Optional[str]:
+    """
+    Rewrite a malformed JSON reply into valid JSON text, or None if there is no JSON value in it.
+
+    Handles the usual LLM slips: prose or code fences around the value,
+    single-quoted strings, unquoted keys, Python literals (True/None),
+    trailing commas, raw newlines in strings, and output truncated mid-value
+    (dangling keys are dropped and open strings/brackets are closed).
+    """
+    text = _candidate(text)
+    if text is None:
+        return None
+    tokens: List[str] = []
+    stack: List[str] = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif ch in "\"'":
+            token, i = _read_string(text, i)
+            tokens.append(token)
+        elif ch in "{[":
+            stack.append(ch)
+            tokens.append(ch)
+            i += 1
+        elif ch in "}]":
+            i += 1
+            if not stack:
+                continue
+            while tokens and tokens[-1] == ",":
+                tokens.pop()
+            tokens.append(_CLOSERS[stack.pop()])
+            if not stack:
+                break
+        elif ch in ",:":
+            tokens.append(ch)
+            i += 1
+        elif ch == "-" or ch.isdigit():
+            match = _NUMBER.match(text, i)
+            if match:
+                tokens.append(match.group())
+                i = match.end()
+            else:
+                i += 1
+        elif ch.isalpha() or ch == "_":
+            end = i
+            while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[i:end]
+            i = end
+            if text[i:].lstrip().startswith(":"):
+                tokens.append(json.dumps(word))
+            else:
+                tokens.append(_LITERALS.get(word, json.dumps(word)))
+        else:
+            i += 1
+
+    # Truncated output: drop whatever cannot be completed, then close what is open
+    while tokens:
+        if tokens[-1] == ",":
+            tokens.pop()
+        elif tokens[-1] == ":":
+            tokens.pop()
+            if tokens and tokens[-1].startswith('"'):
+                tokens.pop()
+        elif stack and stack[-1] == "{" and _is_key(tokens):
+            tokens.pop()
+        else:
+            break
+    tokens.extend(_CLOSERS[opener] for opener in reversed(stack))
+    return "".join(tokens)
+
+
+def loads(text: str) -> Tuple[Any, bool]:
+    """
+    Parse an LLM reply as JSON, repairing it locally if needed.
+
+    Returns (value, repaired). Raises ValueError when nothing usable is found.
+    """
+    candidate = _candidate(text or "")
+    if candidate is not None:
+        try:
+            return json.loads(candidate), False
+        except ValueError:
+            pass
+        try:
+            # Valid JSON followed by prose
+            return json.JSONDecoder().raw_decode(candidate)[0], False
+        except ValueError:
+            pass
+    repaired = repair_json(text or "")
+    if repaired is None:
+        raise ValueError("No JSON value in response")
+    return json.loads(repaired), True
+
+
+def _types(schema: Schema) -> List[str]:
+    kind = schema.get("type", [])
+    return [kind] if isinstance(kind, str) else list(kind)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match and value.strip().rstrip("%").strip() == match.group():
+            return float(match.group())
+    return None
+
+
+def conform(value: Any, schema: Schema, path: str = "$") -> Tuple[Any, List[str]]:
+    """
+    Validate `value` against a JSON-schema subset, coercing where it is unambiguous.
+
+    Supports type (including unions with "null"), properties/required,
+    items, and minimum/maximum. Numeric strings become numbers, a lone
+    object wrapped in a list (or a list wrapped in a one-key object) is
+    unwrapped, a bare list given for an object with a single array property
+    is put under that property, and array items that do not validate are dropped rather than
+    failing the whole value. Invalid object fields are removed from the
+    returned object and reported as errors ("$.field: reason").
+    """
+    types = _types(schema)
+    if value is None:
+        return None, [] if "null" in types else [f"{path}: missing"]
+
+    if "array" in types:
+        if isinstance(value, dict):
+            lists = [v for v in value.values() if isinstance(v, list)]
+            if len(lists) == 1:
+                value = lists[0]
+        if isinstance(value, list):
+            if "items" not in schema:
+                return value, []
+            kept = []
+            for index, item in enumerate(value):
+                item, errors = conform(item, schema["items"], f"{path}[{index}]")
+                if not errors:
+                    kept.append(item)
+            return kept, []
+
+    if "object" in types:
+        arrays = [key for key, sub in schema.get("properties", {}).items() if "array" in _types(sub)]
+        if isinstance(value, list):
+            wrapped = len(value) == 1 and isinstance(value[0], dict)
+            if wrapped and (len(arrays) != 1 or arrays[0] in value[0]):
+                value = value[0]
+            elif len(arrays) == 1:
+                value = {arrays[0]: value}
+        if isinstance(value, dict):
+            result = dict(value)
+            errors: List[str] = []
+            required = schema.get("required", [])
+            for key, subschema in schema.get("properties", {}).items():
+                if result.get(key) is None and key not in required:
+                    continue
+                conformed, field_errors = conform(result.get(key), subschema, f"{path}.{key}")
+                if field_errors:
+                    result.pop(key, None)
+                    errors.extend(field_errors)
+                else:
+                    result[key] = conformed
+            return result, errors
+
+    if "integer" in types or "number" in types:
+        number = _number(value)
+        if number is not None:
+            if "number" not in types:
+                number = int(round(number))
+            elif isinstance(number, float) and number.is_integer() and not isinstance(value, float):
+                number = int(number)
+            if "minimum" in schema and number < schema["minimum"]:
+                return value, [f"{path}: {value!r} is below {schema['minimum']}"]
+            if "maximum" in schema and number > schema["maximum"]:
+                return value, [f"{path}: {value!r} is above {schema['maximum']}"]
+            return number, []
+
+    if "string" in types and isinstance(value, str):
+        if not value.strip() and schema.get("minLength", 0) > 0:
+            return value, [f"{path}: empty"]
+        return value, []
+    if "boolean" in types and isinstance(value, bool):
+        return value, []
+    return value, [f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"]
+
+
+def parse(text: str, schema: Schema) -> Tuple[Any, List[str], bool]:
+    """loads() followed by conform(). Returns (value, errors, repaired); value is None if unparseable."""
+    try:
+        value, repaired = loads(text)
+    except ValueError as e:
+        return None, [f"$: {str(e)}"], False
+    value, errors = conform(value, schema)
+    return value, errors, repaired
+
+
+def failing_fields(errors: List[str]) -> List[str]:
+    """Top-level object keys named by conform() errors ("$.score: ..." -> "score")."""
+    fields = []
+    for error in errors:
+        match = re.match(r"\$\.(\w+)", error)
+        if match and match.group(1) not in fields:
+            fields.append(match.group(1))
+    return fields
+
+
+def is_object(schema: Schema) -> bool:
+    return _types(schema) == ["object"]
@@ -1,82 +1,334 @@
 import os
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
-from PyPDF2 import PdfReader
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from src.ingestion import DocumentIngestor
+from src.scrape_cache import ScrapeCache, canonicalize_url
+from src.browser_pool import BrowserPool, browser_pool as default_browser_pool
+from src.search_cache import SearchCache, normalize_query
+from src.tracing import tracer
 from config import GROQ_API_KEY, MODEL_NAME, logger
 
+try:
+    from duckduckgo_search import DDGS
+except ImportError:
+    DDGS = None
+
+# Reply schemas for the matching prompts (see src.structured)
+MATCH_SCHEMA = {
+    "type": "object",
+    "required": ["score", "reasoning"],
+    "properties": {
+        "score": {"type": "number", "minimum": 0, "maximum": 100},
+        "reasoning": {"type": "string"},
+        "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+    },
+}
+BATCH_MATCH_SCHEMA = {
+    "type": "object",
+    "required": ["results"],
+    "properties": {
+        "results": {"type": "array", "items": {
+            "type": "object",
+            "required": ["id", "score"],
+            "properties": {"id": {"type": "integer"}, **MATCH_SCHEMA["properties"]},
+        }},
+    },
+}
+
 class Tool:
     pass
 
 class CVParser(Tool):
+    def __init__(self, ingestor: Optional[DocumentIngestor] = None):
+        self.ingestor = ingestor or DocumentIngestor()
+
     def parse_cv(self, pdf_path: str) -> str:
         if not os.path.exists(pdf_path):
             logger.error(f"CV file not found: {pdf_path}")
             return ""
-        
-        try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text
-        except Exception as e:
-            logger.error(f"Error parsing CV: {str(e)}")
-            return ""
+        return self.ingestor.parse(pdf_path)
+
+    def parse_profile(self, cv_path: str, transcript_path: Optional[str] = None) -> str:
+        """CV plus (when present) transcript, cached as one profile record."""
+        return self.ingestor.parse_profile(cv_path, transcript_path)
 
 class WebSearch(Tool):
-    def search(self, query: str) -> List[Dict[str, str]]:
-        """Real web search using DuckDuckGo (Free)."""
-        logger.info(f"WebSearch: Searching for '{query}' using DuckDuckGo")
+    def __init__(self, cache: Optional[SearchCache] = None):
+        from config import SEARCH_MAX_WORKERS
+        self.cache = cache or SearchCache()
+        self.max_workers = SEARCH_MAX_WORKERS
+        # One DDGS session per thread, reused across queries and closed in close()
+        # (or as soon as a search through it fails). search_many keeps a
+        # long-lived executor so its worker sessions persist too.
+        self._local = threading.local()
+        self._sessions: List[Any] = []
+        self._sessions_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _session(self):
+        session = getattr(self._local, "ddgs", None)
+        if session is None:
+            if DDGS is None:
+                raise ImportError("duckduckgo_search is not installed")
+            ddgs = DDGS()
+            session = ddgs.__enter__()
+            with self._sessions_lock:
+                self._sessions.append(ddgs)
+            self._local.ddgs, self._local.context = session, ddgs
+        return session
+
+    @staticmethod
+    def _exit_session(ddgs):
         try:
-            from duckduckgo_search import DDGS
-            with DDGS() as ddgs:
-                results = [r for r in ddgs.text(query, max_results=10)]
-                return [{"title": r['title'], "link": r['href'], "snippet": r['body']} for r in results]
+            ddgs.__exit__(None, None, None)
         except Exception as e:
-            logger.error(f"DuckDuckGo Search failed: {str(e)}")
+            logger.warning(f"Closing DuckDuckGo session failed: {str(e)}")
+
+    def _drop_session(self):
+        """Close this thread's session, e.g. because a search through it failed."""
+        ddgs = getattr(self._local, "context", None)
+        self._local.ddgs = self._local.context = None
+        if ddgs is None:
+            return
+        with self._sessions_lock:
+            if ddgs in self._sessions:
+                self._sessions.remove(ddgs)
+        self._exit_session(ddgs)
+
+    def search(self, query: str, use_cache: bool = True) -> List[Dict[str, str]]:
+        """Real web search using DuckDuckGo (Free)."""
+        with tracer.span("search", query) as span:
+            if use_cache:
+                cached = self.cache.get(query)
+                if cached is not None:
+                    span.set(cached=True, results=len(cached))
+                    return cached
+
+            logger.info(f"WebSearch: Searching for '{query}' using DuckDuckGo")
+            try:
+                results = [r for r in self._session().text(query, max_results=10)]
+                results = [{"title": r['title'], "link": r['href'], "snippet": r['body']} for r in results]
+            except Exception as e:
+                logger.error(f"DuckDuckGo Search failed: {str(e)}")
+                # Drop the session in case it is what broke
+                self._drop_session()
+                span.set(error=str(e))
+                return []
+            self.cache.put(query, results)
+            span.set(cached=False, results=len(results))
+            return results
+
+    def search_many(self, queries: List[str], use_cache: bool = True) -> List[Dict[str, str]]:
+        """
+        Run several queries concurrently and merge their results.
+
+        Queries that normalize to the same key run once, and results pointing
+        at the same canonical URL are kept only the first time they appear.
+        """
+        unique: Dict[str, str] = {}
+        for query in queries:
+            unique.setdefault(normalize_query(query), query)
+        if not unique:
             return []
 
+        with self._sessions_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="WebSearch")
+        batches = list(self._executor.map(tracer.wrap(lambda q: self.search(q, use_cache)), unique.values()))
+
+        merged: List[Dict[str, str]] = []
+        seen = set()
+        for batch in batches:
+            for result in batch:
+                key = canonicalize_url(result["link"]) if result.get("link") else result.get("title")
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(result)
+        return merged
+
+    def close(self):
+        with self._sessions_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            sessions, self._sessions = self._sessions, []
+            self._local = threading.local()
+        for ddgs in sessions:
+            self._exit_session(ddgs)
+
+class HostThrottle:
+    """Caps concurrent requests per host and spaces out request starts."""
+
+    def __init__(self, per_host_limit: int, delay: float):
+        self.per_host_limit = per_host_limit
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    def _slot(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.Semaphore(self.per_host_limit)
+            return self._slots[host]
+
+    def acquire(self, host: str):
+        self._slot(host).acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+
+    def release(self, host: str):
+        self._slot(host).release()
+
+
 class WebScraper(Tool):
-    def __init__(self):
-        from config import HEADERS, TIMEOUT
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, cache: Optional[ScrapeCache] = None, browser_pool: Optional[BrowserPool] = None):
+        from config import (HEADERS, TIMEOUT, max_retries, SCRAPE_MAX_WORKERS,
+                            SCRAPE_PER_HOST_LIMIT, SCRAPE_HOST_DELAY, SCRAPE_BACKOFF_BASE)
         self.headers = HEADERS
         self.timeout = TIMEOUT
+        self.max_retries = max_retries
+        self.max_workers = SCRAPE_MAX_WORKERS
+        self.backoff_base = SCRAPE_BACKOFF_BASE
+        self.cache = cache or ScrapeCache()
+        self.browser_pool = browser_pool or default_browser_pool
+        self.throttle = HostThrottle(SCRAPE_PER_HOST_LIMIT, SCRAPE_HOST_DELAY)
+
+        # One keep-alive session shared by all workers; urllib3 keeps a
+        # connection pool per host so repeat fetches skip DNS/TCP/TLS setup.
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _fetch(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """GET with per-host politeness and exponential backoff on transient failures."""
+        host = urlsplit(url).netloc.lower()
+        for attempt in range(self.max_retries):
+            last_attempt = attempt == self.max_retries - 1
+            self.throttle.acquire(host)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                response = None
+            finally:
+                self.throttle.release(host)
+
+            if response is not None and (response.status_code not in self.RETRY_STATUSES or last_attempt):
+                return response
+
+            delay = self.backoff_base * (2 ** attempt)
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            logger.warning(f"Retrying {url} in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+        raise RuntimeError(f"No attempts made for {url}")
+
+    @staticmethod
+    def _extract_text(html: str) -> str:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Clean up
+        for script_or_style in soup(["script", "style", "nav", "footer"]):
+            script_or_style.decompose()
+
+        return soup.get_text(separator=' ', strip=True)
+
+    def scrape_url(self, url: str, use_cache: bool = True) -> str:
+        with tracer.span("scrape", url, renderer="requests"):
+            return self._scrape_url(url, use_cache)
+
+    def _scrape_url(self, url: str, use_cache: bool) -> str:
+        cached = self.cache.lookup(url) if use_cache else None
+        if cached and cached["fresh"]:
+            return cached["content"]
 
-    def scrape_url(self, url: str) -> str:
         logger.info(f"Scraping: {url}")
+        headers = dict(self.headers)
+        if cached:
+            # Revalidate the stale copy instead of refetching the whole page
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
         try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self._fetch(url, headers)
+            if response.status_code == 304 and cached:
+                self.cache.touch(url)
+                return cached["content"]
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Clean up
-            for script_or_style in soup(["script", "style", "nav", "footer"]):
-                script_or_style.decompose()
-                
-            return soup.get_text(separator=' ', strip=True)
+            text = self._extract_text(response.text)
+            if text:
+                self.cache.store(url, text, etag=response.headers.get("ETag"),
+                                 last_modified=response.headers.get("Last-Modified"))
+            return text
         except Exception as e:
             logger.error(f"Scraping failed for {url}: {str(e)}")
-            return ""
+            return cached["content"] if cached else ""
+
+    def scrape_many(self, urls: Iterable[str], use_cache: bool = True) -> Iterator[Tuple[str, str]]:
+        """
+        Scrape many URLs concurrently, yielding (url, text) pairs as each completes.
+
+        Duplicate URLs (after canonicalization) are fetched once. Per-host
+        limits still apply, so a list dominated by one host stays polite.
+        """
+        unique: Dict[str, str] = {}
+        for url in urls:
+            unique.setdefault(canonicalize_url(url), url)
+        if not unique:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(unique))) as executor:
+            scrape = tracer.wrap(self.scrape_url)
+            futures = {executor.submit(scrape, url, use_cache): url for url in unique.values()}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
-    def scrape_playwright(self, url: str) -> str:
+    def scrape_playwright(self, url: str, use_cache: bool = True) -> str:
         """Fallback for JS-heavy sites using real Playwright browser."""
+        with tracer.span("scrape", url, renderer="playwright"):
+            return self._scrape_playwright(url, use_cache)
+
+    def _scrape_playwright(self, url: str, use_cache: bool) -> str:
+        cached = self.cache.lookup(url, renderer="playwright") if use_cache else None
+        if cached and cached["fresh"]:
+            return cached["content"]
+
         try:
-            from playwright.sync_api import sync_playwright
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                page.goto(url, timeout=30 * 1000)
-                content = page.content()
-                browser.close()
-                soup = BeautifulSoup(content, 'html.parser')
-                return soup.get_text(separator=' ', strip=True)
+            host = urlsplit(url).netloc.lower()
+            self.throttle.acquire(host)
+            try:
+                content = self.browser_pool.fetch(url)
+            finally:
+                self.throttle.release(host)
+            soup = BeautifulSoup(content, 'html.parser')
+            text = soup.get_text(separator=' ', strip=True)
+            if text:
+                self.cache.store(url, text, renderer="playwright")
+            return text
         except Exception as e:
             logger.error(f"Playwright scraping failed: {str(e)}")
-            return self.scrape_url(url)
+            return self.scrape_url(url, use_cache=use_cache)
 
 class RankingCalculator(Tool):
-    def calculate_match(self, profile: str, target_description: str) -> Dict[str, Any]:
+    def calculate_match(self, profile: str, target_description: str, use_cache: bool = True) -> Dict[str, Any]:
         """Real matching logic using LLM for profile comparison."""
         from src.llm_utils import llm
         
@@ -89,5 +341,59 @@ class RankingCalculator(Tool):
         Output JSON: {{"score": 85, "reasoning": "Detailed explanation..."}}
         """
         
-        response = llm.generate_response(system_prompt, user_prompt)
-        return llm.parse_json_response(response)
+        return llm.generate_structured(system_prompt, user_prompt, MATCH_SCHEMA, use_cache=use_cache)
+
+    def calculate_matches(self, profile: str, targets: Dict[Any, str],
+                          use_cache: bool = True) -> Dict[Any, Dict[str, Any]]:
+        """
+        Score many targets against one profile, several per LLM request.
+
+        Targets are chunked so each request stays within LLM_BATCH_TOKEN_BUDGET
+        and LLM_BATCH_MAX_ITEMS. Any target missing from a chunk's parsed
+        output (or a whole chunk that fails to parse) is retried on its own
+        via calculate_match.
+        """
+        from src.llm_utils import llm, estimate_tokens
+        from config import LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_MAX_ITEMS
+
+        system_prompt = "You are a PhD matching expert. Compare a student profile with several research opportunities."
+        budget = max(LLM_BATCH_TOKEN_BUDGET - estimate_tokens(profile), 0)
+
+        chunks: List[List[Any]] = []
+        current: List[Any] = []
+        used = 0
+        for target_id, description in targets.items():
+            cost = estimate_tokens(description)
+            if current and (used + cost > budget or len(current) >= LLM_BATCH_MAX_ITEMS):
+                chunks.append(current)
+                current, used = [], 0
+            current.append(target_id)
+            used += cost
+        if current:
+            chunks.append(current)
+
+        results: Dict[Any, Dict[str, Any]] = {}
+        for chunk in chunks:
+            items = "\n".join(f"[{i}] {targets[target_id]}" for i, target_id in enumerate(chunk))
+            user_prompt = f"""
+        Student Profile: {profile}
+
+        Research/University Descriptions:
+        {items}
+
+        Rate the match of the student with EACH description and explain why.
+        Output JSON: {{"results": [{{"id": 0, "score": 85, "reasoning": "Detailed explanation...", "confidence": 0.9}}]}}
+        """
+            # Entries that fail the schema are dropped and rescored individually below
+            parsed = llm.generate_structured(system_prompt, user_prompt, BATCH_MATCH_SCHEMA, use_cache=use_cache)
+            entries = parsed.get("results") if isinstance(parsed, dict) else None
+            for entry in entries or []:
+                index = entry["id"]
+                if 0 <= index < len(chunk):
+                    results[chunk[index]] = {k: entry.get(k) for k in ("score", "reasoning", "confidence")}
+
+            for target_id in chunk:
+                if target_id not in results:
+                    logger.warning(f"Batched match missing target {target_id}, scoring individually")
+                    results[target_id] = self.calculate_match(profile, targets[target_id], use_cache)
+        return results
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import TRACING_ENABLED, TRACE_BATCH_SIZE, TRACE_KEEP_RUNS, logger
+
+# (trace_id, span_id) of the innermost open span in this context
+_current: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("trace_span", default=None)
+# Set while spans are being written, so the tracer's own queries are not traced
+_suppressed: contextvars.ContextVar[bool] = contextvars.ContextVar("trace_suppressed", default=False)
+
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+
+class _NoopSpan:
+    """Returned when tracing is off or no trace is active; every operation is free."""
+
+    __slots__ = ()
+    trace_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "kind", "name", "attributes", "trace_id", "span_id", "parent_id",
+                 "root", "start", "_clock", "_token")
+
+    def __init__(self, tracer: "Tracer", kind: str, name: str, attributes: Dict[str, Any],
+                 trace_id: str, parent_id: Optional[str], root: bool = False):
+        self.tracer = tracer
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.root = root
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._clock = time.perf_counter()
+        self._token = _current.set((self.trace_id, self.span_id))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = (time.perf_counter() - self._clock) * 1000
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._record(self.trace_id, self.span_id, self.parent_id, self.kind, self.name,
+                            self.start, duration, self.attributes, exc_type is None)
+        if self.root:
+            self.tracer.flush(prune=True)
+        return False
+
+
+class Tracer:
+    """
+    Minimal span tracer for pipeline runs.
+
+    `trace()` opens a root span with a fresh trace id (one per run_full_flow);
+    `span()` opens a child of whatever span is current in this context.
+    Spans are only recorded inside an active trace, so dashboard queries and
+    tests outside a run cost one context-variable lookup, and with tracing
+    disabled `span()` returns a shared no-op object. Finished spans are
+    buffered and written to the trace_spans table in batches.
+
+    Work handed to other threads keeps its parent span when submitted via
+    `wrap()`.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, batch_size: int = TRACE_BATCH_SIZE,
+                 keep_runs: int = TRACE_KEEP_RUNS, database=None):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.keep_runs = keep_runs
+        self._database = database
+        self._buffer: List[Tuple] = []
+        self._lock = threading.Lock()
+
+    @property
+    def database(self):
+        if self._database is None:
+            from database.db import db
+            return db
+        return self._database
+
+    @property
+    def current_trace_id(self) -> Optional[str]:
+        current = _current.get()
+        return current[0] if current else None
+
+    def trace(self, name: str, **attributes: Any):
+        """Root span of a new trace, or a plain child span if a trace is already active."""
+        if not self.enabled:
+            return NOOP_SPAN
+        current = _current.get()
+        if current is not None:
+            return Span(self, "run", name, attributes, current[0], current[1])
+        return Span(self, "run", name, attributes, _new_id(), None, root=True)
+
+    def span(self, kind: str, name: str, **attributes: Any):
+        if not self.enabled:
+            return NOOP_SPAN
+        current = _current.get()
+        if current is None or _suppressed.get():
+            return NOOP_SPAN
+        return Span(self, kind, name, attributes, current[0], current[1])
+
+    def record(self, kind: str, name: str, start: float, duration_ms: float, ok: bool = True, **attributes: Any):
+        """Record an already-measured span (e.g. a stream consumed outside a `with` block)."""
+        current = _current.get() if self.enabled else None
+        if current is None or _suppressed.get():
+            return
+        self._record(current[0], _new_id(), current[1], kind, name, start, duration_ms, attributes, ok)
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Bind fn to the current span so calls on executor threads nest under it."""
+        if not self.enabled or _current.get() is None:
+            return fn
+        context = contextvars.copy_context()
+        # Each call gets its own copy: one Context cannot be entered by two threads at once
+        return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+    def _record(self, trace_id: str, span_id: str, parent_id: Optional[str], kind: str, name: str,
+                start: float, duration_ms: float, attributes: Dict[str, Any], ok: bool):
+        row = (trace_id, span_id, parent_id, kind, " ".join(name.split())[:200], start, duration_ms,
+               json.dumps(attributes, default=str) if attributes else None, "ok" if ok else "error")
+        with self._lock:
+            self._buffer.append(row)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self, prune: bool = False):
+        """Write buffered spans; with `prune`, also drop runs older than the newest `keep_runs`."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        token = _suppressed.set(True)
+        try:
+            with self.database.transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO trace_spans (trace_id, span_id, parent_id, kind, name, start_time,
+                                             duration_ms, attributes, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                if prune:
+                    conn.execute("""
+                        DELETE FROM trace_spans WHERE trace_id IN (
+                            SELECT trace_id FROM trace_spans WHERE parent_id IS NULL
+                            ORDER BY start_time DESC LIMIT -1 OFFSET ?
+                        )
+                    """, (self.keep_runs,))
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} trace span(s): {str(e)}")
+        finally:
+            _suppressed.reset(token)
+
+
+tracer = Tracer()
@@ -1,9 +1,13 @@
-import sqlite3
 import json
 from typing import Dict, Any
 from src.agents import Agent
 from src.llm_utils import llm
-from config import DB_PATH, logger
+from database.db import db
+from src.fingerprint import fingerprint
+from config import logger
+
+# Bump when the verification rules change so every university is re-verified
+VERIFICATION_RULES_VERSION = "verify-v1"
 
 class VerificationAgent(Agent):
     def __init__(self):
@@ -22,34 +26,40 @@ class VerificationAgent(Agent):
         action = message.get("action")
         if action == "verify_university":
             # Delegates to the specific verification method
-            return self.verify_university(message.get("university_id"))
+            return self.verify_university(message.get("university_id"),
+                                          force_refresh=message.get("force_refresh", False))
         # Handles unknown actions
         return {"status": "error", "message": "Unknown action"}
 
-    def verify_university(self, university_id: int) -> Dict[str, Any]:
+    def verify_university(self, university_id: int, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Verifies the ranking data for a specific university by checking its QS and THE rankings.
         Updates the university's verification status and data completeness in the database.
+        Skipped when the rankings are unchanged since the last verification.
 
         Args:
             university_id (int): The ID of the university to verify.
+            force_refresh (bool): Verify again even if the rankings are unchanged.
 
         Returns:
             Dict[str, Any]: A dictionary indicating the status of the verification process.
         """
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
         # Fetch university data from the database
-        cursor.execute("SELECT name, ranking_qs, ranking_the FROM universities WHERE id = ?", (university_id,))
-        uni = cursor.fetchone()
-        conn.close()
+        uni = db.fetchone("""
+            SELECT name, ranking_qs, ranking_the, verification_status, verification_fingerprint
+            FROM universities WHERE id = ?
+        """, (university_id,))
         
         if not uni:
             # Return error if university is not found
             return {"status": "error", "message": "University not found"}
             
-        name, qs, the = uni
+        name, qs, the, stored_status, stored = uni
+        
+        # Same rankings as last time: the stored verdict still holds
+        current = fingerprint(VERIFICATION_RULES_VERSION, qs, the)
+        if stored == current and not force_refresh:
+            return {"status": "success", "verification_status": stored_status, "skipped": True}
         
         # Log the decision to cross-reference rankings
         self.log_decision(
@@ -64,14 +74,10 @@ class VerificationAgent(Agent):
         status = "verified" if (qs and the) else "needs_check"
         completeness = 0.8 if qs else 0.4
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
+        db.execute("""
             UPDATE universities 
-            SET verification_status = ?, data_completeness = ?
+            SET verification_status = ?, data_completeness = ?, verification_fingerprint = ?
             WHERE id = ?
-        """, (status, completeness, university_id))
-        conn.commit()
-        conn.close()
+        """, (status, completeness, current, university_id))
         
         return {"status": "success", "verification_status": status}
@@ -0,0 +1,14 @@
+import pytest
+from config import DB_PATH
+from database.db import db
+from database.db_init import init_db
+from database.audit import audit_writer
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path):
+    # Point the shared pool at a throwaway database for every test
+    db.configure(str(tmp_path / "test.db"))
+    init_db()
+    audit_writer.sync = True
+    yield db
+    db.configure(DB_PATH)
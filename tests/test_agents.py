@@ -1,5 +1,8 @@
+import time
+import threading
 import pytest
-from src.agents import MessageBus, Agent
+from concurrent.futures import CancelledError
+from src.agents import MessageBus, QueuedMessageBus, BusFullError, Agent
 from typing import Dict, Any
 
 class MockAgent(Agent):
@@ -28,3 +31,79 @@ def test_agent_log_decision(mocker):
     agent.log_decision("Task", "Decision", "Reasoning", 0.9, True)
     assert len(agent.history) == 1
     assert agent.history[0]["task"] == "Task"
+
+
+class BlockingAgent(Agent):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.release = threading.Event()
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        self.release.wait(5)
+        with self._lock:
+            self.running -= 1
+        return {"status": "success", "n": message.get("n")}
+
+def test_queued_bus_send_is_synchronous():
+    bus = QueuedMessageBus()
+    bus.register_agent(MockAgent("TestAgent"))
+    response = bus.send_message("TestAgent", {"data": "hello"})
+    assert response["received"]["data"] == "hello"
+    bus.shutdown()
+
+def test_queued_bus_runs_agent_workers_concurrently():
+    bus = QueuedMessageBus()
+    agent = BlockingAgent("Slow")
+    bus.register_agent(agent, workers=3)
+    futures = [bus.submit("Slow", {"n": i}) for i in range(3)]
+    while agent.running < 3:
+        time.sleep(0.01)
+    agent.release.set()
+    assert [f.result(timeout=5)["n"] for f in futures] == [0, 1, 2]
+    assert agent.peak == 3
+    bus.shutdown()
+
+def test_queued_bus_backpressure_and_cancel():
+    bus = QueuedMessageBus(queue_size=1)
+    agent = BlockingAgent("Slow")
+    bus.register_agent(agent, workers=1)
+    first = bus.submit("Slow", {"n": 1})
+    while agent.running < 1:
+        time.sleep(0.01)
+    queued = bus.submit("Slow", {"n": 2})
+    with pytest.raises(BusFullError):
+        bus.submit("Slow", {"n": 3}, timeout=0.05)
+    assert queued.cancel()
+    agent.release.set()
+    assert first.result(timeout=5)["n"] == 1
+    with pytest.raises(CancelledError):
+        queued.result()
+    bus.shutdown()
+
+def test_queued_bus_propagates_errors_and_unknown_agent():
+    class FailingAgent(Agent):
+        def process(self, message):
+            raise RuntimeError("boom")
+
+    bus = QueuedMessageBus()
+    bus.register_agent(FailingAgent("Broken"))
+    with pytest.raises(RuntimeError, match="boom"):
+        bus.send_message("Broken", {})
+    with pytest.raises(ValueError):
+        bus.submit("Missing", {})
+    bus.shutdown()
+
+def test_queued_bus_send_timeout():
+    bus = QueuedMessageBus()
+    agent = BlockingAgent("Slow")
+    bus.register_agent(agent)
+    with pytest.raises(TimeoutError):
+        bus.send_message("Slow", {"n": 1}, timeout=0.05)
+    agent.release.set()
+    bus.shutdown()
@@ -0,0 +1,33 @@
+import time
+from database.audit import AuditWriter
+from database.db import db
+
+def _decision_count():
+    return db.fetchone("SELECT count(*) FROM agent_decisions")[0]
+
+def test_sync_mode_writes_immediately():
+    writer = AuditWriter(sync=True)
+    writer.submit("Agent", "Task", "Decision", "Reasoning", 0.9, True)
+    assert _decision_count() == 1
+
+def test_buffered_records_flush_on_close():
+    writer = AuditWriter(batch_size=100, flush_interval=60, sync=False)
+    for i in range(5):
+        writer.submit("Agent", f"Task {i}", "Decision", "Reasoning", 0.5, True)
+    assert writer.pending() == 5
+    assert _decision_count() == 0
+
+    writer.close()
+    assert writer.pending() == 0
+    assert _decision_count() == 5
+
+def test_batch_size_triggers_background_flush():
+    writer = AuditWriter(batch_size=3, flush_interval=60, sync=False)
+    for i in range(3):
+        writer.submit("Agent", f"Task {i}", "Decision", "Reasoning", 0.5, True)
+    for _ in range(100):
+        if _decision_count() == 3:
+            break
+        time.sleep(0.01)
+    assert _decision_count() == 3
+    writer.close()
@@ -0,0 +1,77 @@
+import logging
+import multiprocessing
+from logging.handlers import RotatingFileHandler
+from unittest.mock import MagicMock
+from src.batch import BatchStore, BatchRunner, format_progress, use_worker_log
+from database.db import db
+
+JOBS = [("Germany", "ml", "ML profile"), ("France", "ml", "ML profile"), ("Japan", "ml", "ML profile")]
+
+
+def _claim_all(path, batch_id, worker, claimed):
+    db.configure(path)
+    store = BatchStore()
+    while (job := store.claim(batch_id, worker)) is not None:
+        claimed.put(job["id"])
+        store.finish(job["id"], {"status": "success", "emails": 1})
+
+
+def test_claims_are_exclusive_across_processes(temp_db):
+    store = BatchStore()
+    batch_id = store.create_batch(JOBS * 10)
+    context = multiprocessing.get_context("spawn")
+    claimed = context.Queue()
+    workers = [context.Process(target=_claim_all, args=(temp_db.path, batch_id, i, claimed)) for i in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    ids = [claimed.get(timeout=5) for _ in range(30)]
+    assert sorted(ids) == sorted(set(ids)) and len(ids) == 30
+    progress = store.progress(batch_id)
+    assert progress["done"] == 30 and progress["emails"] == 30 and progress["pending"] == 0
+
+
+def _flow_result(status):
+    return {"status": status, "message": "1 task(s) failed" if status != "success" else "ok",
+            "failed_tasks": [] if status == "success" else ["email:1"],
+            "data": {"universities": [{"id": 1}], "professors": [{"id": 1}], "emails": [{"subject": "Hi"}]}}
+
+
+def test_runner_retries_failed_jobs_by_resuming_their_run(mocker):
+    orchestrator = MagicMock()
+    orchestrator.runs.create_run.side_effect = [11, 12, 13]
+    orchestrator.runs.get_run.return_value = {"status": "failed"}
+    orchestrator.run_full_flow.side_effect = [_flow_result("success"), _flow_result("partial"), _flow_result("success")]
+    orchestrator.resume_flow.return_value = _flow_result("success")
+    mocker.patch("src.batch.build_agent_graph", return_value=(orchestrator, MagicMock()))
+    runner = BatchRunner(workers=0)
+
+    summary = runner.run(JOBS)
+    assert summary["status"] == "failed"
+    assert (summary["done"], summary["failed"], summary["emails"]) == (2, 1, 3)
+
+    summary = runner.run(batch_id=summary["batch_id"])
+    orchestrator.resume_flow.assert_called_once_with(12, force_refresh=False)
+    assert summary["status"] == "done" and summary["done"] == 3
+
+
+def test_format_progress_reports_throughput():
+    progress = {"pending": 2, "running": 1, "done": 3, "failed": 1, "total": 7, "finished_since": 4, "emails": 9}
+    line = format_progress(progress, elapsed=120.0)
+    assert "4/7 jobs" in line and "2.00 jobs/min" in line and "ETA 1.5 min" in line
+
+
+def test_workers_log_to_their_own_file(tmp_path):
+    target = logging.getLogger("batch-worker-test")
+    shared = RotatingFileHandler(tmp_path / "agent.log", maxBytes=100, backupCount=2)
+    target.addHandler(shared)
+    use_worker_log(3, target)
+
+    (handler,) = target.handlers
+    assert handler.baseFilename == str(tmp_path / "agent.log.worker3")
+    assert handler.maxBytes == 100 and handler.backupCount == 2
+    handler.close()
+    target.removeHandler(handler)
@@ -0,0 +1,42 @@
+from benchmarks.harness import BenchmarkRun, compare, summarize
+from benchmarks.__main__ import main
+
+def test_quick_run_covers_every_section(temp_db, tmp_path):
+    run = BenchmarkRun(universities=50, professors=200, emails=10, llm_latency=0, search_latency=0,
+                       repeat=2, pages=3, workdir=str(tmp_path))
+    report = run.run(["db", "agents", "scrape", "flow"])
+    results = report["results"]
+    assert results["db.generate"]["rows_per_s"] > 0
+    assert results["agent.outreach.generate_email"]["n"] == 2
+    assert results["agent.outreach.generate_email[memoized]"]["n"] == 2
+    assert results["scrape.cold"]["pages"] == 3
+    flow = results["flow.run_full_flow[0]"]
+    assert flow["llm_calls"] > 0 and "phase_1_s" in flow and "peak_mb" in flow
+    # The run leaves the caller's database in place
+    assert temp_db.path != str(tmp_path / "bench.db")
+
+def test_compare_flags_regressions_in_both_directions():
+    baseline = {"results": {"q": {"mean_ms": 10.0, "pages_per_s": 100.0, "peak_mb": 5.0, "n": 5,
+                                  "pages": 3, "llm_calls": 4, "text_mb": 1.0}}}
+    report = {"results": {"q": {"mean_ms": 12.0, "pages_per_s": 50.0, "peak_mb": 5.0, "n": 9,
+                                "pages": 6, "llm_calls": 8, "text_mb": 2.0}}}
+    changes = {c["metric"]: c for c in compare(report, baseline, threshold=0.1)}
+    assert set(changes) == {"mean_ms", "pages_per_s", "peak_mb"}
+    assert changes["mean_ms"]["regression"] and changes["pages_per_s"]["regression"]
+    assert not any(c["regression"] for c in compare(baseline, baseline))
+
+def test_summarize_percentiles():
+    stats = summarize([0.001 * i for i in range(1, 101)])
+    assert round(stats["p50_ms"], 1) == 50.5
+    assert round(stats["p95_ms"]) == 95
+
+def test_cli_writes_report_and_compares(temp_db, tmp_path):
+    args = ["db", "--universities", "20", "--professors", "40", "--emails", "2", "--repeat", "1",
+            "--no-memory", "--output", str(tmp_path)]
+    assert main(args) == 0
+    report = next(tmp_path.glob("bench-*.json"))
+    assert main(args + ["--baseline", str(report), "--threshold", "1000"]) == 0
+
+def test_harness_runs_without_resource_module(mocker):
+    mocker.patch("benchmarks.harness.resource", None)
+    assert BenchmarkRun().max_rss_mb() is None
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import functools
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from src.browser_pool import BrowserPool
+
+@pytest.fixture
+def static_site(tmp_path):
+    (tmp_path / "index.html").write_text(
+        "<html><body><h1>Faculty</h1><img src='photo.png'>"
+        "<script>document.body.insertAdjacentHTML('beforeend', '<p>Rendered by JS</p>')</script>"
+        "</body></html>"
+    )
+    (tmp_path / "photo.png").write_bytes(b"\x89PNG")
+    requested = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            requested.append(self.path)
+
+    server = HTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(tmp_path)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", requested
+    server.shutdown()
+
+@pytest.fixture
+def pool():
+    pytest.importorskip("playwright")
+    pool = BrowserPool(size=2)
+    try:
+        pool.start()
+    except Exception as e:
+        pytest.skip(f"Chromium not available: {e}")
+    yield pool
+    pool.close()
+
+def test_pool_renders_js_and_blocks_images(pool, static_site):
+    base_url, requested = static_site
+    html = pool.fetch(f"{base_url}/index.html")
+    assert "Rendered by JS" in html
+    assert not any(path.endswith(".png") for path in requested)
+
+def test_pool_reuses_browser_across_threads(pool, static_site):
+    base_url, _ = static_site
+    browser = pool._browser
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.fetch(f"{base_url}/index.html"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 4
+    assert pool._browser is browser
+
+def test_failed_fetch_never_returns_a_closed_page():
+    pool = BrowserPool(size=1)
+    wedged = MagicMock()
+    wedged.goto = AsyncMock(side_effect=TimeoutError("navigation timed out"))
+    wedged.context.close = AsyncMock(side_effect=RuntimeError("target closed"))
+    fresh = MagicMock()
+    fresh.goto = AsyncMock()
+    fresh.content = AsyncMock(return_value="<html>ok</html>")
+    pool._new_page = AsyncMock(side_effect=[RuntimeError("browser gone"), fresh])
+
+    async def scenario():
+        pool._pages = asyncio.Queue()
+        await pool._pages.put(wedged)
+        pool._live = 1
+        with pytest.raises(TimeoutError):
+            await pool._fetch("http://example.test")
+        assert pool._live == 0 and pool._pages.empty()
+        assert await pool._fetch("http://example.test") == "<html>ok</html>"
+        assert pool._live == 1 and pool._pages.get_nowait() is fresh
+
+    asyncio.run(scenario())
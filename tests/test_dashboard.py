@@ -0,0 +1,54 @@
+from src import dashboard
+from database.db import db
+
+def _seed():
+    db.executemany("INSERT INTO universities (name, country, match_score, verification_status) VALUES (?, 'DE', ?, ?)",
+                   [(f"Uni {i}", i * 10, "verified" if i % 2 else "needs_check") for i in range(5)])
+    db.executemany("INSERT INTO professors (university_id, name, contact_priority) VALUES (1, ?, ?)",
+                   [(f"Prof {i}", i) for i in range(3)])
+    db.executemany("INSERT INTO emails (professor_id, subject, body, quality_score) VALUES (?, ?, ?, ?)",
+                   [(1, "Hello", "Long body", 70), (2, "Hi", "Other body", 90)])
+
+def test_metrics_in_one_query():
+    _seed()
+    assert dashboard.metrics() == {"universities": 5, "professors": 3, "emails": 2, "verified": 2}
+
+def test_universities_are_paginated_and_sorted():
+    _seed()
+    first = dashboard.universities_page(0, 2)
+    second = dashboard.universities_page(1, 2)
+    assert [r["name"] for r in first] == ["Uni 4", "Uni 3"]
+    assert [r["name"] for r in second] == ["Uni 2", "Uni 1"]
+    assert [r["name"] for r in dashboard.universities_page(0, 2, descending=False)] == ["Uni 0", "Uni 1"]
+
+def test_unknown_sort_falls_back_to_default():
+    _seed()
+    rows = dashboard.universities_page(0, 1, sort="name; DROP TABLE universities")
+    assert rows[0]["name"] == "Uni 4"
+
+def test_email_bodies_load_separately():
+    _seed()
+    headers = dashboard.emails_page(0, 10, sort="Quality")
+    assert "body" not in headers[0]
+    assert headers[0]["Quality"] == 90
+    assert dashboard.email_body(headers[0]["id"]) == "Other body"
+
+def test_change_token_moves_on_write():
+    before = db.change_token()
+    assert db.change_token() == before
+    db.execute("INSERT INTO universities (name, country) VALUES ('New', 'DE')")
+    assert db.change_token() != before
+
+def test_trace_summary_per_span_kind():
+    db.executemany("""
+        INSERT INTO trace_spans (trace_id, span_id, parent_id, kind, name, start_time, duration_ms, status)
+        VALUES (?, ?, ?, ?, 'x', ?, ?, 'ok')
+    """, [("t1", "root", None, "run", 100.0, 500.0)] +
+         [("t1", f"llm{i}", "root", "llm", 100.0 + i, float(10 * (i + 1))) for i in range(20)] +
+         [("t0", "old", None, "run", 50.0, 1.0)])
+    assert [t["trace_id"] for t in dashboard.recent_traces()] == ["t1", "t0"]
+    summary = {row["Span"]: row for row in dashboard.trace_summary("t1")}
+    assert summary["llm"]["Count"] == 20
+    assert summary["llm"]["Total ms"] == 2100.0
+    assert summary["llm"]["p50 ms"] == 110.0 and summary["llm"]["p95 ms"] == 190.0
+    assert summary["run"]["Max ms"] == 500.0
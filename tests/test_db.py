@@ -0,0 +1,48 @@
+import threading
+from database.db import Database, db
+
+def test_pool_uses_wal_journal():
+    mode = db.fetchone("PRAGMA journal_mode")[0]
+    assert mode.lower() == "wal"
+
+def test_connections_are_reused():
+    with db.connection() as first:
+        pass
+    with db.connection() as second:
+        pass
+    assert first is second
+
+def test_transaction_rolls_back_on_error():
+    try:
+        with db.transaction() as conn:
+            conn.execute("INSERT INTO user_preferences (key, value) VALUES ('a', '1')")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert db.fetchone("SELECT value FROM user_preferences WHERE key = 'a'") is None
+
+def test_executemany_commits_all_rows():
+    count = db.executemany(
+        "INSERT INTO user_preferences (key, value) VALUES (?, ?)",
+        [(f"k{i}", str(i)) for i in range(10)],
+    )
+    assert count == 10
+    assert db.fetchone("SELECT count(*) FROM user_preferences")[0] == 10
+
+def test_pool_is_bounded_across_threads(tmp_path):
+    pool = Database(str(tmp_path / "pool.db"), pool_size=2)
+    pool.execute("CREATE TABLE t (x INTEGER)")
+
+    def writer(n):
+        for i in range(20):
+            pool.execute("INSERT INTO t (x) VALUES (?)", (n * 100 + i,))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert pool.fetchone("SELECT count(*) FROM t")[0] == 80
+    assert len(pool._all) <= 2
+    pool.close()
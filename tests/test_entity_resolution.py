@@ -0,0 +1,79 @@
+from database.db import db
+from database.keys import university_key, person_key
+from src.entity_resolution import EntityResolver, BlockingIndex
+
+def test_university_key_expands_abbreviations():
+    assert university_key("TU Munich") == university_key("Technical University of Munich")
+    assert university_key("The Univ. of Edinburgh") == university_key("University of Edinburgh")
+
+def test_person_key_drops_titles():
+    assert person_key("Prof. Dr. Jane Doe") == person_key("jane doe")
+
+def test_blocking_index_matches_near_duplicates():
+    index = BlockingIndex(threshold=0.9)
+    index.add(university_key("Technical University of Munich"), 7)
+    assert index.resolve(university_key("Technical Universty of Munich")) == 7
+    assert index.resolve(university_key("University of Stuttgart")) is None
+
+def test_blocking_index_keeps_distinct_entities_apart():
+    unis = BlockingIndex(threshold=0.9)
+    unis.add(university_key("Technical University of Berlin"), 1)
+    unis.add(university_key("University of Aachen 12"), 2)
+    assert unis.resolve(university_key("Technical University of Dublin")) is None
+    assert unis.resolve(university_key("University of Aachen 120")) is None
+
+    people = BlockingIndex(threshold=0.9, person=True)
+    people.add(person_key("Yang Liu"), 1)
+    people.add(person_key("Xiaoming Li"), 2)
+    people.add(person_key("Alexandria Johnson"), 3)
+    assert people.resolve(person_key("Yang Lu")) is None
+    assert people.resolve(person_key("Xiaoming Lu")) is None
+    assert people.resolve(person_key("Alexandra Johnson")) == 3
+
+def test_blocking_index_ignores_generic_tokens_and_caps_blocks():
+    index = BlockingIndex(threshold=0.9, max_block=10)
+    for i in range(1000):
+        index.add(university_key(f"Technical University of City{i}"), i)
+        index.add(university_key(f"University of Berlin Campus {i}"), 1000 + i)
+    assert max(len(block) for block in index.blocks.values()) == 1
+    assert index.resolve(university_key("Technical Universty of City7")) == 7
+
+    people = BlockingIndex(threshold=0.9, person=True, max_block=10)
+    for i in range(100):
+        people.add(person_key(f"Given{i} Smith"), i)
+    assert len(people.blocks["smith"]) == 10
+    assert people.resolve(person_key("Given50 Smith")) == 50
+
+def test_upsert_universities_merges_and_fills_gaps():
+    resolver = EntityResolver()
+    assert resolver.upsert_universities([{"name": "Technical University of Munich"}], "Germany") == 1
+    new = resolver.upsert_universities([
+        {"name": "TU Munich", "ranking_qs": 28},
+        {"name": "Technical Universty of Munich"},
+        {"name": "University of Stuttgart", "ranking_qs": 300},
+        {"name": "university of stuttgart"},
+    ], "Germany")
+
+    assert new == 1
+    assert db.fetchall("SELECT name, ranking_qs FROM universities ORDER BY id") == [
+        ("Technical University of Munich", 28),
+        ("University of Stuttgart", 300),
+    ]
+
+def test_upsert_universities_merges_fields_of_batch_twins():
+    resolver = EntityResolver()
+    assert resolver.upsert_universities([
+        {"name": "University of Stuttgart"},
+        {"name": "university of stuttgart", "ranking_qs": 300},
+    ], "Germany") == 1
+    assert db.fetchall("SELECT name, ranking_qs FROM universities") == [("University of Stuttgart", 300)]
+
+def test_upsert_professors_is_idempotent():
+    db.execute("INSERT INTO universities (name, country) VALUES ('Uni A', 'Germany')")
+    resolver = EntityResolver()
+    profs = [{"name": "Prof. Ada Lovelace", "department": None}, {"name": "Alan Turing", "department": "CS"}]
+    assert resolver.upsert_professors(1, profs) == 2
+    assert resolver.upsert_professors(1, [{"name": "Ada Lovelace", "department": "Math"}]) == 0
+    assert db.fetchall("SELECT name, department FROM professors ORDER BY id") == [
+        ("Prof. Ada Lovelace", "Math"), ("Alan Turing", "CS"),
+    ]
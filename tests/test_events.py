@@ -0,0 +1,46 @@
+from src.events import EventStream, tail_lines
+
+def test_since_returns_only_newer_events():
+    stream = EventStream(maxlen=10)
+    for i in range(5):
+        stream.publish("decision", f"event {i}")
+    newer = stream.since(3)
+    assert [e["message"] for e in newer] == ["event 3", "event 4"]
+    assert stream.since(stream.last_seq) == []
+
+def test_ring_buffer_drops_oldest_events():
+    stream = EventStream(maxlen=3)
+    for i in range(10):
+        stream.publish("phase", f"event {i}")
+    assert [e["seq"] for e in stream.since(0)] == [8, 9, 10]
+    assert [e["seq"] for e in stream.since(9)] == [10]
+    assert [e["message"] for e in stream.since(0, limit=1)] == ["event 9"]
+
+def test_agent_decisions_are_published(mocker):
+    from src.agents import Agent
+    published = mocker.patch("src.agents.events.publish")
+
+    class Echo(Agent):
+        def process(self, message):
+            return message
+
+    Echo("Echo").log_decision("Task", "Decided", "Because", 0.5, True)
+    published.assert_called_once()
+    assert published.call_args.kwargs["agent"] == "Echo"
+
+def test_tail_lines_reads_only_the_end(tmp_path):
+    log = tmp_path / "agent.log"
+    log.write_text("".join(f"line {i}\n" for i in range(100000)))
+    assert tail_lines(str(log), 3) == ["line 99997", "line 99998", "line 99999"]
+
+def test_tail_lines_respects_byte_budget(tmp_path):
+    log = tmp_path / "agent.log"
+    log.write_text("".join(f"line {i}\n" for i in range(1000)))
+    lines = tail_lines(str(log), 500, max_bytes=100)
+    assert 0 < len(lines) < 20
+    assert lines[-1] == "line 999"
+
+def test_tail_lines_short_file(tmp_path):
+    log = tmp_path / "agent.log"
+    log.write_text("only line")
+    assert tail_lines(str(log), 20) == ["only line"]
@@ -0,0 +1,73 @@
+import pytest
+from src.ingestion import DocumentIngestor
+from src.tools import CVParser
+from database.db import db
+
+def _write_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF".encode("latin-1")
+    path.write_bytes(out)
+    return str(path)
+
+def test_parse_caches_by_content(tmp_path, mocker):
+    cv = _write_pdf(tmp_path / "cv.pdf", ["Machine learning researcher"])
+    ingestor = DocumentIngestor()
+    spy = mocker.spy(ingestor, "extract_text")
+
+    assert "Machine learning researcher" in ingestor.parse(cv)
+    assert "Machine learning researcher" in ingestor.parse(cv)
+    assert spy.call_count == 1
+    assert ingestor.stats == {"hits": 1, "misses": 1}
+
+def test_parallel_extraction_matches_sequential(tmp_path):
+    pdf = _write_pdf(tmp_path / "long.pdf", [f"Page {i} text" for i in range(6)])
+    sequential, _ = DocumentIngestor(parallel_min_pages=100).extract_text(pdf)
+    parallel, pages = DocumentIngestor(parallel_min_pages=2, max_workers=3).extract_text(pdf)
+    assert pages == 6
+    assert parallel == sequential
+    assert "Page 5 text" in parallel
+
+def test_profile_combines_cv_and_transcript(tmp_path):
+    cv = _write_pdf(tmp_path / "cv.pdf", ["Deep learning"])
+    transcript = _write_pdf(tmp_path / "transcript.pdf", ["Linear Algebra A"])
+    parser = CVParser()
+
+    profile = parser.parse_profile(cv, transcript)
+    assert profile.startswith("CV:")
+    assert "Transcript:\nLinear Algebra A" in profile
+    assert parser.parse_profile(cv, transcript) == profile
+
+def test_profile_without_transcript(tmp_path):
+    cv = _write_pdf(tmp_path / "cv.pdf", ["Deep learning"])
+    assert CVParser().parse_profile(cv, str(tmp_path / "missing.pdf")) == "CV:\nDeep learning"
+
+def test_profile_is_not_cached_when_a_document_fails(tmp_path, mocker):
+    cv, transcript = _write_pdf(tmp_path / "cv.pdf", ["CV"]), _write_pdf(tmp_path / "tr.pdf", ["Grades"])
+    ingestor = DocumentIngestor()
+    extract = mocker.patch.object(ingestor, "extract_text", side_effect=[("CV", 1), OSError("corrupt"),
+                                                                          ("Grades", 1)])
+
+    assert ingestor.parse_profile(cv, transcript) == "CV:\nCV"
+    assert db.fetchone("SELECT COUNT(*) FROM student_profiles")[0] == 0
+    assert ingestor.parse_profile(cv, transcript) == "CV:\nCV\n\nTranscript:\nGrades"
+    assert extract.call_count == 3
+    assert db.fetchone("SELECT COUNT(*) FROM student_profiles")[0] == 1
@@ -0,0 +1,31 @@
+import json
+from src.json_stream import IncrementalJSONParser
+
+DOC = {"subject": "PhD inquiry: \"graph\" learning", "body": "Dear Prof. X,\nI am writing…",
+       "quality_score": 90, "tags": ["a", "b}"], "meta": {"x": [1, 2]}}
+
+def test_fields_complete_in_order_across_chunks():
+    text = "```json\n" + json.dumps(DOC) + "\n```"
+    parser = IncrementalJSONParser()
+    seen = []
+    for i in range(0, len(text), 3):
+        seen.extend(parser.feed(text[i:i + 3]))
+    assert seen == list(DOC)
+    assert parser.fields == DOC
+    assert parser.done
+
+def test_partial_string_is_exposed_while_streaming():
+    parser = IncrementalJSONParser()
+    parser.feed('{"subject": "Hello", "body": "Dear Prof\\n')
+    assert parser.fields == {"subject": "Hello"}
+    assert parser.partial() == ("body", "Dear Prof\n")
+    parser.feed('Smi')
+    assert parser.snapshot("body") == {"body": "Dear Prof\nSmi"}
+    parser.feed('th"}')
+    assert parser.fields["body"] == "Dear Prof\nSmith"
+    assert parser.partial() == (None, "")
+
+def test_partial_drops_cut_off_escape():
+    parser = IncrementalJSONParser()
+    parser.feed('{"body": "caf\\u00')
+    assert parser.partial() == ("body", "caf")
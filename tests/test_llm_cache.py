@@ -0,0 +1,26 @@
+from src.llm_cache import LLMCache
+
+def test_key_depends_on_every_input():
+    base = LLMCache.key("model", "system", "user", 0.7)
+    assert base == LLMCache.key("model", "system", "user", 0.7)
+    assert base != LLMCache.key("model", "system", "user", 0.2)
+    assert base != LLMCache.key("other", "system", "user", 0.7)
+
+def test_expired_entries_miss():
+    cache = LLMCache(ttl=-1)
+    cache.put("k", "model", "response", 1.5)
+    assert cache.get("k") is None
+    assert cache.stats["misses"] == 1
+
+def test_latency_saved_is_tracked():
+    cache = LLMCache()
+    cache.put("k", "model", "response", 1.5)
+    assert cache.get("k") == "response"
+    assert cache.stats["latency_saved"] == 1.5
+
+def test_disk_tier_is_bounded():
+    cache = LLMCache(max_rows=3, memory_size=1)
+    for i in range(5):
+        cache.put(f"k{i}", "model", f"response {i}", 0.1)
+    assert cache.database.fetchone("SELECT count(*) FROM llm_cache")[0] == 3
+    assert cache.stats["evictions"] == 2
@@ -26,3 +26,71 @@ def test_parse_json_response_invalid():
     parsed = utils.parse_json_response(response)
     assert "error" in parsed
     assert parsed["raw"] == response
+
+def _utils_with_client(mocker, content="{\"score\": 80}"):
+    utils = LLMUtils()
+    utils.client = mocker.MagicMock()
+    completion = mocker.MagicMock()
+    completion.choices[0].message.content = content
+    utils.client.chat.completions.create.return_value = completion
+    return utils
+
+def test_generate_response_is_cached(mocker):
+    utils = _utils_with_client(mocker)
+    first = utils.generate_response("system", "user", temperature=0.2)
+    second = utils.generate_response("system", "user", temperature=0.2)
+    assert first == second == '{"score": 80}'
+    assert utils.client.chat.completions.create.call_count == 1
+    assert utils.cache.stats["memory_hits"] == 1
+
+def test_generate_response_cache_opt_out(mocker):
+    utils = _utils_with_client(mocker)
+    utils.generate_response("system", "user", use_cache=False)
+    utils.generate_response("system", "user", use_cache=False)
+    assert utils.client.chat.completions.create.call_count == 2
+
+def test_cache_persists_across_instances(mocker):
+    _utils_with_client(mocker).generate_response("system", "user")
+    fresh = _utils_with_client(mocker, content="different")
+    assert fresh.generate_response("system", "user") == '{"score": 80}'
+    assert fresh.cache.stats["disk_hits"] == 1
+
+def _chunk(mocker, content):
+    chunk = mocker.MagicMock()
+    chunk.choices[0].delta.content = content
+    return chunk
+
+def test_stream_response_yields_deltas_and_caches(mocker):
+    utils = LLMUtils()
+    utils.client = mocker.MagicMock()
+    utils.client.chat.completions.create.return_value = iter(
+        [_chunk(mocker, '{"sub'), _chunk(mocker, None), _chunk(mocker, 'ject": 1}')])
+    assert list(utils.stream_response("system", "user")) == ['{"sub', 'ject": 1}']
+    assert utils.client.chat.completions.create.call_args.kwargs["stream"] is True
+    # Second call is served whole from the cache
+    assert list(utils.stream_response("system", "user")) == ['{"subject": 1}']
+    assert utils.client.chat.completions.create.call_count == 1
+
+MATCH_SCHEMA = {"type": "object", "required": ["score", "reasoning"], "properties": {
+    "score": {"type": "number", "minimum": 0, "maximum": 100}, "reasoning": {"type": "string"}}}
+
+def test_parse_json_response_repairs_single_quotes():
+    parsed = LLMUtils().parse_json_response("[{'name': 'Uni A', 'country': 'Germany',}]")
+    assert parsed == [{"name": "Uni A", "country": "Germany"}]
+
+def test_generate_structured_uses_json_mode_and_repairs_locally(mocker):
+    utils = _utils_with_client(mocker, content="{'score': '80', 'reasoning': 'Good fit'")
+    assert utils.generate_structured("system", "user", MATCH_SCHEMA) == {"score": 80, "reasoning": "Good fit"}
+    create = utils.client.chat.completions.create
+    assert create.call_count == 1
+    assert create.call_args.kwargs["response_format"] == {"type": "json_object"}
+    assert utils.output_stats["repaired"] == 1
+
+def test_generate_structured_reasks_only_failing_fields(mocker):
+    utils = LLMUtils()
+    generate = mocker.patch.object(utils, "generate_response",
+                                   side_effect=['{"score": 250, "reasoning": "Good fit"}', '{"score": 85}'])
+    assert utils.generate_structured("system", "user", MATCH_SCHEMA) == {"score": 85, "reasoning": "Good fit"}
+    reask = generate.call_args_list[1].args[1]
+    assert "$.score" in reask and '"reasoning"' not in reask.split("JSON schema:")[1]
+    assert utils.output_stats["reasked"] == 1
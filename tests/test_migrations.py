@@ -0,0 +1,84 @@
+import sqlite3
+import pytest
+from database.db import Database
+from database.db_init import MIGRATIONS, SCHEMA_PATH, migrate
+from database.keys import name_key
+
+# Every query the agents and dashboard issue against the core tables, with the
+# access path the plan must use so none of them degrade into full table scans.
+HOT_QUERIES = [
+    ("SELECT id FROM universities WHERE name_key = ?", ("x",), "ux_universities_name_key"),
+    ("SELECT id, name FROM universities WHERE country = ?", ("x",), "COVERING INDEX idx_universities_country"),
+    ("SELECT name, research_areas FROM universities WHERE id = ?", (1,), "INTEGER PRIMARY KEY"),
+    ("SELECT id, name FROM professors WHERE university_id IN (1, 2)", (), "(university_id=?)"),
+    ("""SELECT p.name, p.department, u.name FROM professors p
+        JOIN universities u ON p.university_id = u.id WHERE p.id = ?""", (1,), "INTEGER PRIMARY KEY"),
+    ("SELECT count(*) FROM universities WHERE verification_status='verified'", (), "idx_universities_verification"),
+    ("""SELECT name, ranking_qs, match_score, verification_status, match_reasoning
+        FROM universities ORDER BY match_score DESC""", (), "idx_universities_match_score"),
+    ("""SELECT p.name, u.name, p.department, p.contact_priority, p.accepting_students
+        FROM professors p JOIN universities u ON p.university_id = u.id
+        ORDER BY p.contact_priority DESC""", (), "idx_professors_contact_priority"),
+    ("""SELECT p.name, e.subject, e.body, e.quality_score FROM emails e
+        JOIN professors p ON e.professor_id = p.id""", (), "INTEGER PRIMARY KEY"),
+    ("SELECT e.id FROM emails e WHERE e.professor_id = ?", (1,), "idx_emails_professor"),
+    ("""SELECT agent_name, task, decision, reasoning FROM agent_decisions
+        ORDER BY created_at DESC LIMIT 20""", (), "idx_agent_decisions_created_at"),
+    ("SELECT entity_id, text_hash FROM entity_vectors WHERE entity_type = ?", ("x",), "sqlite_autoindex_entity_vectors"),
+    ("SELECT url, size_bytes FROM scrape_cache ORDER BY accessed_at ASC", (), "idx_scrape_cache_accessed_at"),
+    ("SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT 10", (), "idx_llm_cache_accessed_at"),
+    ("SELECT name FROM universities ORDER BY ranking_qs ASC, id ASC LIMIT 25 OFFSET 50", (), "idx_universities_ranking_qs"),
+    ("""SELECT p.name, u.name FROM professors p JOIN universities u ON p.university_id = u.id
+        ORDER BY p.contact_priority DESC, p.id DESC LIMIT 25""", (), "idx_professors_contact_priority"),
+    ("""SELECT e.id, p.name, e.subject FROM emails e JOIN professors p ON e.professor_id = p.id
+        ORDER BY e.quality_score DESC, e.id DESC LIMIT 25""", (), "idx_emails_quality"),
+    ("SELECT body FROM emails WHERE id = ?", (1,), "INTEGER PRIMARY KEY"),
+    ("SELECT kind, duration_ms FROM trace_spans WHERE trace_id = ?", ("x",), "idx_trace_spans_trace"),
+    ("""SELECT trace_id, name FROM trace_spans WHERE parent_id IS NULL
+        ORDER BY start_time DESC LIMIT 10""", (), "idx_trace_spans_roots"),
+    ("""SELECT subject, body FROM emails WHERE professor_id = ? AND fingerprint = ?
+        ORDER BY id DESC LIMIT 1""", (1, "x"), "idx_emails_professor_fingerprint (professor_id=? AND fingerprint=?)"),
+    ("SELECT 1 FROM professors WHERE university_id = ? AND fingerprint = ? LIMIT 1", (1, "x"),
+     "idx_professors_university_fingerprint (university_id=? AND fingerprint=?)"),
+    ("SELECT subject, body FROM emails WHERE run_id = ? AND professor_id = ?", (1, 1),
+     "ux_emails_run_professor (run_id=? AND professor_id=?)"),
+    ("UPDATE flow_tasks SET status = 'pending' WHERE run_id = ? AND status = 'running'", (1,),
+     "sqlite_autoindex_flow_tasks_1 (run_id=?)"),
+    ("""UPDATE flow_runs SET owner = ?, heartbeat_at = ?
+        WHERE id = ? AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)""", ("x", 0, 1, "x", 0), "INTEGER PRIMARY KEY"),
+    ("""SELECT id FROM flow_runs WHERE status != 'done' AND (owner IS NULL OR owner = ? OR heartbeat_at < ?)
+        ORDER BY updated_at DESC LIMIT 1""", ("x", 0), "idx_flow_runs_updated_at"),
+    ("SELECT id, owner FROM flow_runs WHERE owner IS NOT NULL AND status != 'done'", (), "idx_flow_runs_owner"),
+    ("""SELECT id, country, profile_name, student_profile, run_id FROM batch_jobs
+        WHERE batch_id = ? AND status = 'pending' ORDER BY id LIMIT 1""", (1,), "idx_batch_jobs_batch (batch_id=? AND status=?)"),
+]
+
+@pytest.mark.parametrize("sql,params,expected", HOT_QUERIES)
+def test_hot_queries_use_indexes(temp_db, sql, params, expected):
+    plan = " | ".join(row[3] for row in temp_db.fetchall(f"EXPLAIN QUERY PLAN {sql}", params))
+    assert expected in plan
+    assert "USE TEMP B-TREE" not in plan
+
+def test_schema_is_at_latest_version(temp_db):
+    assert temp_db.fetchone("PRAGMA user_version")[0] == MIGRATIONS[-1][0]
+
+def test_legacy_database_is_upgraded_and_deduplicated(tmp_path):
+    legacy = Database(str(tmp_path / "legacy.db"))
+    with legacy.connection() as conn:
+        conn.executescript(open(SCHEMA_PATH).read())
+        conn.execute("INSERT INTO universities (name, country) VALUES ('Universität Zürich', 'CH')")
+        conn.execute("INSERT INTO universities (name, country) VALUES ('universitat zurich', 'CH')")
+        conn.execute("INSERT INTO professors (university_id, name) VALUES (2, 'Jane Doe')")
+        conn.execute("INSERT INTO professors (university_id, name) VALUES (1, 'Jane  Doe')")
+        conn.execute("INSERT INTO emails (professor_id, subject) VALUES (1, 'Hello')")
+        conn.execute("INSERT INTO emails (professor_id, subject) VALUES (2, 'Hello again')")
+        migrate(conn)
+        migrate(conn)
+
+        assert conn.execute("SELECT id FROM universities").fetchall() == [(1,)]
+        assert conn.execute("SELECT id, university_id FROM professors").fetchall() == [(1, 1)]
+        assert conn.execute("SELECT DISTINCT professor_id FROM emails").fetchall() == [(1,)]
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO universities (name, name_key, country) VALUES ('UNIVERSITÄT ZÜRICH', ?, 'CH')",
+                         (name_key('UNIVERSITÄT ZÜRICH'),))
+    legacy.close()
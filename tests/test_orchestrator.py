@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import socket
+import threading
+import subprocess
+from typing import Dict, Any
+from src.agents import Agent, MessageBus
+from src.orchestrator import OrchestratorAgent
+from database.db import db
+
+class RecordingAgent(Agent):
+    def __init__(self, name: str, delay: float = 0.0, slow_action: str = None):
+        super().__init__(name)
+        self.delay = delay
+        self.slow_action = slow_action
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(message)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if message.get("action") == "find_universities":
+                return {"status": "success", "count": 0}
+            time.sleep(1.5 if message.get("action") == self.slow_action else self.delay)
+            return {"status": "success", "action": message.get("action")}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+def _seed(universities: int, professors: int):
+    db.executemany("INSERT INTO universities (name, country) VALUES (?, 'Germany')",
+                   [(f"Uni {i}",) for i in range(universities)])
+    db.executemany("INSERT INTO professors (university_id, name) VALUES (1, ?)",
+                   [(f"Prof {i}",) for i in range(professors)])
+
+def _build(**kwargs):
+    bus = MessageBus()
+    agents = {name: RecordingAgent(name, **kwargs) for name in ("Research", "Verification", "Outreach")}
+    for agent in agents.values():
+        bus.register_agent(agent)
+    return OrchestratorAgent(bus), agents
+
+def test_run_full_flow_fans_out_per_university():
+    _seed(universities=5, professors=3)
+    orchestrator, agents = _build(delay=0.2)
+    orchestrator.max_workers = 8
+
+    start = time.monotonic()
+    result = orchestrator.run_full_flow("Germany", "profile")
+    elapsed = time.monotonic() - start
+
+    assert result["status"] == "success"
+    assert len(result["data"]["universities"]) == 5
+    assert len(result["data"]["emails"]) == 3
+    # 15 university tasks + 3 emails at 0.2s each would take 3.6s serially
+    assert elapsed < 2.0
+    assert agents["Research"].peak > 1
+
+def test_slow_task_times_out_without_blocking_phase():
+    _seed(universities=2, professors=1)
+    orchestrator, agents = _build(delay=0.0, slow_action="verify_university")
+    orchestrator.task_timeout = 0.3
+
+    start = time.monotonic()
+    result = orchestrator.run_full_flow("Germany", "profile")
+
+    assert time.monotonic() - start < 1.5
+    verification = [u["verification"] for u in result["data"]["universities"]]
+    assert all(v["message"] == "Timed out" for v in verification)
+    assert result["data"]["emails"][0]["status"] == "success"
+
+def test_run_full_flow_is_traced():
+    _seed(universities=2, professors=1)
+    orchestrator, _ = _build()
+    result = orchestrator.run_full_flow("Germany", "profile")
+    spans = db.fetchall("SELECT kind, name, parent_id FROM trace_spans WHERE trace_id = ?", (result["trace_id"],))
+    kinds = [kind for kind, _, _ in spans]
+    assert kinds.count("run") == 1
+    # find_universities, 1 match, 2 verify, 2 professors, 1 email
+    assert kinds.count("bus") == 7 and kinds.count("agent") == 7
+    assert "db" in kinds
+    assert all(parent for kind, _, parent in spans if kind != "run")
+
+def test_resume_only_runs_incomplete_tasks():
+    _seed(universities=2, professors=1)
+    orchestrator, agents = _build(slow_action="verify_university")
+    orchestrator.task_timeout = 0.3
+    first = orchestrator.run_full_flow("Germany", "profile")
+    assert first["status"] == "partial"
+    assert sorted(first["failed_tasks"]) == ["verify:1", "verify:2"]
+
+    for agent in agents.values():
+        agent.calls.clear()
+        agent.slow_action = None
+    resumed = orchestrator.process({"action": "resume_flow"})
+
+    assert resumed["status"] == "success" and resumed["run_id"] == first["run_id"]
+    assert [c["action"] for c in agents["Verification"].calls] == ["verify_university"] * 2
+    assert agents["Research"].calls == [] and agents["Outreach"].calls == []
+    # Results of tasks finished in the first attempt are returned from the checkpoint
+    assert [u["professors"]["status"] for u in resumed["data"]["universities"]] == ["success", "success"]
+    assert len(resumed["data"]["emails"]) == 1
+    assert orchestrator.resume_flow()["status"] == "error"
+
+def _interrupted_run(orchestrator, owner: str) -> int:
+    run_id = orchestrator.runs.create_run("Germany", "profile")
+    orchestrator.runs.register(run_id, "1", ["discover"])
+    orchestrator.runs.start(run_id, ["discover"])
+    db.execute("UPDATE flow_runs SET owner = ?, heartbeat_at = ? WHERE id = ?", (owner, time.time(), run_id))
+    return run_id
+
+def test_resume_refuses_runs_owned_by_a_live_worker():
+    orchestrator, agents = _build()
+    # The parent process stands in for a batch worker that is still executing the run
+    run_id = _interrupted_run(orchestrator, f"{socket.gethostname()}:{os.getppid()}:1")
+
+    assert orchestrator.runs.latest_incomplete() is None
+    assert orchestrator.resume_flow(run_id)["status"] == "error"
+    assert orchestrator.runs.tasks(run_id)["discover"]["status"] == "running"
+    assert agents["Research"].calls == []
+
+def test_resume_takes_over_runs_of_a_dead_worker():
+    worker = subprocess.Popen([sys.executable, "-c", "pass"])
+    worker.wait()
+    orchestrator, agents = _build()
+    run_id = _interrupted_run(orchestrator, f"{socket.gethostname()}:{worker.pid}:1")
+
+    assert orchestrator.runs.latest_incomplete() == run_id
+    assert orchestrator.resume_flow(run_id)["status"] == "success"
+    assert [c["action"] for c in agents["Research"].calls][0] == "find_universities"
+
+class FlakyDiscoveryAgent(RecordingAgent):
+    """Fails discovery on the first attempt and inserts the universities on the next."""
+
+    def process(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        if message.get("action") == "find_universities":
+            self.calls.append(message)
+            if len(self.calls) == 1:
+                return {"status": "error", "message": "Search unavailable"}
+            _seed(universities=2, professors=1)
+            return {"status": "success", "count": 2}
+        return super().process(message)
+
+def test_resume_rebuilds_shortlists_after_discovery_failed():
+    bus = MessageBus()
+    agents = {"Research": FlakyDiscoveryAgent("Research"), "Verification": RecordingAgent("Verification"),
+              "Outreach": RecordingAgent("Outreach")}
+    for agent in agents.values():
+        bus.register_agent(agent)
+    orchestrator = OrchestratorAgent(bus)
+
+    first = orchestrator.run_full_flow("Germany", "profile")
+    assert first["status"] == "partial" and first["data"]["universities"] == []
+
+    resumed = orchestrator.resume_flow(first["run_id"])
+    assert resumed["status"] == "success"
+    assert len(resumed["data"]["universities"]) == 2
+    assert len(resumed["data"]["emails"]) == 1
+    assert orchestrator.runs.get_run(first["run_id"])["shortlist"] is not None
@@ -0,0 +1,69 @@
+from src.outreach import OutreachAgent
+
+def _professor(db):
+    db.execute("INSERT INTO universities (name, country) VALUES ('Test Uni', 'Germany')")
+    uid = db.fetchone("SELECT id FROM universities")[0]
+    return db.execute("INSERT INTO professors (university_id, name, department) VALUES (?, 'Ada', 'CS')", (uid,)).lastrowid
+
+def test_generate_email_streams_partial_drafts(mocker, temp_db):
+    pid = _professor(temp_db)
+    chunks = ['{"subject": "Hi', ' there", "bo', 'dy": "Dear ', 'Ada"', ', "quality_score": 88}']
+    mocker.patch("src.outreach.llm.stream_response", return_value=iter(chunks))
+    updates = []
+    email = OutreachAgent().generate_email(pid, "profile", on_update=updates.append)
+
+    assert updates[0] == {"subject": "Hi"}
+    assert {"subject": "Hi there", "body": "Dear "} in updates
+    assert updates[-1] == {"subject": "Hi there", "body": "Dear Ada"}
+    assert email["quality_score"] == 88
+    assert temp_db.fetchone("SELECT subject, body FROM emails WHERE professor_id = ?", (pid,)) == ("Hi there", "Dear Ada")
+
+def test_generate_email_without_callback_does_not_stream(mocker, temp_db):
+    pid = _professor(temp_db)
+    generate = mocker.patch("src.outreach.llm.generate_response", return_value='{"subject": "S", "body": "B"}')
+    stream = mocker.patch("src.outreach.llm.stream_response")
+    assert OutreachAgent().generate_email(pid, "profile")["subject"] == "S"
+    generate.assert_called_once()
+    stream.assert_not_called()
+
+def test_generate_email_is_idempotent_per_run(mocker, temp_db):
+    pid = _professor(temp_db)
+    generate = mocker.patch("src.outreach.llm.generate_response", return_value='{"subject": "S", "body": "B"}')
+    agent = OutreachAgent()
+    assert agent.generate_email(pid, "profile", run_id=7)["subject"] == "S"
+    assert agent.generate_email(pid, "profile", run_id=7)["body"] == "B"
+    assert generate.call_count == 1
+    assert temp_db.fetchone("SELECT COUNT(*) FROM emails")[0] == 1
+
+def test_generate_email_reuses_draft_until_inputs_change(mocker, temp_db):
+    pid = _professor(temp_db)
+    generate = mocker.patch("src.outreach.llm.generate_response", return_value='{"subject": "S", "body": "B"}')
+    agent = OutreachAgent()
+    agent.generate_email(pid, "profile", run_id=1)
+    assert agent.generate_email(pid, "profile", run_id=2)["subject"] == "S"
+    assert generate.call_count == 1
+
+    agent.generate_email(pid, "new profile", run_id=3)
+    agent.generate_email(pid, "new profile", run_id=4, force_refresh=True)
+    assert generate.call_count == 3
+    assert generate.call_args.kwargs["use_cache"] is False
+    assert temp_db.fetchone("SELECT COUNT(*) FROM emails")[0] == 3
+
+def test_failed_draft_is_not_stored(mocker, temp_db):
+    pid = _professor(temp_db)
+    mocker.patch("src.outreach.llm.client", None)
+
+    assert OutreachAgent().generate_email(pid, "profile", run_id=1)["status"] == "error"
+    assert temp_db.fetchone("SELECT COUNT(*) FROM emails")[0] == 0
+
+def test_redraft_updates_the_selected_email(mocker, temp_db):
+    pid = _professor(temp_db)
+    generate = mocker.patch("src.outreach.llm.generate_response", return_value='{"subject": "S", "body": "B"}')
+    agent = OutreachAgent()
+    agent.generate_email(pid, "profile")
+    email_id = temp_db.fetchone("SELECT id FROM emails")[0]
+
+    generate.return_value = '{"subject": "S2", "body": "B2"}'
+    assert agent.generate_email(pid, "profile", email_id=email_id)["subject"] == "S2"
+    assert generate.call_args.kwargs["use_cache"] is False
+    assert temp_db.fetchall("SELECT id, subject, body FROM emails") == [(email_id, "S2", "B2")]
@@ -0,0 +1,55 @@
+import time
+from src.prerank import PreRanker
+from database.db import db
+
+def _add_universities(rows):
+    db.executemany("INSERT INTO universities (name, country, research_areas) VALUES (?, 'Germany', ?)", rows)
+
+def test_rank_orders_by_profile_similarity():
+    _add_universities([
+        ("Uni Art", "medieval art history, painting"),
+        ("Uni ML", "machine learning, deep learning, computer vision"),
+        ("Uni Bio", "marine biology"),
+    ])
+    ranked = PreRanker().rank("university", "PhD in deep learning and computer vision", top_k=2)
+    assert ranked[0][0] == 2
+    assert ranked[0][1] > ranked[1][1]
+
+def test_refresh_only_vectorizes_new_or_changed_rows():
+    _add_universities([("Uni A", "robotics"), ("Uni B", "databases")])
+    ranker = PreRanker()
+    assert ranker.refresh("university") == 2
+    assert ranker.refresh("university") == 0
+
+    db.execute("UPDATE universities SET research_areas = 'distributed databases' WHERE id = 2")
+    _add_universities([("Uni C", "compilers")])
+    assert ranker.refresh("university") == 2
+
+def test_rank_respects_candidate_ids():
+    _add_universities([("Uni ML", "machine learning"), ("Uni ML 2", "machine learning"), ("Uni Bio", "biology")])
+    ranked = PreRanker().rank("university", "machine learning", top_k=5, candidate_ids=[2, 3])
+    assert [uid for uid, _ in ranked] == [2, 3]
+
+def test_rank_scales_to_thousands_of_candidates():
+    db.executemany("INSERT INTO professors (university_id, name, research_areas) VALUES (1, ?, ?)",
+                   [(f"Prof {i}", f"topic{i % 97} systems area{i % 13} learning") for i in range(5000)])
+    ranker = PreRanker()
+    ranker.refresh("professor")
+    start = time.monotonic()
+    ranked = ranker.rank("professor", "topic5 systems learning", top_k=10)
+    assert time.monotonic() - start < 1.0
+    assert len(ranked) == 10
+
+def test_refresh_skips_the_scan_until_the_database_changes(mocker):
+    _add_universities([("Uni A", "robotics")])
+    ranker = PreRanker()
+    ranker.refresh("university")
+    ranker.refresh("university")
+    fetchall = mocker.spy(db, "fetchall")
+    assert ranker.refresh("university") == 0
+    fetchall.assert_not_called()
+
+    db.execute("UPDATE universities SET match_reasoning = 'Strong fit' WHERE id = 1")
+    assert ranker.refresh("university") == 0
+    db.execute("UPDATE universities SET research_areas = 'soft robotics' WHERE id = 1")
+    assert ranker.refresh("university") == 1
@@ -0,0 +1,37 @@
+from src.prompt_builder import SearchPromptBuilder, trim_text
+
+def result(title, snippet, link="https://www.example.edu/page"):
+    return {"title": title, "link": link, "snippet": snippet}
+
+def test_trim_text_cuts_at_word_boundary():
+    assert trim_text("alpha beta gamma", 100) == "alpha beta gamma"
+    assert trim_text("alpha beta gamma delta", 12) == "alpha beta…"
+
+def test_build_drops_near_duplicates_and_keeps_host_only():
+    builder = SearchPromptBuilder(budget=1000)
+    snippet = "ETH Zurich is a public research university in Zurich ranked seventh in the QS rankings"
+    block, metrics = builder.build([
+        result("ETH Zurich", snippet, "https://www.ethz.ch/en/about?utm=1"),
+        result("ETH Zurich", snippet + ".", "https://mirror.example.com/eth"),
+        result("EPFL", "EPFL is a public research university in Lausanne"),
+    ])
+    assert metrics["duplicates_dropped"] == 1
+    assert "(ethz.ch)" in block and "utm" not in block
+    assert block.count("ETH Zurich (") == 1
+    assert "EPFL" in block
+
+def test_build_orders_by_relevance_and_respects_budget():
+    builder = SearchPromptBuilder(budget=30)
+    results = [result(f"Unrelated {i}", f"cooking recipe number {i} with extra words") for i in range(5)]
+    results.append(result("Top universities", "QS rankings of universities in Switzerland"))
+    block, metrics = builder.build(results, focus="top universities Switzerland QS rankings")
+    assert block.splitlines()[0].startswith("- Top universities")
+    assert metrics["prompt_tokens"] <= 30
+    assert metrics["over_budget_dropped"] > 0
+    assert metrics["tokens_saved"] == metrics["raw_tokens"] - metrics["prompt_tokens"]
+    assert builder.stats["prompts"] == 1
+
+def test_build_handles_empty_results():
+    block, metrics = SearchPromptBuilder().build([])
+    assert block == "(no results)"
+    assert metrics["prompt_tokens"] == 0
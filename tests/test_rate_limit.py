@@ -0,0 +1,97 @@
+import threading
+import time
+import httpx
+import groq
+import pytest
+from src.rate_limit import TokenBucket, CircuitBreaker, CircuitOpenError, LLMRateLimiter
+
+def _status_error(status, retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "https://api.groq.com"))
+    return groq.APIStatusError("boom", response=response, body=None)
+
+@pytest.fixture
+def no_sleep(mocker):
+    return mocker.patch("src.rate_limit.time.sleep")
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(capacity=600, period=60)  # 10 tokens/s
+    assert bucket.acquire(600) == 0
+    start = time.monotonic()
+    bucket.acquire(1)
+    assert time.monotonic() - start >= 0.05
+
+def test_token_bucket_adjust_charges_debt():
+    bucket = TokenBucket(capacity=100, period=60)
+    bucket.acquire(10)
+    bucket.adjust(200)
+    assert bucket._tokens < 0
+
+def test_retries_rate_limit_honoring_retry_after(no_sleep):
+    calls = []
+    def fn(**kwargs):
+        calls.append(kwargs)
+        if len(calls) < 3:
+            raise _status_error(429, retry_after=7)
+        return "ok"
+
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=100000, backoff_base=0.01)
+    assert limiter.call(fn, tokens=10, model="m") == "ok"
+    assert len(calls) == 3 and calls[0] == {"model": "m"}
+    assert all(c.args[0] >= 7 for c in no_sleep.call_args_list)
+    assert limiter.stats["retries"] == 2 and limiter.stats["rate_limited"] == 2
+    assert limiter.stats["in_flight"] == 0
+
+def test_client_errors_are_not_retried(no_sleep):
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=100000)
+    def fn():
+        raise _status_error(400)
+    with pytest.raises(groq.APIStatusError):
+        limiter.call(fn)
+    assert limiter.stats["attempts"] == 1
+    assert limiter.breaker.state == "closed"
+
+def test_circuit_opens_and_rejects(no_sleep):
+    breaker = CircuitBreaker(threshold=2, reset_timeout=60)
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=100000, max_retries=5, breaker=breaker)
+    def fn():
+        raise _status_error(503)
+    with pytest.raises(groq.APIStatusError):
+        limiter.call(fn)
+    assert breaker.state == "open"
+    assert limiter.stats["attempts"] == 2
+    with pytest.raises(CircuitOpenError):
+        limiter.call(fn)
+    assert limiter.stats["circuit_rejections"] == 1
+
+def test_circuit_half_open_trial_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_in_flight_calls_are_capped():
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=100000, max_in_flight=2)
+    lock, running, peak = threading.Lock(), [0], [0]
+    def fn():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+    threads = [threading.Thread(target=limiter.call, args=(fn,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+def test_stream_holds_slot_until_consumed():
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=100000, max_in_flight=1)
+    stream = limiter.call(lambda stream: iter(["a", "b"]), stream=True)
+    assert limiter.stats["in_flight"] == 1
+    assert list(stream) == ["a", "b"]
+    assert limiter.stats["in_flight"] == 0
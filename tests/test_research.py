@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock
+from src.research import ResearchAgent
+from database.db import db
+
+def _agent(ranker=None):
+    return ResearchAgent(MagicMock(), MagicMock(), ranker or MagicMock())
+
+def test_analyze_university_matches_saves_batched_scores():
+    db.executemany("INSERT INTO universities (name, country) VALUES (?, 'Germany')", [("Uni A",), ("Uni B",)])
+    ranker = MagicMock()
+    ranker.calculate_matches.return_value = {
+        1: {"score": 80, "reasoning": "Good", "confidence": 0.8},
+        2: {"score": 30, "reasoning": "Poor", "confidence": 0.6},
+    }
+
+    result = _agent(ranker).process({"action": "analyze_university_matches", "university_ids": [1, 2], "student_profile": "ML"})
+
+    assert result["status"] == "success"
+    targets = ranker.calculate_matches.call_args.args[1]
+    assert set(targets) == {1, 2}
+    assert db.fetchall("SELECT id, match_score FROM universities ORDER BY id") == [(1, 80), (2, 30)]
+
+def test_find_professors_skips_known_professors(mocker):
+    db.execute("INSERT INTO universities (name, country) VALUES ('Uni A', 'Germany')")
+    mock_llm = mocker.patch("src.research.llm")
+    mock_llm.generate_structured.return_value = [
+        {"name": "Dr. Ada Lovelace", "department": "CS"},
+        {"name": "dr ada lovelace", "department": "CS"},
+    ]
+    agent = _agent()
+    agent.search_tool.search.return_value = []
+
+    assert agent.find_professors(1)["count"] == 1
+    assert agent.find_professors(1, force_refresh=True)["count"] == 0
+    assert db.fetchone("SELECT count(*) FROM professors")[0] == 1
+
+def test_analyze_university_matches_rescores_only_changed_inputs():
+    db.executemany("INSERT INTO universities (name, country) VALUES (?, 'Germany')", [("Uni A",), ("Uni B",)])
+    ranker = MagicMock()
+    ranker.calculate_matches.side_effect = lambda profile, targets, use_cache: {
+        uid: {"score": 50, "reasoning": "Ok", "confidence": 0.5} for uid in targets}
+    agent = _agent(ranker)
+
+    agent.analyze_university_matches([1, 2], "ML")
+    db.execute("UPDATE universities SET research_areas = 'robotics' WHERE id = 2")
+    result = agent.analyze_university_matches([1, 2], "ML")
+
+    assert set(ranker.calculate_matches.call_args.args[1]) == {2}
+    assert result["reused"] == 1 and result["results"][1]["score"] == 50
+
+    agent.analyze_university_matches([1, 2], "ML", force_refresh=True)
+    assert set(ranker.calculate_matches.call_args.args[1]) == {1, 2}
+    assert ranker.calculate_matches.call_args.kwargs["use_cache"] is False
+    assert ranker.calculate_matches.call_count == 3
+
+def test_find_professors_skips_unchanged_discovery(mocker):
+    db.execute("INSERT INTO universities (name, country) VALUES ('Uni A', 'Germany')")
+    mock_llm = mocker.patch("src.research.llm")
+    mock_llm.generate_structured.return_value = [{"name": "Ada Lovelace", "department": "CS"}]
+    agent = _agent()
+    agent.search_tool.search.return_value = []
+
+    agent.find_professors(1)
+    assert agent.find_professors(1)["skipped"] is True
+    assert agent.search_tool.search.call_count == 1
+
+    agent.find_professors(1, force_refresh=True)
+    assert mock_llm.generate_structured.call_args.kwargs["use_cache"] is False
+
+def test_failed_match_is_not_fingerprinted(mocker):
+    db.execute("INSERT INTO universities (name, country) VALUES ('Uni A', 'Germany')")
+    mocker.patch("src.research.llm.client", None)
+    agent = _agent()
+
+    assert agent.analyze_university_match(1, "ML")["status"] == "error"
+    assert db.fetchone("SELECT match_score, match_fingerprint FROM universities") == (None, None)
+
+def test_analyze_university_matches_reports_failed_scores():
+    db.executemany("INSERT INTO universities (name, country) VALUES (?, 'Germany')", [("Uni A",), ("Uni B",)])
+    ranker = MagicMock()
+    ranker.calculate_matches.return_value = {
+        1: {"score": 80, "reasoning": "Good", "confidence": 0.8},
+        2: {"error": "Invalid JSON format", "raw": "Error: LLM client not configured"},
+    }
+    agent = _agent(ranker)
+
+    result = agent.analyze_university_matches([1, 2], "ML")
+    assert result["status"] == "error" and result["failed"] == [2]
+    assert db.fetchall("SELECT id, match_fingerprint IS NOT NULL FROM universities ORDER BY id") == [(1, 1), (2, 0)]
+
+    agent.analyze_university_matches([1, 2], "ML")
+    assert set(ranker.calculate_matches.call_args.args[1]) == {2}
@@ -0,0 +1,53 @@
+import time
+from src.run_store import RunStore
+
+def test_tasks_are_registered_once_and_track_state(temp_db):
+    store = RunStore(temp_db)
+    run_id = store.create_run("Germany", "profile")
+    store.register(run_id, "2-4", ["verify:1", "professors:1"])
+    store.start(run_id, ["verify:1"])
+    store.finish(run_id, "verify:1", {"status": "success", "verification_status": "verified"})
+    store.register(run_id, "2-4", ["verify:1", "professors:1"])
+
+    tasks = store.tasks(run_id)
+    assert tasks["verify:1"]["status"] == "done" and tasks["verify:1"]["attempts"] == 1
+    assert tasks["verify:1"]["result"]["verification_status"] == "verified"
+    assert tasks["professors:1"]["status"] == "pending"
+    assert store.phase_states(run_id) == {"2-4": "running"}
+
+def test_error_results_fail_the_task_and_phase(temp_db):
+    store = RunStore(temp_db)
+    run_id = store.create_run("Germany", "profile")
+    store.register(run_id, "5", ["email:1"])
+    store.start(run_id, ["email:1"])
+    store.finish(run_id, "email:1", {"status": "error", "message": "Timed out"})
+    assert store.tasks(run_id)["email:1"]["error"] == "Timed out"
+    assert store.phase_states(run_id) == {"5": "failed"}
+
+def test_interrupted_tasks_are_requeued_and_runs_found(temp_db):
+    store = RunStore(temp_db)
+    done = store.create_run("France", "p")
+    store.update_run(done, status="done")
+    run_id = store.create_run("Germany", "p")
+    store.update_run(run_id, shortlist=[[1, "Uni"]])
+    store.register(run_id, "1", ["discover"])
+    store.start(run_id, ["discover"])
+    assert store.reset_interrupted(run_id) == 1
+    assert store.tasks(run_id)["discover"]["status"] == "pending"
+    assert store.latest_incomplete() == run_id
+    assert store.latest_incomplete("France") is None
+    assert store.get_run(run_id)["shortlist"] == [[1, "Uni"]]
+
+def test_runs_owned_by_live_threads_are_not_handed_out(temp_db):
+    store = RunStore(temp_db, heartbeat_timeout=60)
+    run_id = store.create_run("Germany", "p")
+    temp_db.execute("UPDATE flow_runs SET owner = 'worker-host:4242:1', heartbeat_at = ? WHERE id = ?",
+                    (time.time(), run_id))
+    assert store.latest_incomplete() is None
+    assert not store.acquire(run_id)
+
+    temp_db.execute("UPDATE flow_runs SET heartbeat_at = ? WHERE id = ?", (time.time() - 120, run_id))
+    assert store.latest_incomplete() == run_id
+    assert store.acquire(run_id)
+    store.release(run_id)
+    assert temp_db.fetchone("SELECT owner FROM flow_runs WHERE id = ?", (run_id,))[0] is None
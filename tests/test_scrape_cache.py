@@ -0,0 +1,59 @@
+from src.scrape_cache import ScrapeCache, canonicalize_url
+
+def test_canonicalize_url_normalizes_equivalent_spellings():
+    a = canonicalize_url("HTTPS://Example.com:443/faculty?b=2&a=1&utm_source=x#team")
+    b = canonicalize_url("https://example.com/faculty?a=1&b=2")
+    assert a == b == "https://example.com/faculty?a=1&b=2"
+
+def test_store_and_lookup_roundtrip():
+    cache = ScrapeCache()
+    cache.store("https://example.com/a", "page text", etag='"v1"')
+    entry = cache.lookup("https://example.com/a#top")
+    assert entry["content"] == "page text"
+    assert entry["etag"] == '"v1"'
+    assert entry["fresh"]
+    assert cache.stats["hits"] == 1
+
+def test_expired_entries_are_stale():
+    cache = ScrapeCache(ttl=-1)
+    cache.store("https://example.com/a", "page text")
+    entry = cache.lookup("https://example.com/a")
+    assert not entry["fresh"]
+    assert cache.stats["stale"] == 1
+
+def test_renderers_are_cached_separately():
+    cache = ScrapeCache()
+    cache.store("https://example.com/a", "static")
+    assert cache.lookup("https://example.com/a", renderer="playwright") is None
+    assert cache.stats["misses"] == 1
+
+def test_eviction_keeps_cache_under_budget():
+    cache = ScrapeCache(max_bytes=200)
+    for i in range(10):
+        cache.store(f"https://example.com/{i}", f"unique page body number {i} " * 5)
+    total = cache.database.fetchone("SELECT SUM(size_bytes) FROM scrape_cache")[0]
+    assert total <= 200
+    assert cache.stats["evictions"] > 0
+
+def test_lookup_returns_hit_when_access_time_update_fails(mocker):
+    cache = ScrapeCache()
+    cache.store("https://example.com/a", "page text")
+    mocker.patch.object(cache.database, "execute", side_effect=Exception("database is locked"))
+    entry = cache.lookup("https://example.com/a")
+    assert entry["content"] == "page text"
+    assert cache.stats["hits"] == 1
+
+def test_stats_are_counted_safely_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    cache = ScrapeCache()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: [cache._count("misses") for _ in range(1000)], range(8)))
+    assert cache.stats["misses"] == 8000
+
+def test_store_does_not_resum_the_cache_every_time(mocker):
+    cache = ScrapeCache(max_bytes=10_000_000)
+    spy = mocker.spy(cache.database, "fetchone")
+    for i in range(20):
+        cache.store(f"https://example.com/{i}", "page text")
+    sums = [c for c in spy.call_args_list if "SUM(size_bytes)" in c.args[0]]
+    assert len(sums) == 1
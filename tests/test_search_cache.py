@@ -0,0 +1,22 @@
+import time
+from src.search_cache import SearchCache
+from database.db import db
+
+def test_store_prunes_expired_entries():
+    cache = SearchCache(ttl=60)
+    cache.put("old query", [])
+    db.execute("UPDATE search_cache SET created_at = ?", (time.time() - 120,))
+    cache.put("new query", [{"title": "T"}])
+
+    assert [row[0] for row in db.fetchall("SELECT query_key FROM search_cache")] == ["new query"]
+    assert cache.stats["evictions"] == 1
+
+def test_store_caps_rows_dropping_the_oldest():
+    cache = SearchCache(max_rows=3)
+    start = time.time() - 100
+    for i in range(5):
+        cache.put(f"query {i}", [])
+        db.execute("UPDATE search_cache SET created_at = ? WHERE query_key = ?", (start + i, f"query {i}"))
+
+    assert db.fetchone("SELECT COUNT(*) FROM search_cache")[0] == 3
+    assert {row[0] for row in db.fetchall("SELECT query_key FROM search_cache")} == {"query 2", "query 3", "query 4"}
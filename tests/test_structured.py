@@ -0,0 +1,41 @@
+import pytest
+from src.structured import loads, repair_json, conform, failing_fields
+
+MATCH = {"type": "object", "required": ["score", "reasoning"], "properties": {
+    "score": {"type": "number", "minimum": 0, "maximum": 100},
+    "reasoning": {"type": "string"},
+    "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+}}
+NAMES = {"type": "array", "items": {"type": "object", "required": ["name"], "properties": {
+    "name": {"type": "string", "minLength": 1}, "ranking_qs": {"type": ["integer", "null"]}}}}
+
+@pytest.mark.parametrize("text, expected", [
+    ("[{'name': 'TU Munich', 'department': 'CS'}]", [{"name": "TU Munich", "department": "CS"}]),
+    ("{'name': 'King's College', 'ok': True}", {"name": "King's College", "ok": True}),
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ('Sure! ```json\n{name: "ETH", rank: None}\n``` Hope this helps', {"name": "ETH", "rank": None}),
+    ('{"subject": "Hi", "body": "Dear Prof', {"subject": "Hi", "body": "Dear Prof"}),
+    ('{"subject": "Hi", "bo', {"subject": "Hi"}),
+    ('[{"name": "A"}, {"name": "B", "ranking_qs": 1', [{"name": "A"}, {"name": "B", "ranking_qs": 1}]),
+    ('{"body": "He said "hi" to me\nthen left"}', {"body": 'He said "hi" to me\nthen left'}),
+])
+def test_loads_repairs_common_malformations(text, expected):
+    value, repaired = loads(text)
+    assert value == expected
+    assert repaired
+
+def test_loads_leaves_valid_json_alone():
+    assert loads('Here you go: {"score": 80} and some prose') == ({"score": 80}, False)
+    assert repair_json("no json here") is None
+    with pytest.raises(ValueError):
+        loads("no json here")
+
+def test_conform_coerces_and_reports_failing_fields():
+    value, errors = conform({"score": "85", "confidence": 3, "extra": 1}, MATCH)
+    assert value == {"score": 85, "extra": 1}
+    assert failing_fields(errors) == ["reasoning", "confidence"]
+
+def test_conform_drops_invalid_items_and_unwraps_containers():
+    value, errors = conform({"universities": [{"name": "A", "ranking_qs": "12"}, {"name": ""}, "junk"]}, NAMES)
+    assert value == [{"name": "A", "ranking_qs": 12}] and errors == []
+    assert conform([{"score": 70, "reasoning": "ok"}], MATCH) == ({"score": 70, "reasoning": "ok"}, [])
@@ -1,5 +1,6 @@
 import pytest
-from src.tools import WebSearch, RankingCalculator
+from src.tools import WebSearch, WebScraper, RankingCalculator
+from src.scrape_cache import ScrapeCache
 from unittest.mock import MagicMock
 
 def test_web_search_mocked(mocker):
@@ -21,11 +22,138 @@ def test_web_search_mocked(mocker):
 def test_ranking_calculator_llm(mocker):
     # Mocking LLMUtils
     mock_llm = mocker.patch("src.llm_utils.llm")
-    mock_llm.generate_response.return_value = '{"score": 95, "reasoning": "Strong match"}'
-    mock_llm.parse_json_response.return_value = {"score": 95, "reasoning": "Strong match"}
+    mock_llm.generate_structured.return_value = {"score": 95, "reasoning": "Strong match"}
     
     ranker = RankingCalculator()
     result = ranker.calculate_match("Student profile", "Target description")
     
     assert result["score"] == 95
     assert "Strong match" in result["reasoning"]
+
+def test_web_scraper_serves_repeat_urls_from_cache(mocker):
+    response = MagicMock(status_code=200, text="<html><body><p>Faculty</p></body></html>", headers={})
+    scraper = WebScraper()
+    mock_get = mocker.patch.object(scraper.session, "get", return_value=response)
+
+    assert scraper.scrape_url("https://example.com/faculty") == "Faculty"
+    assert scraper.scrape_url("https://example.com/faculty") == "Faculty"
+    assert mock_get.call_count == 1
+
+def test_web_scraper_revalidates_stale_pages(mocker):
+    cache = ScrapeCache(ttl=-1)
+    cache.store("https://example.com/faculty", "Cached faculty", etag='"abc"')
+    scraper = WebScraper(cache=cache)
+    mock_get = mocker.patch.object(scraper.session, "get", return_value=MagicMock(status_code=304, headers={}))
+
+    assert scraper.scrape_url("https://example.com/faculty") == "Cached faculty"
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+    assert cache.stats["revalidated"] == 1
+
+def test_web_scraper_retries_transient_errors(mocker):
+    scraper = WebScraper()
+    scraper.backoff_base = 0
+    ok = MagicMock(status_code=200, text="<p>Recovered</p>", headers={})
+    mock_get = mocker.patch.object(scraper.session, "get",
+                                   side_effect=[MagicMock(status_code=503, headers={}), ok])
+
+    assert scraper.scrape_url("https://example.com/flaky") == "Recovered"
+    assert mock_get.call_count == 2
+
+def test_scrape_many_streams_unique_urls(mocker):
+    scraper = WebScraper()
+    scraper.throttle.delay = 0
+    mocker.patch.object(scraper.session, "get",
+                        side_effect=lambda url, **kw: MagicMock(status_code=200, text=f"<p>{url}</p>", headers={}))
+
+    urls = ["https://a.example/1", "https://a.example/1#x", "https://b.example/2"]
+    results = dict(scraper.scrape_many(urls))
+    assert results == {
+        "https://a.example/1": "https://a.example/1",
+        "https://b.example/2": "https://b.example/2",
+    }
+
+def test_ranking_calculator_batches_targets(mocker):
+    mock_llm = mocker.patch("src.llm_utils.llm")
+    mock_llm.generate_structured.return_value = {"results": [
+        {"id": 0, "score": 90, "reasoning": "Great", "confidence": 0.9},
+        {"id": 1, "score": 40, "reasoning": "Weak", "confidence": 0.7},
+    ]}
+
+    ranker = RankingCalculator()
+    results = ranker.calculate_matches("Student profile", {10: "Uni A", 20: "Uni B"})
+
+    assert mock_llm.generate_structured.call_count == 1
+    assert results[10]["score"] == 90
+    assert results[20]["reasoning"] == "Weak"
+
+def test_ranking_calculator_falls_back_per_item(mocker):
+    mock_llm = mocker.patch("src.llm_utils.llm")
+    mock_llm.generate_structured.side_effect = [
+        {"results": [{"id": 0, "score": 90, "reasoning": "Great"}]},
+        {"score": 55, "reasoning": "Scored alone"},
+    ]
+
+    ranker = RankingCalculator()
+    results = ranker.calculate_matches("Student profile", {1: "Uni A", 2: "Uni B"})
+
+    assert mock_llm.generate_structured.call_count == 2
+    assert results[1]["score"] == 90
+    assert results[2]["score"] == 55
+
+def test_ranking_calculator_chunks_by_item_limit(mocker):
+    mocker.patch("config.LLM_BATCH_MAX_ITEMS", 2)
+    mock_llm = mocker.patch("src.llm_utils.llm")
+    mock_llm.generate_structured.return_value = {"results": [
+        {"id": 0, "score": 1}, {"id": 1, "score": 2},
+    ]}
+
+    ranker = RankingCalculator()
+    results = ranker.calculate_matches("Student profile", {i: f"Uni {i}" for i in range(4)})
+
+    assert mock_llm.generate_structured.call_count == 2
+    assert len(results) == 4
+
+def test_web_search_caches_and_reuses_session(mocker):
+    mock_ddgs_class = mocker.patch("src.tools.DDGS")
+    mock_instance = mock_ddgs_class.return_value.__enter__.return_value
+    mock_instance.text.side_effect = lambda query, max_results: [
+        {"title": query, "href": f"http://example.com/{len(query)}", "body": "Snippet"}
+    ]
+
+    search = WebSearch()
+    search.search("Top Universities in Germany")
+    search.search("top universities in germany?")
+    search.search("faculty list")
+
+    assert mock_instance.text.call_count == 2
+    assert mock_ddgs_class.call_count == 1
+    assert search.cache.stats["hits"] == 1
+
+def test_web_search_many_dedupes_queries_and_urls(mocker):
+    mock_ddgs_class = mocker.patch("src.tools.DDGS")
+    mock_instance = mock_ddgs_class.return_value.__enter__.return_value
+    mock_instance.text.return_value = [
+        {"title": "Shared", "href": "https://example.com/list?utm_source=ddg", "body": "Snippet"},
+        {"title": "Shared again", "href": "https://EXAMPLE.com/list", "body": "Snippet"},
+    ]
+
+    search = WebSearch()
+    results = search.search_many(["query one", "Query One!", "query two"])
+    search.close()
+
+    assert mock_instance.text.call_count == 2
+    assert [r["title"] for r in results] == ["Shared"]
+
+def test_web_search_closes_a_failed_session(mocker):
+    mock_ddgs_class = mocker.patch("src.tools.DDGS")
+    mock_instance = mock_ddgs_class.return_value.__enter__.return_value
+    mock_instance.text.side_effect = [RuntimeError("rate limited"),
+                                      [{"title": "T", "href": "http://example.com", "body": "B"}]]
+
+    search = WebSearch()
+    assert search.search("first query") == []
+    mock_ddgs_class.return_value.__exit__.assert_called_once()
+    assert search._sessions == []
+    assert search.search("second query")[0]["title"] == "T"
+    search.close()
+    assert mock_ddgs_class.return_value.__exit__.call_count == 2
@@ -0,0 +1,77 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.tracing import Tracer, NOOP_SPAN, tracer
+from src.agents import Agent, MessageBus, QueuedMessageBus
+
+def _spans(db, trace_id):
+    return {row[0]: row[1:] for row in db.fetchall(
+        "SELECT span_id, parent_id, kind, name, status FROM trace_spans WHERE trace_id = ?", (trace_id,))}
+
+def test_disabled_tracer_and_spans_outside_a_trace_are_noops(temp_db):
+    disabled = Tracer(enabled=False, database=temp_db)
+    assert disabled.trace("run") is NOOP_SPAN
+    assert disabled.span("db", "SELECT 1") is NOOP_SPAN
+    enabled = Tracer(database=temp_db)
+    assert enabled.span("db", "SELECT 1") is NOOP_SPAN
+    fn = lambda: 1
+    assert enabled.wrap(fn) is fn
+
+def test_spans_nest_and_persist_when_the_trace_ends(temp_db):
+    local = Tracer(database=temp_db)
+    with local.trace("run", country="DE") as root:
+        with local.span("llm", "model", prompt_tokens=5) as llm:
+            with local.span("db", "SELECT   1\n FROM x"):
+                pass
+        with pytest.raises(ValueError):
+            with local.span("scrape", "http://x"):
+                raise ValueError("boom")
+        assert temp_db.fetchone("SELECT COUNT(*) FROM trace_spans")[0] == 0
+    spans = _spans(temp_db, root.trace_id)
+    assert spans[root.span_id] == (None, "run", "run", "ok")
+    assert spans[llm.span_id] == (root.span_id, "llm", "model", "ok")
+    children = {v[2]: v for v in spans.values()}
+    assert children["SELECT 1 FROM x"][0] == llm.span_id
+    assert children["http://x"][3] == "error"
+
+def test_wrap_carries_the_span_into_worker_threads(temp_db):
+    local = Tracer(database=temp_db)
+    with local.trace("run") as root:
+        def work(i):
+            with local.span("search", f"q{i}"):
+                pass
+        with ThreadPoolExecutor(2) as executor:
+            list(executor.map(local.wrap(work), range(4)))
+    spans = _spans(temp_db, root.trace_id)
+    assert sum(1 for v in spans.values() if v[1] == "search" and v[0] == root.span_id) == 4
+
+def test_old_runs_are_pruned(temp_db):
+    local = Tracer(database=temp_db, keep_runs=2)
+    ids = []
+    for _ in range(3):
+        with local.trace("run") as root:
+            pass
+        ids.append(root.trace_id)
+    kept = {row[0] for row in temp_db.fetchall("SELECT DISTINCT trace_id FROM trace_spans")}
+    assert kept == set(ids[1:])
+
+class EchoAgent(Agent):
+    def process(self, message):
+        from database.db import db
+        db.fetchone("SELECT 1")
+        return {"status": "success"}
+
+@pytest.mark.parametrize("bus_class", [MessageBus, QueuedMessageBus])
+def test_bus_agent_and_db_spans_share_the_trace(temp_db, bus_class):
+    bus = bus_class()
+    bus.register_agent(EchoAgent("Echo"))
+    with tracer.trace("run") as root:
+        bus.send_message("Echo", {"action": "ping"})
+    spans = _spans(temp_db, root.trace_id)
+    by_kind = {v[1]: (span_id, v) for span_id, v in spans.items()}
+    bus_id, bus_span = by_kind["bus"]
+    agent_id, agent_span = by_kind["agent"]
+    assert bus_span[0] == root.span_id and agent_span[0] == bus_id
+    assert by_kind["db"][1][0] == agent_id
+    if isinstance(bus, QueuedMessageBus):
+        bus.shutdown()
@@ -0,0 +1,14 @@
+from src.verification import VerificationAgent
+from database.db import db
+
+def test_verify_university_skips_unchanged_rankings(mocker):
+    db.execute("INSERT INTO universities (name, country, ranking_qs) VALUES ('Uni A', 'Germany', 10)")
+    agent = VerificationAgent()
+    log = mocker.spy(agent, "log_decision")
+
+    assert agent.verify_university(1)["verification_status"] == "needs_check"
+    assert agent.verify_university(1)["skipped"] is True
+    db.execute("UPDATE universities SET ranking_the = 20 WHERE id = 1")
+    assert agent.verify_university(1)["verification_status"] == "verified"
+    agent.verify_university(1, force_refresh=True)
+    assert log.call_count == 3